@@ -1,58 +1,223 @@
+import datetime
+import hashlib
+import json
 import os
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+
 import requests
 import pandas as pd
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from datos.AgregadorTemporal import AgregadorTemporal
+from helpers.Utilidades import Utilidades
+from helpers.Instrumentacion import Instrumentacion, instrumentar
+
+URL_ERA5 = "https://archive-api.open-meteo.com/v1/era5"
+
+# Variable diaria de la API -> (columna de salida, reductor al agregar por periodo).
+# La precipitación se acumula; las temperaturas se promedian.
+REDUCTORES_CLIMA = {
+    "TempMax": ("temperature_2m_max", "mean"),
+    "TempMin": ("temperature_2m_min", "mean"),
+    "Precipitacion": ("precipitation_sum", "sum"),
+}
+UBICACION_GAM = ("GAM", 9.9281, -84.0907)  # Coordenada única usada históricamente
 
 class ClienteAPI:
-    def __init__(self):
-        self.latitude = 9.9281
-        self.longitude = -84.0907
+    def __init__(self, ubicaciones=None, fecha_inicio="2020-01-01", fecha_fin="2023-12-31",
+                 granularidad="mensual", url_base=URL_ERA5, carpeta_cache=None, ttl_cache=6 * 3600,
+                 max_workers=4, reintentos=3, timeout=30, carpeta_salida=None):
+        """
+        Cliente de la API de clima histórico ERA5 de Open-Meteo.
+
+        Args:
+            ubicaciones (dict | list, optional): Puntos a consultar, como {nombre: (lat, lon)} o
+                                                 lista de (nombre, lat, lon), p. ej. uno por
+                                                 Puesto de Peaje. Por defecto la coordenada GAM.
+            fecha_inicio (str): Primer día del rango (YYYY-MM-DD).
+            fecha_fin (str): Último día del rango (YYYY-MM-DD).
+            granularidad (str): 'mensual', 'semanal' o 'diaria' (ver AgregadorTemporal).
+            url_base (str): Endpoint de la API (se puede apuntar a un servidor local de pruebas).
+            carpeta_cache (str, optional): Carpeta del caché de respuestas en disco.
+            ttl_cache (float): Segundos de validez en caché de las respuestas que incluyen el año
+                               en curso. Los años pasados no cambian y se guardan sin vencimiento.
+            max_workers (int): Peticiones simultáneas como máximo.
+            reintentos (int): Reintentos con backoff exponencial ante errores de red o 429/5xx.
+            timeout (float): Segundos de espera por respuesta.
+            carpeta_salida (str, optional): Carpeta donde exportar_csv guarda el clima;
+                                            por defecto src/data/processed.
+        """
+        self.latitude = UBICACION_GAM[1]
+        self.longitude = UBICACION_GAM[2]
         self.variables = "temperature_2m_max,temperature_2m_min,precipitation_sum"
-        self.years = [2020, 2021, 2022, 2023]
+        self.ubicaciones = _normalizar_ubicaciones(ubicaciones)
+        self.fecha_inicio = fecha_inicio
+        self.fecha_fin = fecha_fin
+        self.agregador = AgregadorTemporal(REDUCTORES_CLIMA, granularidad=granularidad, por=["Ubicacion"])
         self.df = None
 
+        self.url_base = url_base
+        self.ttl_cache = ttl_cache
+        self.max_workers = max_workers
+        self.reintentos = reintentos
+        self.timeout = timeout
+        self._session = None
+        self._lock_session = threading.Lock()
+        self._en_vuelo = {}  # Peticiones en curso por clave de caché -> Future
+        self._lock_en_vuelo = threading.Lock()
+
         # Carpeta donde se guardará el CSV
         base_dir = os.path.dirname(os.path.abspath(__file__))
-        carpeta_processed = os.path.join(base_dir, "..", "data", "processed")
+        carpeta_processed = carpeta_salida or os.path.join(base_dir, "..", "data", "processed")
         os.makedirs(carpeta_processed, exist_ok=True)
         self.csv_path = os.path.join(carpeta_processed, "clima_mensual_2020_2023.csv")
+        self.carpeta_cache = carpeta_cache or os.path.join(base_dir, "..", "data", "cache", "open_meteo")
 
+    @instrumentar()
     def obtener_datos(self):
-        all_data = []
-        for year in self.years:
-            url = (
-                f"https://archive-api.open-meteo.com/v1/era5?"
-                f"latitude={self.latitude}&longitude={self.longitude}"
-                f"&daily={self.variables}"
-                f"&start_date={year}-01-01&end_date={year}-12-31"
-                f"&timezone=auto"
-            )
-            response = requests.get(url)
-            data = response.json()
-            df_year = pd.DataFrame(data["daily"])
-            all_data.append(df_year)
-
-        df = pd.concat(all_data, ignore_index=True)
-        df["time"] = pd.to_datetime(df["time"])
-        df["Anio"] = df["time"].dt.year
-        df["Mes"] = df["time"].dt.month
-
-        df_mensual = df.groupby(["Anio", "Mes"], as_index=False).agg({
-            "temperature_2m_max": "mean",
-            "temperature_2m_min": "mean",
-            "precipitation_sum": "mean"
-        })
-
-        # Renombrar columnas para SQL Server
-        df_mensual.rename(columns={
-            "temperature_2m_max": "TempMax",
-            "temperature_2m_min": "TempMin",
-            "precipitation_sum": "Precipitacion"
-        }, inplace=True)
+        """
+        Clima agregado (mensual por defecto) de todas las ubicaciones en el rango de fechas.
+
+        Cada ubicación se pide con un solo rango (los años contiguos se unen) más,
+        si el rango llega al año en curso, un segundo tramo que vence según ttl_cache.
+        Las peticiones idénticas (misma coordenada y rango) se hacen una sola vez.
+
+        Returns:
+            pd.DataFrame: Una fila por (Ubicacion, periodo), con periodo (Anio, Mes),
+                          (Anio, Semana) o Fecha según la granularidad. Si hay una sola
+                          ubicación se omite la columna Ubicacion.
+        """
+        pedidos = [(nombre, lat, lon, inicio, fin)
+                   for nombre, (lat, lon) in self.ubicaciones.items()
+                   for inicio, fin in _rangos_por_vigencia(self.fecha_inicio, self.fecha_fin)]
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            respuestas = list(executor.map(lambda p: self._obtener_diario(*p[1:]), pedidos))
 
+        df = pd.concat([pd.DataFrame(data["daily"]).assign(Ubicacion=pedido[0])
+                        for pedido, data in zip(pedidos, respuestas)], ignore_index=True)
+        # Agregación por periodo; las columnas de salida ya tienen los nombres para SQL Server
+        df_mensual = self.agregador.agregar(df, columna_fecha="time")
+
+        if len(self.ubicaciones) == 1:
+            df_mensual = df_mensual.drop(columns=["Ubicacion"])
         self.df = df_mensual
         return self.df
 
-    def exportar_csv(self):
-        os.makedirs(os.path.dirname(self.csv_path), exist_ok=True)
-        self.df.to_csv(self.csv_path, index=False)
-        print(f"CSV de clima guardado en: {self.csv_path}")
+    @instrumentar()
+    def exportar_csv(self, formato="csv"):
+        """Guarda el clima mensual en CSV, Parquet o Arrow (misma ruta base que csv_path)"""
+        ruta = self.csv_path if formato == "csv" else Utilidades.ruta_con_formato(self.csv_path, formato)
+        Utilidades.escribir_tabla(self.df, ruta, formato)
+        print(f"Clima guardado en: {ruta}")
+        return ruta
+
+    @property
+    def session(self):
+        """requests.Session compartida, con pool de conexiones y reintentos con backoff"""
+        with self._lock_session:
+            if self._session is None:
+                reintentos = Retry(
+                    total=self.reintentos,
+                    backoff_factor=0.5,
+                    status_forcelist=(429, 500, 502, 503, 504),
+                    allowed_methods=("GET",),
+                )
+                adaptador = HTTPAdapter(max_retries=reintentos, pool_connections=1,
+                                        pool_maxsize=self.max_workers)
+                session = requests.Session()
+                session.mount("https://", adaptador)
+                session.mount("http://", adaptador)
+                self._session = session
+            return self._session
+
+    def _obtener_diario(self, latitud, longitud, fecha_inicio, fecha_fin):
+        """Respuesta JSON de la API para un punto y rango, desde el caché si está vigente"""
+        params = {
+            "latitude": latitud,
+            "longitude": longitud,
+            "daily": self.variables,
+            "start_date": fecha_inicio,
+            "end_date": fecha_fin,
+            "timezone": "auto",
+        }
+        ruta_cache = self._ruta_cache(params)
+        if self._cache_vigente(ruta_cache, fecha_fin):
+            with open(ruta_cache, "r", encoding="utf-8") as f:
+                return json.load(f)
+
+        # Si otra hebra ya está pidiendo exactamente lo mismo, se espera su resultado
+        with self._lock_en_vuelo:
+            futuro = self._en_vuelo.get(ruta_cache)
+            propio = futuro is None
+            if propio:
+                futuro = Future()
+                self._en_vuelo[ruta_cache] = futuro
+        if not propio:
+            return futuro.result()
+
+        try:
+            # Un span por petición: corre en las hebras del pool, fuera del span de obtener_datos
+            with Instrumentacion.span("ClienteAPI.peticion") as span:
+                response = self.session.get(self.url_base, params=params, timeout=self.timeout)
+                response.raise_for_status()
+                span.registrar(bytes_leidos=len(response.content))
+            data = response.json()
+            self._guardar_cache(ruta_cache, data)
+            futuro.set_result(data)
+            return data
+        except BaseException as e:
+            futuro.set_exception(e)
+            raise
+        finally:
+            with self._lock_en_vuelo:
+                del self._en_vuelo[ruta_cache]
+
+    def _ruta_cache(self, params):
+        clave = json.dumps(params, sort_keys=True)
+        nombre = hashlib.sha256(clave.encode("utf-8")).hexdigest()[:32]
+        return os.path.join(self.carpeta_cache, f"{nombre}.json")
+
+    def _cache_vigente(self, ruta_cache, fecha_fin):
+        """Los rangos que terminan antes del año en curso no vencen; el resto usa ttl_cache"""
+        if not os.path.exists(ruta_cache):
+            return False
+        if int(fecha_fin[:4]) < datetime.date.today().year:
+            return True
+        return time.time() - os.path.getmtime(ruta_cache) < self.ttl_cache
+
+    def _guardar_cache(self, ruta_cache, data):
+        os.makedirs(self.carpeta_cache, exist_ok=True)
+        temporal = f"{ruta_cache}.{threading.get_ident()}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(temporal, ruta_cache)  # Escritura atómica: nunca queda un JSON a medias
+
+
+def _normalizar_ubicaciones(ubicaciones):
+    """Convierte {nombre: (lat, lon)} o [(nombre, lat, lon), ...] en un dict ordenado"""
+    if ubicaciones is None:
+        nombre, lat, lon = UBICACION_GAM
+        return {nombre: (lat, lon)}
+    if isinstance(ubicaciones, dict):
+        return {nombre: (float(lat), float(lon)) for nombre, (lat, lon) in ubicaciones.items()}
+    return {nombre: (float(lat), float(lon)) for nombre, lat, lon in ubicaciones}
+
+
+def _rangos_por_vigencia(fecha_inicio, fecha_fin):
+    """
+    Parte [fecha_inicio, fecha_fin] en como máximo dos rangos: los años cerrados
+    (inmutables, un solo pedido) y el tramo del año en curso (vence con el TTL).
+    """
+    inicio = datetime.date.fromisoformat(fecha_inicio)
+    fin = datetime.date.fromisoformat(fecha_fin)
+    if fin < inicio:
+        raise ValueError(f"Rango de fechas inválido: {fecha_inicio} > {fecha_fin}")
+    anio_actual = datetime.date.today().year
+    if fin.year < anio_actual or inicio.year >= anio_actual:
+        return [(inicio.isoformat(), fin.isoformat())]
+    cierre = datetime.date(anio_actual - 1, 12, 31)
+    return [(inicio.isoformat(), cierre.isoformat()),
+            (datetime.date(anio_actual, 1, 1).isoformat(), fin.isoformat())]
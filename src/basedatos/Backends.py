@@ -0,0 +1,274 @@
+import itertools
+import sqlite3
+import threading
+
+import pandas as pd
+
+
+class BackendBase:
+    """
+    Interfaz común de los motores de base de datos que usa GestorBaseDatos.
+
+    Cada backend sabe abrir conexiones, comprobar si siguen sanas y generar
+    el SQL que depende del dialecto (tipos de columna, CREATE TABLE).
+    """
+    nombre = "base"
+
+    # Tipo SQL según dtype.kind de pandas (i: entero, f: flotante, b: booleano, M: fecha)
+    tipos_sql = {"i": "INT", "u": "INT", "f": "FLOAT", "b": "BIT", "M": "DATETIME"}
+    tipo_texto = "NVARCHAR(255)"
+
+    def conectar(self):
+        """Abre una conexión nueva (la usa el pool como fábrica)"""
+        raise NotImplementedError
+
+    def cursor(self, conn):
+        """Cursor para ejecutar sentencias sobre la conexión"""
+        return conn.cursor()
+
+    def cerrar_cursor(self, cursor):
+        cursor.close()
+
+    def validar(self, conn):
+        """Health check: ejecuta una consulta trivial sobre la conexión"""
+        cursor = self.cursor(conn)
+        try:
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        finally:
+            self.cerrar_cursor(cursor)
+        return True
+
+    def cerrar_conexion(self, conn):
+        conn.close()
+
+    def cerrar(self):
+        """Libera recursos propios del backend (además de las conexiones del pool)"""
+
+    def preparar_cursor(self, cursor):
+        """Ajustes del cursor antes de una carga masiva"""
+
+    def citar(self, identificador):
+        """Delimita un nombre de columna (admite espacios y tildes)"""
+        return f"[{identificador}]"
+
+    def tipo_columna(self, dtype):
+        return self.tipos_sql.get(dtype.kind, self.tipo_texto)
+
+    def sql_crear_tabla(self, tabla, df):
+        """Lista de sentencias que crean la tabla si no existe"""
+        raise NotImplementedError
+
+    def nombre_staging(self, tabla):
+        return f"stg_{tabla}"
+
+    def sql_crear_staging(self, tabla, staging, columnas):
+        """Tabla temporal vacía con las columnas de datos de la tabla destino"""
+        cols = ", ".join(self.citar(c) for c in columnas)
+        return [f"DROP TABLE IF EXISTS {staging}",
+                f"CREATE TEMP TABLE {staging} AS SELECT {cols} FROM {tabla} WHERE 1=0"]
+
+    def sql_borrar_staging(self, staging):
+        return [f"DROP TABLE IF EXISTS {staging}"]
+
+    def sql_indice_claves(self, tabla, claves):
+        """Índice sobre las claves naturales para que el merge no recorra toda la tabla"""
+        cols = ", ".join(self.citar(c) for c in claves)
+        return [f"CREATE INDEX IF NOT EXISTS ix_{tabla}_claves ON {tabla} ({cols})"]
+
+    def sql_merge(self, tabla, staging, claves, columnas):
+        """Integra el staging en la tabla: UPDATE de las claves existentes + INSERT de las nuevas"""
+        condicion = " AND ".join(f"{tabla}.{self.citar(c)} = s.{self.citar(c)}" for c in claves)
+        no_claves = [c for c in columnas if c not in claves]
+        cols = ", ".join(self.citar(c) for c in columnas)
+        sentencias = []
+        if no_claves:
+            asignaciones = ", ".join(f"{self.citar(c)} = s.{self.citar(c)}" for c in no_claves)
+            sentencias.append(f"UPDATE {tabla} SET {asignaciones} FROM {staging} AS s WHERE {condicion}")
+        sentencias.append(
+            f"INSERT INTO {tabla} ({cols}) SELECT {cols} FROM {staging} AS s "
+            f"WHERE NOT EXISTS (SELECT 1 FROM {tabla} WHERE {condicion})")
+        return sentencias
+
+    def _columnas_sql(self, df):
+        return ", ".join(f"{self.citar(col)} {self.tipo_columna(dtype)}" for col, dtype in df.dtypes.items())
+
+    def consultar(self, conn, query):
+        """Ejecuta una consulta y devuelve un DataFrame"""
+        cursor = self.cursor(conn)
+        try:
+            cursor.execute(query)
+            columnas = [d[0] for d in cursor.description]
+            return pd.DataFrame.from_records(cursor.fetchall(), columns=columnas)
+        finally:
+            self.cerrar_cursor(cursor)
+
+    def __str__(self):
+        return self.nombre
+
+
+class BackendSQLServer(BackendBase):
+    nombre = "SQL Server"
+
+    def __init__(self, server, database, driver="ODBC Driver 17 for SQL Server"):
+        """Conexión a SQL Server con pyodbc usando Windows Authentication."""
+        self.conn_str = (
+            f"DRIVER={{{driver}}};"
+            f"SERVER={server};DATABASE={database};Trusted_Connection=yes;"
+        )
+
+    def conectar(self):
+        import pyodbc  # Import diferido: solo se necesita con este backend
+        return pyodbc.connect(self.conn_str)
+
+    def preparar_cursor(self, cursor):
+        cursor.fast_executemany = True
+
+    def sql_crear_tabla(self, tabla, df):
+        return [f"""
+        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{tabla}' AND xtype='U')
+        CREATE TABLE {tabla} (
+            id INT IDENTITY(1,1) PRIMARY KEY,
+            {self._columnas_sql(df)}
+        )
+        """]
+
+    def nombre_staging(self, tabla):
+        return f"#stg_{tabla}"  # Tabla temporal local a la sesión
+
+    def sql_crear_staging(self, tabla, staging, columnas):
+        cols = ", ".join(self.citar(c) for c in columnas)
+        return [f"DROP TABLE IF EXISTS {staging}",
+                f"SELECT {cols} INTO {staging} FROM {tabla} WHERE 1=0"]
+
+    def sql_indice_claves(self, tabla, claves):
+        cols = ", ".join(self.citar(c) for c in claves)
+        return [f"IF NOT EXISTS (SELECT * FROM sys.indexes WHERE name='ix_{tabla}_claves') "
+                f"CREATE INDEX ix_{tabla}_claves ON {tabla} ({cols})"]
+
+    def sql_merge(self, tabla, staging, claves, columnas):
+        condicion = " AND ".join(f"destino.{self.citar(c)} = origen.{self.citar(c)}" for c in claves)
+        no_claves = [c for c in columnas if c not in claves]
+        cols = ", ".join(self.citar(c) for c in columnas)
+        valores = ", ".join(f"origen.{self.citar(c)}" for c in columnas)
+        actualizar = ""
+        if no_claves:
+            asignaciones = ", ".join(f"destino.{self.citar(c)} = origen.{self.citar(c)}" for c in no_claves)
+            actualizar = f"WHEN MATCHED THEN UPDATE SET {asignaciones} "
+        return [f"MERGE INTO {tabla} AS destino USING {staging} AS origen ON {condicion} "
+                f"{actualizar}"
+                f"WHEN NOT MATCHED BY TARGET THEN INSERT ({cols}) VALUES ({valores});"]
+
+
+class BackendSQLite(BackendBase):
+    nombre = "SQLite"
+    tipos_sql = {"i": "INTEGER", "u": "INTEGER", "f": "REAL", "b": "INTEGER", "M": "TIMESTAMP"}
+    tipo_texto = "TEXT"
+
+    _contador_memoria = itertools.count()
+
+    def __init__(self, ruta=":memory:", timeout=30.0):
+        """
+        Base de datos SQLite local.
+
+        Args:
+            ruta (str): Archivo de la base de datos. Con ':memory:' se usa una base en
+                        memoria compartida entre todas las conexiones del pool.
+            timeout (float): Segundos que una conexión espera a que se libere un bloqueo.
+        """
+        self.timeout = timeout
+        self._ancla = None
+        if ruta == ":memory:":
+            # Cada sqlite3.connect(':memory:') sería una base distinta. Con el VFS
+            # memdb (SQLite >= 3.36) todas las conexiones ven la misma base con el
+            # bloqueo normal de SQLite, y el ancla evita que desaparezca cuando el
+            # pool cierra sus conexiones inactivas.
+            self.ruta = f"file:/memdb_{id(self)}_{next(self._contador_memoria)}?vfs=memdb"
+            self._uri = True
+            self._ancla = self._abrir()
+        else:
+            self.ruta = ruta
+            self._uri = False
+
+    def _abrir(self):
+        return sqlite3.connect(self.ruta, uri=self._uri, timeout=self.timeout, check_same_thread=False)
+
+    def conectar(self):
+        conn = self._abrir()
+        if not self._uri:
+            conn.execute("PRAGMA journal_mode=WAL")  # Lectores concurrentes con un escritor
+        return conn
+
+    def cerrar(self):
+        if self._ancla is not None:
+            self._ancla.close()
+            self._ancla = None
+
+    def sql_crear_tabla(self, tabla, df):
+        return [f"CREATE TABLE IF NOT EXISTS {tabla} "
+                f"(id INTEGER PRIMARY KEY AUTOINCREMENT, {self._columnas_sql(df)})"]
+
+
+class BackendDuckDB(BackendBase):
+    nombre = "DuckDB"
+    tipos_sql = {"i": "BIGINT", "u": "BIGINT", "f": "DOUBLE", "b": "BOOLEAN", "M": "TIMESTAMP"}
+    tipo_texto = "VARCHAR"
+
+    def __init__(self, ruta=":memory:"):
+        """Base de datos DuckDB local (archivo o ':memory:')."""
+        self.ruta = ruta
+        self._base = None
+        self._lock = threading.Lock()
+
+    def conectar(self):
+        # DuckDB admite una sola instancia por archivo y proceso: cada conexión del
+        # pool es un cursor (conexión independiente) sobre esa misma instancia.
+        with self._lock:
+            if self._base is None:
+                try:
+                    import duckdb
+                except ImportError as e:
+                    raise ImportError("El backend DuckDB requiere el paquete 'duckdb'") from e
+                self._base = duckdb.connect(self.ruta)
+            return self._base.cursor()
+
+    def cerrar(self):
+        with self._lock:
+            if self._base is not None:
+                self._base.close()
+                self._base = None
+
+    def cursor(self, conn):
+        # En DuckDB conn.cursor() abre otra conexión (sin las tablas temporales
+        # de esta); la propia conexión ya ejecuta sentencias.
+        return conn
+
+    def cerrar_cursor(self, cursor):
+        pass
+
+    def citar(self, identificador):
+        return f'"{identificador}"'
+
+    def sql_crear_tabla(self, tabla, df):
+        return [
+            f"CREATE SEQUENCE IF NOT EXISTS seq_{tabla}",
+            f"CREATE TABLE IF NOT EXISTS {tabla} "
+            f"(id BIGINT DEFAULT nextval('seq_{tabla}') PRIMARY KEY, {self._columnas_sql(df)})",
+        ]
+
+
+BACKENDS = {
+    "sqlserver": BackendSQLServer,
+    "sqlite": BackendSQLite,
+    "duckdb": BackendDuckDB,
+}
+
+
+def crear_backend(motor, **opciones):
+    """Crea un backend por nombre ('sqlserver', 'sqlite' o 'duckdb')"""
+    try:
+        clase = BACKENDS[motor.lower()]
+    except KeyError:
+        raise ValueError(f"Motor de base de datos no soportado: {motor}. "
+                         f"Opciones: {', '.join(BACKENDS)}") from None
+    return clase(**opciones)
@@ -1,86 +1,262 @@
-import pyodbc
+import time
+
 import pandas as pd
 
+from basedatos.Backends import BackendSQLServer
+from basedatos.PoolConexiones import PoolConexiones
+from helpers.Instrumentacion import Instrumentacion, instrumentar
+
+TABLA_MARCAS = "MarcasAguaCarga"  # Huella por (tabla, periodo) de la última carga incremental
+
 class GestorBaseDatos:
-    def __init__(self, server, database):
+    def __init__(self, server=None, database=None, backend=None, max_conexiones=5,
+                 timeout_inactivo=300.0):
         """
-        Inicializa la conexión usando Windows Authentication.
+        Inicializa el gestor sobre un backend de base de datos.
+
+        Args:
+            server (str, optional): Servidor SQL Server (si no se indica backend).
+            database (str, optional): Base de datos SQL Server (si no se indica backend).
+            backend (BackendBase, optional): Motor a usar (BackendSQLServer, BackendSQLite,
+                                             BackendDuckDB). Por defecto SQL Server con
+                                             Windows Authentication.
+            max_conexiones (int): Tamaño máximo del pool de conexiones.
+            timeout_inactivo (float): Segundos antes de cerrar una conexión libre sin uso.
         """
-        self.conn_str = (
-            f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-            f"SERVER={server};DATABASE={database};Trusted_Connection=yes;"
-        )
-        self.conn = None
+        if backend is None:
+            if server is None or database is None:
+                raise ValueError("Indique server y database, o un backend")
+            backend = BackendSQLServer(server, database)
+        self.backend = backend
+        self.max_conexiones = max_conexiones
+        self.timeout_inactivo = timeout_inactivo
+        self.pool = None
 
+    @instrumentar()
     def conectar(self):
-        """Conecta a SQL Server usando Windows Authentication."""
+        """Crea el pool de conexiones y verifica que el backend responde."""
         try:
-            self.conn = pyodbc.connect(self.conn_str)
-            print(" Conexión establecida con SQL Server (Windows Authentication)")
+            self.pool = PoolConexiones(
+                fabrica=self.backend.conectar,
+                validar=self.backend.validar,
+                cerrar=self.backend.cerrar_conexion,
+                max_conexiones=self.max_conexiones,
+                timeout_inactivo=self.timeout_inactivo,
+            )
+            with self.pool.conexion():
+                pass
+            print(f" Conexión establecida con {self.backend}")
         except Exception as e:
-            self.conn = None
+            self.pool = None
             print(" Error en la conexión:", e)
 
+    @instrumentar()
     def crear_tabla_desde_dataframe(self, df, tabla):
         """Crea una tabla automáticamente según el DataFrame"""
-        if not self.conn:
+        if not self.pool:
             print(" No hay conexión activa.")
             return
 
-        cursor = self.conn.cursor()
-
-        tipo_sql = {
-            "int64": "INT",
-            "float64": "FLOAT",
-            "object": "NVARCHAR(255)",
-            "bool": "BIT",
-            "datetime64[ns]": "DATETIME"
-        }
-
-        columnas_sql = [f"[{col}] {tipo_sql.get(str(dtype), 'NVARCHAR(255)')}"
-                        for col, dtype in df.dtypes.items()]
-        columnas_sql_str = ", ".join(columnas_sql)
-
-        query = f"""
-        IF NOT EXISTS (SELECT * FROM sysobjects WHERE name='{tabla}' AND xtype='U')
-        CREATE TABLE {tabla} (
-            id INT IDENTITY(1,1) PRIMARY KEY,
-            {columnas_sql_str}
-        )
+        with self.pool.conexion() as conn:
+            cursor = self.backend.cursor(conn)
+            for query in self.backend.sql_crear_tabla(tabla, df):
+                cursor.execute(query)
+            conn.commit()
+        print(f" Tabla '{tabla}' creada/verificada en {self.backend}")
+
+    @instrumentar()
+    def insertar_dataframe(self, df, tabla, chunk_size=5000, commit_cada=None):
         """
-        cursor.execute(query)
-        self.conn.commit()
-        print(f" Tabla '{tabla}' creada/verificada en SQL Server")
+        Inserta un DataFrame completo en la tabla por lotes.
+
+        Los valores se toman por columnas directamente del DataFrame y se envían
+        con executemany en bloques de `chunk_size` filas. Con pyodbc se activa
+        fast_executemany para que cada bloque viaje en un solo envío.
+        Es seguro llamarlo desde varios hilos: cada llamada usa su propia conexión del pool.
 
-    def insertar_dataframe(self, df, tabla):
-        """Inserta un DataFrame completo en la tabla"""
-        if not self.conn:
+        Args:
+            df (pd.DataFrame): Datos a insertar.
+            tabla (str): Nombre de la tabla destino.
+            chunk_size (int): Filas por llamada a executemany.
+            commit_cada (int, optional): Filas entre cada commit. Si es None se
+                                         hace un único commit al final.
+        """
+        if not self.pool:
             print(" No hay conexión activa.")
             return
 
-        cursor = self.conn.cursor()
-        columnas = ",".join([f"[{c}]" for c in df.columns])
+        inicio = time.perf_counter()
+        with self.pool.conexion() as conn:
+            self._insertar_lotes(conn, df, tabla, chunk_size, commit_cada)
+            conn.commit()
+
+        total = len(df)
+        Instrumentacion.registrar(filas_salida=total)
+        duracion = time.perf_counter() - inicio
+        velocidad = total / duracion if duracion > 0 else float("inf")
+        print(f" {total} registros insertados en '{tabla}' "
+              f"({duracion:.2f} s, {velocidad:,.0f} filas/s)")
+        return velocidad
+
+    def _insertar_lotes(self, conn, df, tabla, chunk_size, commit_cada=None):
+        """Envía df a la tabla con executemany por bloques sobre una conexión ya tomada del pool"""
+        columnas = ",".join([self.backend.citar(c) for c in df.columns])
         placeholders = ",".join("?" * len(df.columns))
         query = f"INSERT INTO {tabla} ({columnas}) VALUES ({placeholders})"
 
-        for _, row in df.iterrows():
-            cursor.execute(query, tuple(row))
+        valores = _columnas_como_listas(df)
+        total = len(df)
+        chunk_size = max(1, int(chunk_size))
+        pendientes = 0
+
+        cursor = self.backend.cursor(conn)
+        self.backend.preparar_cursor(cursor)
+        for desde in range(0, total, chunk_size):
+            hasta = min(desde + chunk_size, total)
+            filas = list(zip(*(col[desde:hasta] for col in valores)))
+            cursor.executemany(query, filas)
+            pendientes += len(filas)
+            if commit_cada and pendientes >= commit_cada:
+                conn.commit()
+                pendientes = 0
+
+    @instrumentar()
+    def upsert_dataframe(self, df, tabla, claves, columnas_periodo=None, chunk_size=5000):
+        """
+        Carga idempotente: inserta filas nuevas y actualiza las existentes según `claves`.
 
-        self.conn.commit()
-        print(f" {len(df)} registros insertados en '{tabla}'")
+        Las filas se envían a una tabla de staging y se integran con una sola
+        sentencia MERGE (o UPDATE + INSERT en SQLite/DuckDB). Si se indican
+        `columnas_periodo`, se guarda una huella por periodo en la tabla de marcas
+        de agua y solo se escriben los periodos nuevos o que cambiaron desde la
+        última carga.
 
+        Args:
+            df (pd.DataFrame): Datos a cargar.
+            tabla (str): Tabla destino (debe existir, ver crear_tabla_desde_dataframe).
+            claves (list): Columnas que identifican una fila, p. ej. ["Año", "Mes", "Puesto de Peaje"].
+            columnas_periodo (list, optional): Columnas que definen el periodo, p. ej. ["Anio", "Mes"].
+            chunk_size (int): Filas por llamada a executemany al llenar el staging.
+
+        Returns:
+            int: Número de filas enviadas a la base de datos.
+        """
+        if not self.pool:
+            print(" No hay conexión activa.")
+            return 0
+
+        claves = list(claves)
+        faltantes = [c for c in claves + list(columnas_periodo or []) if c not in df.columns]
+        if faltantes:
+            raise KeyError(f"Columnas clave no encontradas en el DataFrame: {faltantes}")
+
+        df = df.drop_duplicates(subset=claves, keep="last")
+        huellas_nuevas = {}
+        if columnas_periodo:
+            huellas_nuevas = _huellas_por_periodo(df, list(columnas_periodo))
+            huellas_previas = self._leer_marcas(tabla)
+            cambiados = {p for p, h in huellas_nuevas.items() if huellas_previas.get(p) != h}
+            huellas_nuevas = {p: huellas_nuevas[p] for p in cambiados}
+            if not cambiados:
+                print(f" '{tabla}' sin cambios desde la última carga ({len(huellas_previas)} periodos)")
+                Instrumentacion.registrar(filas_salida=0)
+                return 0
+            df = df[_claves_periodo(df, list(columnas_periodo)).isin(cambiados)]
+
+        staging = self.backend.nombre_staging(tabla)
+        columnas = list(df.columns)
+        inicio = time.perf_counter()
+        with self.pool.conexion() as conn:
+            cursor = self.backend.cursor(conn)
+            for query in self.backend.sql_crear_staging(tabla, staging, columnas):
+                cursor.execute(query)
+            for query in self.backend.sql_indice_claves(tabla, claves):
+                cursor.execute(query)
+            self._insertar_lotes(conn, df, staging, chunk_size)
+            cursor = self.backend.cursor(conn)
+            for query in self.backend.sql_merge(tabla, staging, claves, columnas):
+                cursor.execute(query)
+            for query in self.backend.sql_borrar_staging(staging):
+                cursor.execute(query)
+            if huellas_nuevas:
+                self._guardar_marcas(cursor, tabla, huellas_nuevas)
+            conn.commit()
+
+        Instrumentacion.registrar(filas_salida=len(df))
+        duracion = time.perf_counter() - inicio
+        periodos = f" en {len(huellas_nuevas)} periodos nuevos/modificados" if columnas_periodo else ""
+        print(f" {len(df)} registros integrados en '{tabla}'{periodos} ({duracion:.2f} s)")
+        return len(df)
+
+    def _leer_marcas(self, tabla):
+        """Huellas por periodo guardadas en la última carga de la tabla"""
+        self._crear_tabla_marcas()
+        with self.pool.conexion() as conn:
+            cursor = self.backend.cursor(conn)
+            cursor.execute(f"SELECT Periodo, Huella FROM {TABLA_MARCAS} WHERE Tabla = ?", (tabla,))
+            return {periodo: huella for periodo, huella in cursor.fetchall()}
+
+    def _guardar_marcas(self, cursor, tabla, huellas):
+        filas = [(tabla, periodo) for periodo in huellas]
+        cursor.executemany(f"DELETE FROM {TABLA_MARCAS} WHERE Tabla = ? AND Periodo = ?", filas)
+        cursor.executemany(f"INSERT INTO {TABLA_MARCAS} (Tabla, Periodo, Huella) VALUES (?, ?, ?)",
+                           [(tabla, periodo, huella) for periodo, huella in huellas.items()])
+
+    def _crear_tabla_marcas(self):
+        esquema = pd.DataFrame({c: pd.Series(dtype=object) for c in ("Tabla", "Periodo", "Huella")})
+        with self.pool.conexion() as conn:
+            cursor = self.backend.cursor(conn)
+            for query in self.backend.sql_crear_tabla(TABLA_MARCAS, esquema):
+                cursor.execute(query)
+            conn.commit()
+
+    @instrumentar()
     def consultar(self, query):
         """Ejecuta una consulta y devuelve un DataFrame"""
-        if not self.conn:
+        if not self.pool:
             print(" No hay conexión activa.")
             return pd.DataFrame()
-        return pd.read_sql(query, self.conn)
+        with self.pool.conexion() as conn:
+            return self.backend.consultar(conn, query)
 
+    @instrumentar()
     def cerrar(self):
-        """Cierra la conexión si existe"""
-        if self.conn:
-            self.conn.close()
-            self.conn = None
+        """Cierra el pool de conexiones si existe"""
+        if self.pool:
+            self.pool.cerrar()
+            self.backend.cerrar()
+            self.pool = None
             print(" Conexión cerrada")
         else:
             print(" No había conexión activa para cerrar")
+
+
+def _columnas_como_listas(df):
+    """Convierte cada columna en una lista de valores nativos de Python (NaN -> None)"""
+    columnas = []
+    for col in df.columns:
+        serie = df[col]
+        valores = serie.to_numpy(dtype=object)
+        nulos = serie.isna().to_numpy()
+        if nulos.any():
+            valores[nulos] = None
+        columnas.append(valores.tolist())
+    return columnas
+
+
+def _claves_periodo(df, columnas_periodo):
+    """Serie con el periodo de cada fila como texto, p. ej. '2024|Junio'"""
+    claves = df[columnas_periodo[0]].astype(str)
+    for col in columnas_periodo[1:]:
+        claves = claves + "|" + df[col].astype(str)
+    return claves
+
+
+def _huellas_por_periodo(df, columnas_periodo):
+    """Huella del contenido de cada periodo: suma de los hashes de sus filas + número de filas"""
+    hashes = pd.util.hash_pandas_object(df, index=False)
+    grupos = hashes.groupby(_claves_periodo(df, columnas_periodo).to_numpy())
+    sumas = grupos.sum()
+    conteos = grupos.size()
+    return {periodo: f"{int(suma) & 0xFFFFFFFFFFFFFFFF:016x}-{conteos[periodo]}"
+            for periodo, suma in sumas.items()}
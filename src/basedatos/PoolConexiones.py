@@ -0,0 +1,142 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+class PoolConexiones:
+    def __init__(self, fabrica, validar=None, cerrar=None, max_conexiones=5,
+                 timeout_inactivo=300.0, timeout_espera=30.0):
+        """
+        Pool de conexiones seguro entre hilos.
+
+        Args:
+            fabrica (callable): Función sin argumentos que abre una conexión nueva.
+            validar (callable, optional): Recibe una conexión y devuelve True si sigue sana.
+                                          Se ejecuta cada vez que se entrega una conexión reutilizada.
+            cerrar (callable, optional): Cierra una conexión. Por defecto llama a conn.close().
+            max_conexiones (int): Máximo de conexiones abiertas a la vez (libres + en uso).
+            timeout_inactivo (float): Segundos que una conexión libre puede quedar sin uso antes de cerrarse.
+            timeout_espera (float): Segundos que adquirir() espera por una conexión antes de fallar.
+        """
+        if max_conexiones < 1:
+            raise ValueError("max_conexiones debe ser al menos 1")
+        self.fabrica = fabrica
+        self.validar = validar
+        self._cerrar_conexion = cerrar or (lambda conn: conn.close())
+        self.max_conexiones = max_conexiones
+        self.timeout_inactivo = timeout_inactivo
+        self.timeout_espera = timeout_espera
+
+        self._libres = deque()  # (conexion, momento del último uso)
+        self._abiertas = 0
+        self._cond = threading.Condition()
+        self._cerrado = False
+
+    def adquirir(self):
+        """Entrega una conexión libre y sana, o abre una nueva si no se alcanzó el máximo"""
+        limite = time.monotonic() + self.timeout_espera
+        while True:
+            conn = None
+            with self._cond:
+                while True:
+                    if self._cerrado:
+                        raise RuntimeError("El pool de conexiones está cerrado")
+                    self._purgar_inactivas()
+                    if self._libres:
+                        conn, _ = self._libres.pop()  # LIFO: la más recientemente usada
+                        break
+                    if self._abiertas < self.max_conexiones:
+                        self._abiertas += 1
+                        break
+                    restante = limite - time.monotonic()
+                    if restante <= 0:
+                        raise TimeoutError(
+                            f"No hay conexiones libres tras {self.timeout_espera} s "
+                            f"(máximo {self.max_conexiones})")
+                    self._cond.wait(restante)
+
+            if conn is None:
+                try:
+                    return self.fabrica()
+                except Exception:
+                    self._descontar()
+                    raise
+
+            if self.validar is None or self._es_sana(conn):
+                return conn
+            # Conexión rota: se descarta y se vuelve a intentar
+            self._cerrar_silencioso(conn)
+            self._descontar()
+
+    def liberar(self, conn, descartar=False):
+        """Devuelve una conexión al pool; con descartar=True se cierra en lugar de reutilizarse"""
+        with self._cond:
+            if not descartar and not self._cerrado:
+                self._libres.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+        self._cerrar_silencioso(conn)
+        self._descontar()
+
+    @contextmanager
+    def conexion(self):
+        """Context manager: adquiere una conexión y la devuelve al salir"""
+        conn = self.adquirir()
+        try:
+            yield conn
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                self.liberar(conn, descartar=True)
+            else:
+                self.liberar(conn)
+            raise
+        else:
+            self.liberar(conn)
+
+    def cerrar(self):
+        """Cierra todas las conexiones libres; las que estén en uso se cierran al liberarse"""
+        with self._cond:
+            self._cerrado = True
+            libres = [conn for conn, _ in self._libres]
+            self._libres.clear()
+            self._abiertas -= len(libres)
+            self._cond.notify_all()
+        for conn in libres:
+            self._cerrar_silencioso(conn)
+
+    @property
+    def estadisticas(self):
+        """Conexiones abiertas, libres y en uso en este momento"""
+        with self._cond:
+            libres = len(self._libres)
+            return {"abiertas": self._abiertas, "libres": libres, "en_uso": self._abiertas - libres}
+
+    def _purgar_inactivas(self):
+        """Cierra las conexiones libres que superaron timeout_inactivo (llamar con el lock tomado)"""
+        if self.timeout_inactivo is None:
+            return
+        ahora = time.monotonic()
+        while self._libres and ahora - self._libres[0][1] > self.timeout_inactivo:
+            conn, _ = self._libres.popleft()
+            self._abiertas -= 1
+            self._cerrar_silencioso(conn)
+
+    def _es_sana(self, conn):
+        try:
+            return bool(self.validar(conn))
+        except Exception:
+            return False
+
+    def _descontar(self):
+        with self._cond:
+            self._abiertas -= 1
+            self._cond.notify()
+
+    def _cerrar_silencioso(self, conn):
+        try:
+            self._cerrar_conexion(conn)
+        except Exception:
+            pass
@@ -0,0 +1,110 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir rutas para imports locales ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta src
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+# Variante -> (argumentos de save_model, mmap_mode de load_model)
+VARIANTES = {
+    "joblib comprimido": ({"compress": 3}, None),
+    "joblib sin comprimir": ({"compress": 0}, None),
+    "joblib mmap": ({"compress": 0}, "r"),
+    "compacto mmap": ({"compress": 0, "compact": True}, "r"),
+}
+
+
+def generar_datos(n_filas, semilla=42):
+    """Datos con las columnas de clima/contaminación que usa ModeloML"""
+    rng = np.random.default_rng(semilla)
+    df = pd.DataFrame({
+        "pm10": rng.gamma(4, 5, n_filas),
+        "CO": rng.normal(600, 80, n_filas),
+        "NO2": rng.normal(20, 5, n_filas),
+        "O3": rng.normal(30, 8, n_filas),
+        "TempMax": rng.normal(26, 2, n_filas),
+        "TempMin": rng.normal(17, 2, n_filas),
+        "Precipitacion": rng.gamma(2, 60, n_filas),
+        "Mes": rng.integers(1, 13, n_filas),
+    })
+    df["pm2_5"] = 0.5 * df["pm10"] + 0.01 * df["CO"] - 0.02 * df["Precipitacion"] + rng.normal(0, 1, n_filas)
+    return df
+
+
+def rss_mb():
+    """Memoria residente actual del proceso (Linux); None si no está disponible"""
+    try:
+        with open("/proc/self/status") as f:
+            for linea in f:
+                if linea.startswith("VmRSS:"):
+                    return int(linea.split()[1]) / 1024
+    except OSError:
+        return None
+
+
+def medir_carga(ruta, mmap_mode):
+    """Se ejecuta en un proceso nuevo: mide carga en frío, memoria y latencia de predict"""
+    from modelos.ModeloML import ModeloML  # Import previo para no medir el import de sklearn
+
+    rss_antes = rss_mb()
+    inicio = time.perf_counter()
+    modelo = ModeloML(pd.DataFrame())
+    modelo.load_model(ruta, mmap_mode=mmap_mode)
+    carga = time.perf_counter() - inicio
+    rss_despues = rss_mb()
+
+    X = modelo.preprocesador.transform(generar_datos(1000, semilla=7))
+    inicio = time.perf_counter()
+    for _ in range(20):
+        modelo.model.predict(X[:1])
+    una_fila = (time.perf_counter() - inicio) / 20
+    inicio = time.perf_counter()
+    modelo.model.predict(X)
+    mil_filas = time.perf_counter() - inicio
+    return {
+        "carga_s": carga,
+        "rss_mb": rss_despues - rss_antes if rss_antes is not None else None,
+        "predict_1_ms": una_fila * 1000,
+        "predict_1000_ms": mil_filas * 1000,
+    }
+
+
+def main(n_filas=20_000, n_arboles=100):
+    from modelos.ModeloML import ModeloML
+
+    print(f"Benchmark de artefactos de modelo (RandomForest de {n_arboles} árboles, {n_filas} filas)")
+    modelo = ModeloML(generar_datos(n_filas))
+    modelo.prepare_data()
+    modelo.model = modelo._build_estimator("RandomForest", n_jobs=-1, n_estimators=n_arboles)
+    modelo.model.fit(modelo.preprocesador.transform(modelo.X_train), modelo.y_train)
+
+    print(f"{'variante':>22} {'MB':>8} {'carga s':>9} {'RSS MB':>8} {'1 fila ms':>10} {'1000 filas ms':>14}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for nombre, (opciones_guardado, mmap_mode) in VARIANTES.items():
+            ruta = os.path.join(carpeta, f"{nombre.replace(' ', '_')}.joblib")
+            modelo.save_model(ruta, **opciones_guardado)
+            # Proceso nuevo por variante: carga en frío y RSS sin interferencia de las demás
+            salida = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--medir", ruta, mmap_mode or ""],
+                capture_output=True, text=True, check=True,
+            ).stdout
+            r = json.loads(salida.strip().splitlines()[-1])
+            megas = os.path.getsize(ruta) / 1e6
+            rss = f"{r['rss_mb']:>8.1f}" if r["rss_mb"] is not None else f"{'-':>8}"
+            print(f"{nombre:>22} {megas:>8.2f} {r['carga_s']:>9.3f} {rss} "
+                  f"{r['predict_1_ms']:>10.2f} {r['predict_1000_ms']:>14.2f}")
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1 and sys.argv[1] == "--medir":
+        print(json.dumps(medir_carga(sys.argv[2], sys.argv[3] or None)))
+    else:
+        main()
@@ -0,0 +1,46 @@
+import os
+import sys
+import tempfile
+import time
+
+# --- Añadir rutas para imports locales ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta src
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from benchmarks.bench_insercion import generar_peajes
+from helpers.Utilidades import Utilidades
+
+FORMATOS = ("csv", "parquet", "arrow")
+COLUMNAS_PROYECCION = ["Año", "Total"]
+
+
+def cronometrar(funcion, repeticiones=3):
+    """Mejor tiempo (s) de varias ejecuciones"""
+    mejor = float("inf")
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        funcion()
+        mejor = min(mejor, time.perf_counter() - inicio)
+    return mejor
+
+
+def main(tamanos=(10_000, 100_000, 1_000_000)):
+    print("Benchmark de formatos de data/processed (CSV vs Parquet vs Arrow IPC)")
+    print(f"{'filas':>10} {'formato':>8} {'MB':>8} {'escritura s':>12} "
+          f"{'lectura s':>10} {'2 columnas s':>13}")
+    with tempfile.TemporaryDirectory() as carpeta:
+        for n in tamanos:
+            df = generar_peajes(n)
+            for formato in FORMATOS:
+                ruta = Utilidades.ruta_con_formato(os.path.join(carpeta, f"peajes_{n}.csv"), formato)
+                escritura = cronometrar(lambda: Utilidades.escribir_tabla(df, ruta, formato), 1)
+                lectura = cronometrar(lambda: Utilidades.leer_tabla(ruta))
+                proyeccion = cronometrar(lambda: Utilidades.leer_tabla(ruta, columnas=COLUMNAS_PROYECCION))
+                megas = os.path.getsize(ruta) / 1e6
+                print(f"{n:>10} {formato:>8} {megas:>8.2f} {escritura:>12.3f} "
+                      f"{lectura:>10.3f} {proyeccion:>13.3f}")
+
+
+if __name__ == "__main__":
+    main()
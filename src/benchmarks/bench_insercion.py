@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir rutas para imports locales ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta src
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from basedatos.Backends import BackendSQLite
+from basedatos.GestorBaseDatos import GestorBaseDatos
+
+
+def generar_peajes(n_filas, semilla=42):
+    """Genera un DataFrame con la misma forma que el CSV de peajes de CONAVI"""
+    rng = np.random.default_rng(semilla)
+    meses = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+             "Agosto", "Setiembre", "Octubre", "Noviembre", "Diciembre"]
+    puestos = ["Zurquí", "Tres Ríos", "Alajuela"]
+    df = pd.DataFrame({
+        "Año": rng.integers(2003, 2025, n_filas),
+        "Mes": rng.choice(meses, n_filas),
+        "Puesto de Peaje": rng.choice(puestos, n_filas),
+        "Liviano": rng.integers(50_000, 150_000, n_filas).astype(float),
+        "Dos Tres Ejes": rng.integers(5_000, 20_000, n_filas).astype(float),
+        "Furgón": rng.integers(10_000, 30_000, n_filas).astype(float),
+        "Motocicletas": rng.integers(2_000, 10_000, n_filas).astype(float),
+        "Autobus": rng.integers(2_000, 10_000, n_filas).astype(float),
+    })
+    df["Total"] = df[["Liviano", "Dos Tres Ejes", "Furgón", "Motocicletas", "Autobus"]].sum(axis=1)
+    return df
+
+
+def gestor_sqlite(df, tabla):
+    """Crea un GestorBaseDatos conectado a SQLite en memoria con la tabla destino"""
+    gestor = GestorBaseDatos(backend=BackendSQLite(":memory:"))
+    gestor.conectar()
+    gestor.crear_tabla_desde_dataframe(df, tabla)
+    return gestor
+
+
+def medir(df, chunk_size, commit_cada=None, tabla="FlujoVehicular"):
+    """Inserta df en SQLite y devuelve (segundos, filas/s)"""
+    gestor = gestor_sqlite(df, tabla)
+    inicio = time.perf_counter()
+    gestor.insertar_dataframe(df, tabla, chunk_size=chunk_size, commit_cada=commit_cada)
+    duracion = time.perf_counter() - inicio
+    insertadas = int(gestor.consultar(f"SELECT COUNT(*) AS n FROM {tabla}")["n"].iloc[0])
+    assert insertadas == len(df), f"Se esperaban {len(df)} filas y hay {insertadas}"
+    gestor.cerrar()
+    return duracion, len(df) / duracion
+
+
+def main(tamanos=(1_000, 10_000, 100_000)):
+    print("Benchmark de insertar_dataframe contra SQLite en memoria")
+    print(f"{'filas':>10} {'chunk':>8} {'segundos':>10} {'filas/s':>12}")
+    for n in tamanos:
+        df = generar_peajes(n)
+        for chunk in (1, 1_000, 10_000):
+            duracion, velocidad = medir(df, chunk_size=chunk)
+            print(f"{n:>10} {chunk:>8} {duracion:>10.3f} {velocidad:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
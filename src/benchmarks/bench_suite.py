@@ -0,0 +1,382 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir rutas para imports locales ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta src
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from benchmarks import generadores
+from api.ClienteAPI import REDUCTORES_CLIMA, ClienteAPI
+from basedatos.Backends import BackendSQLite
+from basedatos.GestorBaseDatos import GestorBaseDatos
+from datos.AgregadorTemporal import AgregadorTemporal
+from datos.CapaGeografica import CapaGeografica
+from datos.CargadorContaminacion import CargadorContaminacion
+from datos.GestorDatos import GestorDatos
+from datos.IntegradorDatos import IntegradorDatos
+from eda.ProcesadorEDA import ProcesadorEDA
+from modelos.ModeloML import ModeloML
+
+RUTA_BASE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+ESCALAS = (10, 100)  # 1000 (~730 mil filas de peajes) se pide con --escalas: tarda unos minutos
+TOLERANCIA_TIEMPO = 0.5  # +50 % sobre la línea base (ya ajustada por la calibración de la máquina)
+TOLERANCIA_MEMORIA = 0.25
+MARGEN_SEGUNDOS = 0.005  # Diferencias menores son ruido del reloj, no regresiones
+MARGEN_MB = 1.0
+
+CONTAMINANTES = ["pm10", "pm2_5", "CO", "NO2", "O3"]
+
+
+class Escenario:
+    def __init__(self, escala, carpeta, url_era5):
+        """
+        Datos sintéticos de una escala, generados una vez y compartidos por los componentes.
+        Las entradas de cada componente se preparan fuera de la medición con el propio código
+        del proyecto, así cada componente mide solo su trabajo.
+        url_era5 es el ServidorERA5 local al que apunta ClienteAPI.
+        """
+        self.escala = escala
+        self.url_era5 = url_era5
+        self.carpeta = carpeta
+        self.ruta_peajes = generadores.escribir_peajes_csv(os.path.join(carpeta, f"peajes_x{escala}.csv"), escala)
+        self.ubicaciones = generadores.ubicaciones(escala)
+        self.contaminacion_diaria = generadores.contaminacion_diaria(escala)
+        self._cache = {}
+
+    def _una_vez(self, nombre, calcular):
+        if nombre not in self._cache:
+            with contextlib.redirect_stdout(io.StringIO()):
+                self._cache[nombre] = calcular()
+        return self._cache[nombre]
+
+    def ruta_contaminacion_json(self):
+        """Mediciones diarias como arreglo JSON (la forma de code.json con Estacion y Fecha)"""
+        def calcular():
+            ruta = os.path.join(self.carpeta, f"contaminacion_x{self.escala}.json")
+            self.contaminacion_diaria.to_json(ruta, orient="records", date_format="iso")
+            return ruta
+        return self._una_vez("contaminacion_json", calcular)
+
+    def peajes_limpios(self):
+        def calcular():
+            gestor = GestorDatos(self.ruta_peajes)
+            gestor.cargar()
+            return gestor.limpiar()
+        return self._una_vez("peajes", calcular)
+
+    def clima_diario(self):
+        def calcular():
+            return pd.concat([pd.DataFrame(generadores.clima_diario(lat, lon)["daily"]).assign(Ubicacion=nombre)
+                              for nombre, (lat, lon) in self.ubicaciones.items()], ignore_index=True)
+        return self._una_vez("clima_diario", calcular)
+
+    def clima_por_ubicacion(self):
+        """Clima mensual por ubicación, como lo devuelve ClienteAPI con varias ubicaciones"""
+        def calcular():
+            return AgregadorTemporal(REDUCTORES_CLIMA, por=["Ubicacion"]).agregar(
+                self.clima_diario(), columna_fecha="time")
+        return self._una_vez("clima_por_ubicacion", calcular)
+
+    def clima_mensual(self):
+        """Promedio de las ubicaciones por mes, la forma que espera IntegradorDatos"""
+        def calcular():
+            return self.clima_por_ubicacion().drop(columns=["Ubicacion"]).groupby(
+                ["Anio", "Mes"], as_index=False).mean()
+        return self._una_vez("clima_mensual", calcular)
+
+    def capa_geografica(self):
+        """Peajes, estaciones y ubicaciones de clima con coordenadas sintéticas dentro de la GAM"""
+        def calcular():
+            peajes = self.peajes_limpios()
+            estaciones = self.contaminacion_diaria["Estacion"].unique()
+            return CapaGeografica.desde_tablas(
+                peajes, self.contaminacion_diaria, self.clima_por_ubicacion(),
+                ubicaciones_peajes=generadores.coordenadas(peajes["Puesto de Peaje"].unique(), semilla=1),
+                ubicaciones_estaciones=generadores.coordenadas(estaciones, semilla=2),
+                ubicaciones_clima=self.ubicaciones)
+        return self._una_vez("capa_geografica", calcular)
+
+    def contaminacion_mensual(self, por_estacion=False):
+        def calcular():
+            por = ["Estacion"] if por_estacion else None
+            return AgregadorTemporal({c: "mean" for c in CONTAMINANTES}, por=por).agregar(
+                self.contaminacion_diaria, columna_fecha="Fecha")
+        return self._una_vez(f"contaminacion_{por_estacion}", calcular)
+
+    def tabla_modelo(self):
+        """Una fila por (estación, mes) con clima y tráfico del mes: 48 * escala filas"""
+        def calcular():
+            trafico = IntegradorDatos(por_puesto=False).trafico_mensual(self.peajes_limpios())
+            tabla = self.contaminacion_mensual(por_estacion=True).merge(self.clima_mensual(), on=["Anio", "Mes"])
+            return tabla.merge(trafico[["Anio", "Mes", "Total", "Liviano"]], on=["Anio", "Mes"], how="left")
+        return self._una_vez("tabla_modelo", calcular)
+
+
+# --- Componentes: cada uno recibe el escenario y devuelve (función a medir, filas procesadas) ---
+
+def componente_peajes(escenario):
+    """Lectura del CSV crudo y limpieza (GestorDatos.cargar + limpiar)"""
+    def ejecutar():
+        gestor = GestorDatos(escenario.ruta_peajes)
+        gestor.cargar()
+        return gestor.limpiar()
+    return ejecutar, len(escenario.peajes_limpios())
+
+
+def componente_clima(escenario):
+    """ClienteAPI contra el servidor ERA5 local: peticiones, parseo JSON y agregación mensual"""
+    def ejecutar():
+        carpeta_cache = tempfile.mkdtemp(dir=escenario.carpeta)  # Sin caché: se mide la petición
+        try:
+            return ClienteAPI(ubicaciones=escenario.ubicaciones, url_base=escenario.url_era5,
+                              carpeta_cache=carpeta_cache).obtener_datos()
+        finally:
+            shutil.rmtree(carpeta_cache, ignore_errors=True)
+    return ejecutar, len(escenario.clima_diario())
+
+
+def componente_contaminacion_json(escenario):
+    """Lectura incremental del JSON de contaminación (CargadorContaminacion.cargar)"""
+    ruta = escenario.ruta_contaminacion_json()
+    return (lambda: CargadorContaminacion(ruta).cargar()), len(escenario.contaminacion_diaria)
+
+
+def componente_contaminacion(escenario):
+    """Agregación mensual por estación de las mediciones diarias (AgregadorTemporal)"""
+    agregador = AgregadorTemporal({c: "mean" for c in CONTAMINANTES}, por=["Estacion"])
+    df = escenario.contaminacion_diaria
+    return (lambda: agregador.agregar(df, columna_fecha="Fecha")), len(df)
+
+
+def componente_integracion(escenario):
+    """IntegradorDatos.integrar sin caché (tráfico por puesto incluido)"""
+    clima, contaminacion, peajes = (escenario.clima_mensual(), escenario.contaminacion_mensual(),
+                                    escenario.peajes_limpios())
+    return (lambda: IntegradorDatos().integrar(clima, contaminacion, peajes)), len(peajes)
+
+
+def componente_sqlite(escenario):
+    """GestorBaseDatos.insertar_dataframe de los peajes limpios en SQLite en memoria"""
+    df = escenario.peajes_limpios()
+
+    def ejecutar():
+        gestor = GestorBaseDatos(backend=BackendSQLite(":memory:"))
+        gestor.conectar()
+        gestor.crear_tabla_desde_dataframe(df, "FlujoVehicular")
+        gestor.insertar_dataframe(df, "FlujoVehicular", chunk_size=10_000)
+        gestor.cerrar()
+    return ejecutar, len(df)
+
+
+def componente_eda(escenario):
+    """ResumenEstadistico de los peajes limpios (conteos, momentos, cuantiles, correlación)"""
+    df = escenario.peajes_limpios()
+
+    def ejecutar():
+        procesador = ProcesadorEDA({"peajes": df})
+        return procesador.resumen("peajes").describe()
+    return ejecutar, len(df)
+
+
+def componente_geo(escenario):
+    """CapaGeografica.series en 100 puntos al azar (3 peajes, estaciones y ubicaciones de clima), sin caché"""
+    capa = escenario.capa_geografica()
+    puntos = list(generadores.coordenadas(range(100), semilla=3).values())
+
+    def ejecutar():
+        capa._cache.clear()
+        for punto in puntos:
+            capa.series(punto, k=3)
+    return ejecutar, len(puntos)
+
+
+def componente_modelo(escenario):
+    """ModeloML.prepare_data + train_model (regresión lineal sobre la tabla por estación y mes)"""
+    tabla = escenario.tabla_modelo()
+
+    def ejecutar():
+        modelo = ModeloML(tabla)
+        modelo.prepare_data()
+        modelo.train_model()
+        return modelo
+    return ejecutar, len(tabla)
+
+
+COMPONENTES = {
+    "peajes.limpiar": componente_peajes,
+    "clima.api": componente_clima,
+    "contaminacion.cargar": componente_contaminacion_json,
+    "contaminacion.agregar": componente_contaminacion,
+    "integracion": componente_integracion,
+    "basedatos.sqlite": componente_sqlite,
+    "eda.resumen": componente_eda,
+    "geo.series": componente_geo,
+    "modelo.train": componente_modelo,
+}
+
+
+def calibrar(repeticiones=5):
+    """
+    Segundos de una carga fija de numpy/pandas. La razón entre la calibración actual y la
+    de la línea base escala los tiempos esperados, para comparar entre máquinas distintas.
+    """
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({"g": rng.integers(0, 1000, 200_000), "x": rng.normal(size=200_000)})
+    tiempos = []
+    for _ in range(repeticiones):
+        inicio = time.perf_counter()
+        df.groupby("g")["x"].agg(["mean", "std"])
+        np.sort(df["x"].to_numpy())
+        df.to_csv(io.StringIO(), index=False)
+        tiempos.append(time.perf_counter() - inicio)
+    return min(tiempos)
+
+
+def medir(funcion, repeticiones=3):
+    """
+    Mejor tiempo de `repeticiones` ejecuciones y pico de memoria asignada (tracemalloc,
+    incluye los arrays de numpy/pandas) en una ejecución aparte, para no medir el tiempo con trazas.
+    Una primera ejecución sin medir carga los imports diferidos (sklearn) y calienta cachés.
+    """
+    tiempos = []
+    with contextlib.redirect_stdout(io.StringIO()):
+        funcion()
+        for _ in range(repeticiones):
+            inicio = time.perf_counter()
+            funcion()
+            tiempos.append(time.perf_counter() - inicio)
+        tracemalloc.start()
+        try:
+            funcion()
+            _, pico = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    return min(tiempos), pico / 1024 ** 2
+
+
+def ejecutar_suite(escalas=ESCALAS, componentes=None, repeticiones=3):
+    """
+    Mide cada componente en cada escala.
+
+    Returns:
+        dict: {"componente@xN": {"segundos", "pico_mb", "filas"}}
+    """
+    componentes = componentes or list(COMPONENTES)
+    resultados = {}
+    with generadores.ServidorERA5() as url, tempfile.TemporaryDirectory() as carpeta:
+        for escala in escalas:
+            escenario = Escenario(escala, carpeta, url)
+            for nombre in componentes:
+                funcion, filas = COMPONENTES[nombre](escenario)
+                segundos, pico_mb = medir(funcion, repeticiones)
+                resultados[f"{nombre}@x{escala}"] = {"segundos": segundos, "pico_mb": pico_mb, "filas": filas}
+                print(f"{nombre:>22} x{escala:<5} {filas:>10,} filas {segundos:>9.3f} s {pico_mb:>9.1f} MB")
+    return resultados
+
+
+def comparar(resultados, base, calibracion, tolerancia_tiempo=TOLERANCIA_TIEMPO,
+             tolerancia_memoria=TOLERANCIA_MEMORIA):
+    """
+    Compara contra la línea base. Los tiempos esperados se escalan por la razón entre la
+    calibración actual y la guardada con cada resultado.
+
+    Returns:
+        list: Claves con regresión de tiempo o memoria.
+    """
+    print(f"\n--- Comparación con la línea base (calibración actual {calibracion:.3f} s) ---")
+    print(f"{'componente':>30} {'s':>9} {'s base':>9} {'MB':>8} {'MB base':>8}  estado")
+    regresiones = []
+    for clave, actual in resultados.items():
+        previo = base["resultados"].get(clave)
+        if previo is None:
+            print(f"{clave:>30} {actual['segundos']:>9.3f} {'-':>9} {actual['pico_mb']:>8.1f} {'-':>8}  nuevo")
+            continue
+        esperado = previo["segundos"] * calibracion / previo.get("calibracion", calibracion)
+        problemas = []
+        if actual["segundos"] > esperado * (1 + tolerancia_tiempo) + MARGEN_SEGUNDOS:
+            problemas.append(f"tiempo x{actual['segundos'] / esperado:.2f}")
+        if actual["pico_mb"] > previo["pico_mb"] * (1 + tolerancia_memoria) + MARGEN_MB:
+            problemas.append(f"memoria x{actual['pico_mb'] / previo['pico_mb']:.2f}")
+        if problemas:
+            regresiones.append(clave)
+        estado = "REGRESIÓN (" + ", ".join(problemas) + ")" if problemas else "ok"
+        print(f"{clave:>30} {actual['segundos']:>9.3f} {esperado:>9.3f} "
+              f"{actual['pico_mb']:>8.1f} {previo['pico_mb']:>8.1f}  {estado}")
+    return regresiones
+
+
+def leer_base(ruta):
+    try:
+        with open(ruta, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def guardar_base(ruta, resultados, calibracion):
+    """Actualiza la línea base; las claves no medidas en esta ejecución se conservan"""
+    base = leer_base(ruta) or {"resultados": {}}
+    base["resultados"].update({clave: dict(r, calibracion=calibracion) for clave, r in resultados.items()})
+    base.update(python=platform.python_version(),
+                pandas=pd.__version__, numpy=np.__version__, maquina=platform.machine())
+    with open(ruta, "w", encoding="utf-8") as f:
+        json.dump(base, f, indent=2, sort_keys=True)
+    print(f"\nLínea base guardada en: {ruta}")
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Benchmarks por componente con datos sintéticos a escala")
+    parser.add_argument("--escalas", type=int, nargs="+", default=list(ESCALAS),
+                        help="Múltiplos del volumen real (p. ej. 10 100 1000)")
+    parser.add_argument("--componentes", nargs="+", choices=list(COMPONENTES), help="Solo estos componentes")
+    parser.add_argument("--repeticiones", type=int, default=3)
+    parser.add_argument("--base", default=RUTA_BASE, help="JSON de la línea base")
+    parser.add_argument("--guardar-base", action="store_true",
+                        help="Guardar los resultados como nueva línea base en lugar de comparar")
+    parser.add_argument("--tolerancia-tiempo", type=float, default=TOLERANCIA_TIEMPO)
+    parser.add_argument("--tolerancia-memoria", type=float, default=TOLERANCIA_MEMORIA)
+    parser.add_argument("--salida", help="Guardar también los resultados de esta ejecución en un JSON")
+    return parser
+
+
+def main(argv=None):
+    """Devuelve 0 si no hay regresiones (o si se guardó la línea base) y 1 si las hay"""
+    args = crear_parser().parse_args(argv)
+    calibracion = calibrar()
+    print(f"Calibración de la máquina: {calibracion:.3f} s")
+    resultados = ejecutar_suite(args.escalas, args.componentes, args.repeticiones)
+
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump({"calibracion": calibracion, "resultados": resultados}, f, indent=2)
+    if args.guardar_base:
+        guardar_base(args.base, resultados, calibracion)
+        return 0
+
+    base = leer_base(args.base)
+    if base is None:
+        print(f"\nNo hay línea base en {args.base}; ejecute con --guardar-base para crearla")
+        return 0
+    regresiones = comparar(resultados, base, calibracion, args.tolerancia_tiempo, args.tolerancia_memoria)
+    if regresiones:
+        print(f"\n{len(regresiones)} regresiones: {', '.join(regresiones)}")
+        return 1
+    print("\nSin regresiones")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,215 @@
+import csv
+import json
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+# Volúmenes de los datos reales (escala 1): CSV de CONAVI, clima ERA5 de una coordenada
+# y contaminación de una estación, en el rango 2020-2023 que usa el pipeline
+FILAS_PEAJES_BASE = 732
+FECHA_INICIO = "2020-01-01"
+FECHA_FIN = "2023-12-31"
+
+MESES = ["Enero", "Febrero", "Marzo", "Abril", "Mayo", "Junio", "Julio",
+         "Agosto", "Setiembre", "Octubre", "Noviembre", "Diciembre"]
+PUESTOS_REALES = ["Zurquí", "Tres Ríos", "Alajuela", "Naranjo"]
+COBERTURA_REAL = [21, 21, 10, 9]  # Años por puesto en el CSV (Naranjo se descarta al limpiar)
+COLUMNAS_PEAJES = ["Año", "Mes", "Puesto de Peaje", "Liviano", "Dos Tres Ejes", "Cuatro Ejes",
+                   "Furgón", "Motocicletas", "Autobus", "Total"]
+
+
+def peajes_crudo(escala=1, semilla=42):
+    """
+    DataFrame con la forma del CSV original de CONAVI: meses con espacios de relleno,
+    'Cuatro Ejes' vacío, Naranjo incluido y conteos como texto.
+    732 * escala filas: los cuatro puestos reales con su cobertura real y luego
+    puestos sintéticos con entre 9 y 21 años hacia atrás desde 2024.
+    """
+    rng = np.random.default_rng(semilla)
+    objetivo = FILAS_PEAJES_BASE * escala
+    puesto, anio, mes = [], [], []
+    i = 0
+    while len(puesto) < objetivo:
+        if i < len(PUESTOS_REALES):
+            nombre, anios = PUESTOS_REALES[i], COBERTURA_REAL[i]
+        else:
+            nombre, anios = f"Puesto {i - len(PUESTOS_REALES) + 1:04d}", int(rng.integers(9, 22))
+        periodos = np.arange(min(anios * 12, objetivo - len(puesto)))
+        puesto.extend([nombre] * len(periodos))
+        anio.extend((2024 - periodos // 12).tolist())
+        mes.extend((11 - periodos % 12).tolist())
+        i += 1
+
+    n = len(puesto)
+    estacional = 1 + 0.1 * np.sin(2 * np.pi * np.asarray(mes) / 12)
+    conteos = {
+        "Liviano": rng.normal(110_000, 25_000, n) * estacional,
+        "Dos Tres Ejes": rng.normal(15_000, 4_000, n),
+        "Furgón": rng.normal(22_000, 6_000, n),
+        "Motocicletas": rng.normal(6_000, 2_000, n),
+        "Autobus": rng.normal(6_500, 1_500, n),
+    }
+    conteos = {col: np.clip(valores, 0, None).round().astype("int64") for col, valores in conteos.items()}
+    total = sum(conteos.values())
+    df = pd.DataFrame({
+        "Año": np.asarray(anio).astype(str),
+        "Mes": [MESES[m].ljust(10) for m in mes],
+        "Puesto de Peaje": puesto,
+        **{col: valores.astype(str) for col, valores in conteos.items()},
+        "Total": total.astype(str),
+    })
+    df["Cuatro Ejes"] = ""
+    return df[COLUMNAS_PEAJES]
+
+
+def escribir_peajes_csv(ruta, escala=1, semilla=42):
+    """Escribe el CSV con todas las celdas entre comillas, como el archivo de datos abiertos"""
+    peajes_crudo(escala, semilla).to_csv(ruta, index=False, quoting=csv.QUOTE_ALL, encoding="utf-8")
+    return ruta
+
+
+def ubicaciones(escala):
+    """escala coordenadas dentro de la GAM, como {nombre: (lat, lon)} para ClienteAPI"""
+    return coordenadas([f"U{i:04d}" for i in range(escala)], semilla=escala)
+
+
+def coordenadas(nombres, semilla=0):
+    """Coordenadas al azar dentro de la GAM para cada nombre (puestos o estaciones sintéticos)"""
+    rng = np.random.default_rng(semilla)
+    lat = 9.93 + rng.uniform(-0.15, 0.15, len(nombres))
+    lon = -84.09 + rng.uniform(-0.25, 0.25, len(nombres))
+    return {nombre: (round(float(a), 4), round(float(o), 4)) for nombre, a, o in zip(nombres, lat, lon)}
+
+
+def clima_diario(latitud, longitud, fecha_inicio=FECHA_INICIO, fecha_fin=FECHA_FIN):
+    """Respuesta con la forma de la API ERA5 de Open-Meteo (daily) para una coordenada"""
+    fechas = pd.date_range(fecha_inicio, fecha_fin, freq="D")
+    semilla = zlib.crc32(f"{latitud:.4f},{longitud:.4f}".encode())
+    rng = np.random.default_rng(semilla)
+    n = len(fechas)
+    dia = fechas.dayofyear.to_numpy()
+    lluvia = (dia > 120) & (dia < 320)  # Estación lluviosa de mayo a noviembre
+    tmax = 26 + 2 * np.sin(2 * np.pi * (dia - 60) / 365) + rng.normal(0, 1.2, n)
+    tmin = tmax - 8 + rng.normal(0, 1, n)
+    precip = np.where(rng.random(n) < np.where(lluvia, 0.7, 0.15), rng.gamma(1.5, 8, n), 0.0)
+    return {
+        "latitude": latitud,
+        "longitude": longitud,
+        "daily_units": {"time": "iso8601", "temperature_2m_max": "°C",
+                        "temperature_2m_min": "°C", "precipitation_sum": "mm"},
+        "daily": {
+            "time": fechas.strftime("%Y-%m-%d").tolist(),
+            "temperature_2m_max": tmax.round(1).tolist(),
+            "temperature_2m_min": tmin.round(1).tolist(),
+            "precipitation_sum": precip.round(1).tolist(),
+        },
+    }
+
+
+def contaminacion_diaria(escala=1, semilla=42):
+    """Mediciones diarias por estación (escala estaciones) con las columnas de code.json"""
+    rng = np.random.default_rng(semilla)
+    fechas = pd.date_range(FECHA_INICIO, FECHA_FIN, freq="D")
+    n_dias = len(fechas)
+    n = n_dias * escala
+    base_estacion = np.repeat(rng.gamma(4, 5, escala), n_dias)
+    pm10 = np.clip(base_estacion + rng.normal(0, 4, n), 1, None)
+    df = pd.DataFrame({
+        "Estacion": np.repeat([f"E{i:04d}" for i in range(escala)], n_dias),
+        "Fecha": np.tile(fechas.to_numpy(), escala),
+        "pm10": pm10,
+        "pm2_5": 0.45 * pm10 + rng.normal(0, 1.5, n),
+        "CO": rng.normal(600, 80, n),
+        "NO2": rng.normal(20, 5, n),
+        "O3": rng.normal(30, 8, n),
+    })
+    return df
+
+
+class ServidorERA5:
+    """
+    Servidor HTTP local que responde como la API ERA5 con datos de clima_diario.
+    Se usa como contexto: `with ServidorERA5() as url: ClienteAPI(url_base=url, ...)`.
+    Cada respuesta se genera una sola vez y se guarda ya serializada, para que al repetir
+    una medición el tiempo sea el del cliente y no el de generar los datos.
+
+    Para las pruebas de ClienteAPI: `fallos` primeras peticiones responden 503, `demora`
+    segundos de espera por respuesta, y se cuentan las peticiones por rango y las simultáneas.
+    """
+
+    def __init__(self, fallos=0, demora=0.0):
+        self.servidor = None
+        self.hilo = None
+        self.fallos = fallos
+        self.demora = demora
+        self.peticiones = 0
+        self.por_rango = {}  # (start_date, end_date) -> peticiones respondidas con 200
+        self.simultaneas = 0
+        self.max_simultaneas = 0
+        self._respuestas = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        padre = self
+
+        class Manejador(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                clave = (params["latitude"], params["longitude"], params["start_date"], params["end_date"])
+                with padre._lock:
+                    padre.peticiones += 1
+                    fallar = padre.peticiones <= padre.fallos
+                    padre.simultaneas += 1
+                    padre.max_simultaneas = max(padre.max_simultaneas, padre.simultaneas)
+                try:
+                    if padre.demora:
+                        time.sleep(padre.demora)
+                    if fallar:
+                        self.send_error(503)
+                        return
+                    cuerpo = padre._respuestas.get(clave)
+                    if cuerpo is None:
+                        cuerpo = json.dumps(clima_diario(float(clave[0]), float(clave[1]), *clave[2:])).encode()
+                        padre._respuestas[clave] = cuerpo
+                    with padre._lock:
+                        padre.por_rango[clave[2:]] = padre.por_rango.get(clave[2:], 0) + 1
+                finally:
+                    with padre._lock:
+                        padre.simultaneas -= 1
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(cuerpo)))
+                self.end_headers()
+                self.wfile.write(cuerpo)
+
+            def log_message(self, *args):
+                pass
+
+        self.servidor = ThreadingHTTPServer(("127.0.0.1", 0), Manejador)
+        self.hilo = threading.Thread(target=self.servidor.serve_forever, daemon=True)
+        self.hilo.start()
+        return f"http://127.0.0.1:{self.servidor.server_address[1]}/v1/era5"
+
+    def __exit__(self, *exc):
+        self.servidor.shutdown()
+        self.servidor.server_close()
+        self.hilo.join()
+
+
+def main(escalas=(1, 10)):
+    """Muestra el tamaño de los datos generados por escala"""
+    for escala in escalas:
+        peajes = peajes_crudo(escala)
+        contaminacion = contaminacion_diaria(escala)
+        dias = len(clima_diario(*next(iter(ubicaciones(escala).values())))["daily"]["time"])
+        print(f"x{escala}: peajes {len(peajes):,} filas ({peajes['Puesto de Peaje'].nunique()} puestos), "
+              f"clima {dias * escala:,} días-ubicación, contaminación {len(contaminacion):,} filas")
+
+
+if __name__ == "__main__":
+    main()
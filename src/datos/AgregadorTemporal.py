@@ -0,0 +1,195 @@
+import unicodedata
+
+import numpy as np
+import pandas as pd
+
+# Nombre de mes (sin tildes, en minúscula) -> número. Incluye la forma "setiembre"
+# que usa el CSV de CONAVI y abreviaturas de tres letras.
+MESES = {
+    "enero": 1, "febrero": 2, "marzo": 3, "abril": 4, "mayo": 5, "junio": 6,
+    "julio": 7, "agosto": 8, "setiembre": 9, "septiembre": 9, "octubre": 10,
+    "noviembre": 11, "diciembre": 12,
+    "ene": 1, "feb": 2, "mar": 3, "abr": 4, "may": 5, "jun": 6, "jul": 7,
+    "ago": 8, "set": 9, "sep": 9, "oct": 10, "nov": 11, "dic": 12,
+}
+
+GRANULARIDADES = ("mensual", "semanal", "diaria")
+
+
+class AgregadorTemporal:
+    def __init__(self, reductores, granularidad="mensual", por=None):
+        """
+        Agregación por periodo con NumPy (bincount/ufunc.at sobre códigos de periodo).
+
+        Args:
+            reductores (dict): Columna -> reductor: 'sum', 'mean', 'min', 'max', 'count'
+                               o percentil 'p50', 'p90', ... También {columna_salida: (columna, reductor)}.
+            granularidad (str): 'mensual', 'semanal' o 'diaria'.
+            por (list, optional): Columnas adicionales de agrupación, p. ej. ["Puesto de Peaje"].
+        """
+        if granularidad not in GRANULARIDADES:
+            raise ValueError(f"Granularidad no soportada: {granularidad}. Opciones: {', '.join(GRANULARIDADES)}")
+        self.reductores = _normalizar_reductores(reductores)
+        self.granularidad = granularidad
+        self.por = list(por or [])
+
+    def agregar(self, df, columna_fecha=None, columna_anio="Anio", columna_mes="Mes"):
+        """
+        Agrega df por periodo (y por las columnas de self.por).
+
+        Args:
+            df (pd.DataFrame): Datos de entrada.
+            columna_fecha (str, optional): Columna de fechas; si no se indica se usan año y mes.
+            columna_anio (str): Columna de año (sin columna_fecha).
+            columna_mes (str): Columna de mes, numérica o nombre en español (sin columna_fecha).
+
+        Returns:
+            pd.DataFrame: Una fila por grupo, ordenada por (por..., periodo). Los NaN se ignoran.
+        """
+        if columna_fecha is not None:
+            codigos = self.codigo_periodo(fechas=df[columna_fecha], granularidad=self.granularidad)
+        else:
+            codigos = self.codigo_periodo(anios=df[columna_anio], meses=df[columna_mes],
+                                          granularidad=self.granularidad)
+
+        # Clave de grupo: cada columna "por" se factoriza y se combina con el periodo
+        claves = [pd.factorize(df[col], sort=True, use_na_sentinel=False) for col in self.por]
+        periodos, cod_periodo = np.unique(codigos, return_inverse=True)
+        grupo = cod_periodo.astype("int64")
+        multiplicador = len(periodos)
+        for cod, unicos in reversed(claves):
+            grupo = grupo + cod.astype("int64") * multiplicador
+            multiplicador *= max(len(unicos), 1)
+        grupos, inverso = np.unique(grupo, return_inverse=True)
+        n_grupos = len(grupos)
+
+        # Decodificar la clave compuesta en sus columnas
+        salida = {}
+        resto = grupos
+        divisor = multiplicador
+        for col, (cod, unicos) in zip(self.por, claves):
+            divisor //= max(len(unicos), 1)
+            salida[col] = np.asarray(unicos)[resto // divisor]
+            resto = resto % divisor
+        salida.update(self.columnas_de_periodo(periodos[resto], self.granularidad))
+
+        orden = None
+        for salida_col, (col, reductor) in self.reductores.items():
+            valores = df[col].to_numpy(dtype="float64", na_value=np.nan)
+            if reductor.startswith("p"):
+                if orden is None:
+                    orden = np.argsort(inverso, kind="stable")
+                salida[salida_col] = _percentil_por_grupo(valores, inverso, orden, n_grupos, float(reductor[1:]))
+            else:
+                salida[salida_col] = _reducir(valores, inverso, n_grupos, reductor)
+        return pd.DataFrame(salida)
+
+    @staticmethod
+    def mes_a_numero(meses):
+        """
+        Convierte una serie de meses ("Junio     ", "Setiembre", 6, "06") a enteros 1-12.
+
+        La normalización (strip, minúsculas, sin tildes) se hace una vez por valor
+        distinto, no por fila, así que el costo no depende del número de filas.
+        """
+        meses = pd.Series(meses)
+        if pd.api.types.is_numeric_dtype(meses):
+            return meses.astype("int8")
+        codigos, valores = pd.factorize(meses)
+        if (codigos < 0).any():
+            raise ValueError("Hay meses nulos")
+        tabla = np.array([_mes_de_texto(v) for v in valores], dtype="int8")
+        if (tabla < 0).any():
+            invalidos = [v for v, n in zip(valores, tabla) if n < 0]
+            raise ValueError(f"Meses no reconocidos: {invalidos}")
+        return pd.Series(tabla[codigos], index=meses.index, name=meses.name)
+
+    @staticmethod
+    def codigo_periodo(fechas=None, anios=None, meses=None, granularidad="mensual"):
+        """
+        Código entero y ordenable de periodo para cada fila.
+
+        - mensual: anio * 100 + mes (p. ej. 202406)
+        - semanal: anio ISO * 100 + semana ISO
+        - diaria: días desde 1970-01-01
+
+        Se puede pasar una serie de fechas o, para datos mensuales, columnas de año y mes
+        (el mes puede venir como nombre en español).
+        """
+        if fechas is None:
+            if granularidad != "mensual":
+                raise ValueError("Sin fechas solo se puede agregar de forma mensual")
+            return (np.asarray(anios, dtype="int64") * 100
+                    + AgregadorTemporal.mes_a_numero(meses).to_numpy(dtype="int64"))
+
+        fechas = pd.to_datetime(pd.Series(fechas))
+        if granularidad == "mensual":
+            return fechas.dt.year.to_numpy(dtype="int64") * 100 + fechas.dt.month.to_numpy(dtype="int64")
+        if granularidad == "semanal":
+            iso = fechas.dt.isocalendar()
+            return iso["year"].to_numpy(dtype="int64") * 100 + iso["week"].to_numpy(dtype="int64")
+        return fechas.to_numpy(dtype="datetime64[D]").astype("int64")
+
+    @staticmethod
+    def columnas_de_periodo(codigos, granularidad="mensual"):
+        """Convierte códigos de periodo de vuelta a columnas legibles"""
+        codigos = np.asarray(codigos, dtype="int64")
+        if granularidad == "mensual":
+            return {"Anio": codigos // 100, "Mes": codigos % 100}
+        if granularidad == "semanal":
+            return {"Anio": codigos // 100, "Semana": codigos % 100}
+        return {"Fecha": codigos.astype("datetime64[D]")}
+
+
+def _normalizar_reductores(reductores):
+    normalizados = {}
+    for salida, spec in reductores.items():
+        col, reductor = (salida, spec) if isinstance(spec, str) else spec
+        if reductor not in ("sum", "mean", "min", "max", "count") and not _es_percentil(reductor):
+            raise ValueError(f"Reductor no soportado para '{salida}': {reductor}")
+        normalizados[salida] = (col, reductor)
+    return normalizados
+
+
+def _es_percentil(reductor):
+    return reductor.startswith("p") and reductor[1:].replace(".", "", 1).isdigit()
+
+
+def _reducir(valores, grupos, n_grupos, reductor):
+    validos = ~np.isnan(valores)
+    conteo = np.bincount(grupos, weights=validos, minlength=n_grupos)
+    if reductor == "count":
+        return conteo.astype("int64")
+    if reductor in ("sum", "mean"):
+        suma = np.bincount(grupos, weights=np.where(validos, valores, 0.0), minlength=n_grupos)
+        if reductor == "sum":
+            return suma
+        with np.errstate(invalid="ignore", divide="ignore"):
+            return np.where(conteo > 0, suma / conteo, np.nan)
+    resultado = np.full(n_grupos, np.inf if reductor == "min" else -np.inf)
+    ufunc = np.minimum if reductor == "min" else np.maximum
+    ufunc.at(resultado, grupos[validos], valores[validos])
+    resultado[conteo == 0] = np.nan
+    return resultado
+
+
+def _percentil_por_grupo(valores, grupos, orden, n_grupos, q):
+    """Percentil por grupo con interpolación lineal (como np.percentil), ignorando NaN"""
+    resultado = np.full(n_grupos, np.nan)
+    valores_ordenados = valores[orden]
+    limites = np.searchsorted(grupos[orden], np.arange(n_grupos + 1))
+    for g in range(n_grupos):
+        tramo = valores_ordenados[limites[g]:limites[g + 1]]
+        tramo = tramo[~np.isnan(tramo)]
+        if len(tramo):
+            resultado[g] = np.percentile(tramo, q)
+    return resultado
+
+
+def _mes_de_texto(valor):
+    texto = str(valor).strip().lower()
+    if texto.isdigit():
+        numero = int(texto)
+        return numero if 1 <= numero <= 12 else -1
+    texto = "".join(c for c in unicodedata.normalize("NFKD", texto) if not unicodedata.combining(c))
+    return MESES.get(texto, -1)
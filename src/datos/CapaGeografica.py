@@ -0,0 +1,293 @@
+import math
+
+import numpy as np
+import pandas as pd
+
+from datos.AgregadorTemporal import AgregadorTemporal
+from helpers.Instrumentacion import instrumentar
+
+try:
+    from scipy.spatial import cKDTree  # Índice KD; sin scipy se busca por fuerza bruta con NumPy
+except ImportError:
+    cKDTree = None
+
+# Coordenadas aproximadas (WGS84) de las casetas de peaje de CONAVI del CSV
+PUESTOS_PEAJE = {
+    "Zurquí": (10.0610, -84.0170),  # Ruta 32, Braulio Carrillo
+    "Tres Ríos": (9.9080, -83.9930),  # Ruta 2, Florencio del Castillo
+    "Alajuela": (9.9880, -84.1900),  # Ruta 1, General Cañas
+    "Naranjo": (10.0850, -84.3600),  # Ruta 1, Bernardo Soto
+}
+# La serie de contaminación actual es un promedio de la GAM: un solo punto, la misma coordenada
+# que usa ClienteAPI para el clima
+ESTACIONES_CONTAMINACION = {"GAM": (9.9281, -84.0907)}
+UBICACIONES_CLIMA = {"GAM": (9.9281, -84.0907)}
+
+LATITUD_REFERENCIA = 9.93  # Proyección equirectangular centrada en la GAM (error < 0.1 % en Costa Rica)
+KM_POR_GRADO = 111.32
+DISTANCIA_MINIMA_KM = 0.1  # Evita pesos infinitos cuando la consulta cae sobre un punto
+MAX_CACHE = 1024
+COMBINACIONES = ("media", "suma")
+
+
+class CapaGeografica:
+    def __init__(self):
+        """
+        Puntos con coordenadas (peajes, estaciones de contaminación, ubicaciones de clima),
+        un índice espacial por tipo de punto y la serie mensual de cada punto.
+
+        Las consultas buscan los k puntos más cercanos de cada tipo y combinan sus series por
+        periodo (Anio, Mes): promedio ponderado por distancia inversa (contaminación, clima)
+        o suma (tráfico). Las series se guardan como un arreglo (punto, periodo, columna),
+        así una consulta es un índice KD más una reducción de NumPy.
+        """
+        self.capas = {}
+        self._cache = {}
+
+    @classmethod
+    def desde_tablas(cls, peajes=None, contaminacion=None, clima=None, ubicaciones_peajes=None,
+                     ubicaciones_estaciones=None, ubicaciones_clima=None):
+        """
+        Capa con las tablas procesadas del proyecto.
+
+        Args:
+            peajes (pd.DataFrame, optional): Peajes limpios (Año, Mes, Puesto de Peaje, conteos).
+            contaminacion (pd.DataFrame, optional): Contaminación mensual (Anio, Mes) o por
+                                                    estación (columna Estacion, con Fecha o Anio/Mes).
+            clima (pd.DataFrame, optional): Clima mensual; con columna Ubicacion si hay varias.
+            ubicaciones_peajes (dict, optional): {puesto: (lat, lon)}; por defecto PUESTOS_PEAJE.
+            ubicaciones_estaciones (dict, optional): Por defecto ESTACIONES_CONTAMINACION.
+            ubicaciones_clima (dict, optional): Por defecto UBICACIONES_CLIMA (p. ej. las de ClienteAPI).
+        """
+        capa = cls()
+        if peajes is not None:
+            capa.agregar("peaje", ubicaciones_peajes or PUESTOS_PEAJE, peajes,
+                         columna_nombre="Puesto de Peaje", combinar="suma")
+        if contaminacion is not None:
+            capa.agregar("estacion", ubicaciones_estaciones or ESTACIONES_CONTAMINACION, contaminacion,
+                         columna_nombre="Estacion" if "Estacion" in contaminacion.columns else None)
+        if clima is not None:
+            capa.agregar("clima", ubicaciones_clima or UBICACIONES_CLIMA, clima,
+                         columna_nombre="Ubicacion" if "Ubicacion" in clima.columns else None)
+        return capa
+
+    @instrumentar()
+    def agregar(self, tipo, ubicaciones, datos=None, columna_nombre=None, combinar="media",
+                columna_fecha=None):
+        """
+        Agrega (o reemplaza) los puntos de un tipo y sus series.
+
+        Args:
+            tipo (str): 'peaje', 'estacion', 'clima' u otro.
+            ubicaciones (dict | list): {nombre: (lat, lon)} o lista de (nombre, lat, lon).
+            datos (pd.DataFrame, optional): Mediciones con Anio/Año y Mes, o una columna de fechas;
+                                            se agregan por mes con el reductor de `combinar`.
+            columna_nombre (str, optional): Columna que indica el punto de cada fila. Si es None
+                                            todas las filas son del único punto de `ubicaciones`.
+            combinar (str): 'media' (promedio ponderado por distancia inversa entre puntos
+                            cercanos y media mensual) o 'suma' (totales, p. ej. tráfico).
+            columna_fecha (str, optional): Columna de fechas; por defecto 'Fecha' si existe.
+        """
+        if combinar not in COMBINACIONES:
+            raise ValueError(f"Combinación no soportada: {combinar}. Opciones: {', '.join(COMBINACIONES)}")
+        ubicaciones = _normalizar_ubicaciones(ubicaciones)
+        if not ubicaciones:
+            raise ValueError(f"No hay ubicaciones para '{tipo}'")
+        capa = _Capa(list(ubicaciones), np.array(list(ubicaciones.values()), dtype="float64"), combinar)
+        if datos is not None:
+            capa.cargar_series(datos, columna_nombre, columna_fecha)
+        self.capas[tipo] = capa
+        self._cache.clear()
+        return self
+
+    @instrumentar()
+    def cercanos(self, ubicacion, tipo, k=1, radio_km=None):
+        """
+        Puntos de un tipo más cercanos a una ubicación.
+
+        Args:
+            ubicacion (tuple | str): (lat, lon) o nombre de un punto de la capa.
+            tipo (str): Tipo de punto a buscar.
+            k (int, optional): Cantidad de puntos; con None, todos los que estén dentro de radio_km.
+            radio_km (float, optional): Distancia máxima.
+
+        Returns:
+            pd.DataFrame: nombre, latitud, longitud y distancia_km, del más cercano al más lejano.
+        """
+        capa = self._capa(tipo)
+        indices, distancias = capa.buscar(_proyectar(self._coordenadas(ubicacion)), k, radio_km)
+        return pd.DataFrame({
+            "nombre": np.asarray(capa.nombres, dtype=object)[indices],
+            "latitud": capa.latlon[indices, 0],
+            "longitud": capa.latlon[indices, 1],
+            "distancia_km": distancias,
+        })
+
+    @instrumentar()
+    def series(self, ubicacion, tipos=None, k=1, radio_km=None, columnas=None, como="inner"):
+        """
+        Tabla mensual de una ubicación: la serie combinada de los k puntos más cercanos
+        de cada tipo, unida por (Anio, Mes). Los resultados se guardan en caché por consulta.
+
+        Args:
+            ubicacion (tuple | str): (lat, lon) o nombre de un punto, p. ej. 'Zurquí'.
+            tipos (list, optional): Tipos a incluir; por defecto todos los que tienen series.
+            k (int | dict): Puntos por tipo, o {tipo: k}.
+            radio_km (float, optional): Solo puntos a esta distancia o menos; un tipo sin puntos
+                                        en el radio no aporta columnas.
+            columnas (list, optional): Columnas de salida (además de Anio y Mes).
+            como (str): Unión entre tipos: 'inner' (meses con datos en todos) u 'outer'.
+
+        Returns:
+            pd.DataFrame: Anio, Mes y las columnas de cada tipo (si dos tipos comparten una
+                          columna, la del segundo lleva el sufijo _<tipo>).
+        """
+        tipos = list(tipos) if tipos is not None else [t for t, c in self.capas.items() if c.valores is not None]
+        coordenadas = self._coordenadas(ubicacion)
+        clave = (coordenadas, tuple(tipos), tuple(sorted(k.items())) if isinstance(k, dict) else k,
+                 radio_km, tuple(columnas) if columnas is not None else None, como)
+        if clave not in self._cache:
+            if len(self._cache) >= MAX_CACHE:
+                self._cache.clear()
+            self._cache[clave] = self._calcular_series(coordenadas, tipos, k, radio_km, columnas, como)
+        return self._cache[clave].copy()
+
+    def _calcular_series(self, coordenadas, tipos, k, radio_km, columnas, como):
+        punto = _proyectar(coordenadas)
+        tablas = []
+        vistas = set()
+        for tipo in tipos:
+            capa = self._capa(tipo)
+            if capa.valores is None:
+                raise ValueError(f"La capa '{tipo}' no tiene series")
+            k_tipo = k.get(tipo, 1) if isinstance(k, dict) else k
+            indices, distancias = capa.buscar(punto, k_tipo, radio_km)
+            if len(indices) == 0:
+                continue
+            tabla = pd.DataFrame(capa.combinar_series(indices, distancias), index=capa.periodos,
+                                 columns=[c if c not in vistas else f"{c}_{tipo}" for c in capa.columnas])
+            vistas.update(capa.columnas)
+            tablas.append(tabla.dropna(how="all"))
+
+        if not tablas:
+            resultado = pd.DataFrame(index=pd.Index([], dtype="int64"))
+        else:
+            resultado = tablas[0].join(tablas[1:], how=como) if len(tablas) > 1 else tablas[0]
+            resultado = resultado.sort_index()
+        periodo = AgregadorTemporal.columnas_de_periodo(resultado.index.to_numpy())
+        resultado = resultado.reset_index(drop=True)
+        resultado.insert(0, "Anio", periodo["Anio"])
+        resultado.insert(1, "Mes", periodo["Mes"])
+        if columnas is not None:
+            resultado = resultado[["Anio", "Mes"] + [c for c in columnas if c in resultado.columns]]
+        return resultado
+
+    def _capa(self, tipo):
+        if tipo not in self.capas:
+            raise KeyError(f"No hay puntos de tipo '{tipo}'. Disponibles: {', '.join(self.capas)}")
+        return self.capas[tipo]
+
+    def _coordenadas(self, ubicacion):
+        """(lat, lon) de una tupla o del primer punto con ese nombre"""
+        if isinstance(ubicacion, str):
+            for capa in self.capas.values():
+                if ubicacion in capa.posicion:
+                    lat, lon = capa.latlon[capa.posicion[ubicacion]]
+                    return float(lat), float(lon)
+            raise KeyError(f"Ubicación desconocida: {ubicacion}")
+        lat, lon = ubicacion
+        return float(lat), float(lon)
+
+
+class _Capa:
+    """Puntos de un tipo: coordenadas, índice espacial y series alineadas por periodo"""
+
+    def __init__(self, nombres, latlon, combinar):
+        self.nombres = nombres
+        self.posicion = {nombre: i for i, nombre in enumerate(nombres)}
+        self.latlon = latlon
+        self.xy = _proyectar(latlon)
+        self.arbol = cKDTree(self.xy) if cKDTree is not None else None
+        self.combinar = combinar
+        self.periodos = None  # Códigos anio * 100 + mes
+        self.columnas = []
+        self.valores = None  # (punto, periodo, columna); NaN si el punto no tiene dato ese mes
+
+    def cargar_series(self, datos, columna_nombre, columna_fecha):
+        if columna_nombre is None and len(self.nombres) > 1:
+            raise ValueError("Con varias ubicaciones indique columna_nombre")
+        if columna_fecha is None and "Fecha" in datos.columns:
+            columna_fecha = "Fecha"
+        columna_anio = "Año" if "Año" in datos.columns and "Anio" not in datos.columns else "Anio"
+        claves = {columna_nombre, columna_fecha, columna_anio, "Mes"}
+        self.columnas = [c for c in datos.columns
+                         if c not in claves and pd.api.types.is_numeric_dtype(datos[c])]
+        reductor = "sum" if self.combinar == "suma" else "mean"
+        agregador = AgregadorTemporal({c: reductor for c in self.columnas},
+                                      por=[columna_nombre] if columna_nombre else None)
+        mensual = agregador.agregar(datos, columna_fecha=columna_fecha, columna_anio=columna_anio)
+
+        if columna_nombre is None:
+            puntos = np.zeros(len(mensual), dtype="int64")
+        else:
+            puntos = mensual[columna_nombre].map(self.posicion)
+            sin_coordenadas = sorted(set(mensual.loc[puntos.isna(), columna_nombre].astype(str)))
+            if sin_coordenadas:
+                print(f" Sin coordenadas para: {sin_coordenadas} (se omiten)")
+            mensual = mensual[puntos.notna()]
+            puntos = puntos[puntos.notna()].to_numpy(dtype="int64")
+
+        codigos = mensual["Anio"].to_numpy(dtype="int64") * 100 + mensual["Mes"].to_numpy(dtype="int64")
+        self.periodos = np.unique(codigos)
+        self.valores = np.full((len(self.nombres), len(self.periodos), len(self.columnas)), np.nan)
+        self.valores[puntos, np.searchsorted(self.periodos, codigos)] = \
+            mensual[self.columnas].to_numpy(dtype="float64", na_value=np.nan)
+
+    def buscar(self, punto, k, radio_km):
+        """(índices, distancias en km) de los puntos más cercanos, del más cercano al más lejano"""
+        n = len(self.nombres)
+        radio = math.inf if radio_km is None else float(radio_km)
+        if k is None and radio_km is None:
+            raise ValueError("Indique k o radio_km")
+        if self.arbol is not None and k is not None:
+            distancias, indices = self.arbol.query(punto, k=min(k, n), distance_upper_bound=radio)
+            distancias, indices = np.atleast_1d(distancias), np.atleast_1d(indices)
+            validos = indices < n  # Sin vecino dentro del radio: índice n y distancia inf
+            return indices[validos], distancias[validos]
+        if self.arbol is not None:
+            indices = np.asarray(self.arbol.query_ball_point(punto, r=radio), dtype="int64")
+            distancias = np.hypot(*(self.xy[indices] - punto).T)
+        else:
+            distancias = np.hypot(*(self.xy - punto).T)
+            indices = np.flatnonzero(distancias <= radio)
+            distancias = distancias[indices]
+        orden = np.argsort(distancias, kind="stable")[:k]
+        return indices[orden], distancias[orden]
+
+    def combinar_series(self, indices, distancias):
+        """Serie combinada (periodo, columna) de los puntos indicados"""
+        bloque = self.valores[indices]
+        presentes = ~np.isnan(bloque)
+        if self.combinar == "suma":
+            resultado = np.where(presentes, bloque, 0.0).sum(axis=0)
+            resultado[~presentes.any(axis=0)] = np.nan
+            return resultado
+        pesos = 1.0 / np.maximum(distancias, DISTANCIA_MINIMA_KM) ** 2
+        pesos = pesos[:, None, None] * presentes
+        total = pesos.sum(axis=0)
+        with np.errstate(invalid="ignore", divide="ignore"):  # Sin datos en ningún punto -> NaN
+            return (np.where(presentes, bloque, 0.0) * pesos).sum(axis=0) / total
+
+
+def _proyectar(latlon):
+    """(lat, lon) en grados -> (x, y) en km sobre un plano tangente a la GAM"""
+    latlon = np.asarray(latlon, dtype="float64")
+    factor_lon = KM_POR_GRADO * math.cos(math.radians(LATITUD_REFERENCIA))
+    return np.stack([latlon[..., 1] * factor_lon, latlon[..., 0] * KM_POR_GRADO], axis=-1)
+
+
+def _normalizar_ubicaciones(ubicaciones):
+    """Convierte {nombre: (lat, lon)} o [(nombre, lat, lon), ...] en un dict ordenado"""
+    if isinstance(ubicaciones, dict):
+        return {nombre: (float(lat), float(lon)) for nombre, (lat, lon) in ubicaciones.items()}
+    return {nombre: (float(lat), float(lon)) for nombre, lat, lon in ubicaciones}
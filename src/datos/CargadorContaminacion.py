@@ -0,0 +1,389 @@
+import json
+import os
+import re
+from array import array
+
+import numpy as np
+import pandas as pd
+
+from helpers.Utilidades import Utilidades, _importar_pyarrow
+from helpers.Instrumentacion import Instrumentacion, instrumentar
+
+try:
+    import orjson  # Parser en C más rápido para NDJSON; opcional
+except ImportError:
+    orjson = None
+
+# Tipos conocidos de las exportaciones de contaminación; el resto se infiere del primer valor
+# (números -> float, para que un 12 seguido de un 12.5 no cambie el tipo de la columna)
+TIPOS_CONTAMINACION = {"Anio": "int", "Mes": "int", "Hora": "int", "Estacion": "str", "Fecha": "fecha",
+                       "pm10": "float", "pm2_5": "float", "CO": "float", "NO2": "float", "O3": "float"}
+TAMANO_LECTURA = 1 << 20  # Caracteres por lectura del archivo
+MAX_REGISTRO = 64 << 20  # Un objeto más grande que esto se trata como JSON inválido
+_SEPARADORES = re.compile(r"[\s,]*")
+
+
+class CargadorContaminacion:
+    def __init__(self, ruta, fecha_inicio=None, fecha_fin=None, estaciones=None, columnas=None,
+                 tipos=None, tamano_bloque=100_000, columna_fecha="Fecha", columna_estacion="Estacion"):
+        """
+        Lee exportaciones de contaminación en JSON (arreglo de objetos) o NDJSON (un objeto
+        por línea) sin cargar el archivo completo: los registros se decodifican uno a uno,
+        se filtran y se acumulan en buffers tipados por columna (array de int64/float64)
+        que se entregan como DataFrames de `tamano_bloque` filas.
+
+        Sin `columnas`, el esquema sale del primer bloque: una clave que aparece por primera
+        vez en un bloque posterior (p. ej. un contaminante que una estación empieza a medir
+        tarde) se descarta, con un aviso y su nombre en self.descartadas. Para conservarla,
+        pásala en `columnas` (o usa un `tamano_bloque` mayor).
+
+        Args:
+            ruta (str): Archivo .json o .ndjson/.jsonl (el formato se detecta por el contenido).
+            fecha_inicio (str, optional): Primer día/hora incluido (ISO, p. ej. '2021-01-01').
+            fecha_fin (str, optional): Último día/hora incluido; con solo la fecha entra el día completo.
+                                       Los registros mensuales sin columna de fecha (Anio, Mes)
+                                       entran si su mes se cruza con el rango.
+            estaciones (list, optional): Solo se conservan estas estaciones.
+            columnas (list, optional): Columnas de salida; por defecto las del primer bloque.
+            tipos (dict, optional): Tipo por columna ('int', 'float', 'str', 'fecha'), además
+                                    de TIPOS_CONTAMINACION.
+            tamano_bloque (int): Filas por bloque (tras filtrar).
+            columna_fecha (str): Columna con la fecha u hora de cada medición.
+            columna_estacion (str): Columna con el identificador de la estación.
+        """
+        self.ruta = ruta
+        self.fecha_inicio = _normalizar_fecha(fecha_inicio)
+        self.fecha_fin = _normalizar_fecha(fecha_fin)
+        self.estaciones = {str(e) for e in estaciones} if estaciones is not None else None
+        self.columnas = list(columnas) if columnas is not None else None
+        self.tipos = {**TIPOS_CONTAMINACION, **(tipos or {}), columna_fecha: "fecha"}
+        self.tamano_bloque = max(1, int(tamano_bloque))
+        self.columna_fecha = columna_fecha
+        self.columna_estacion = columna_estacion
+        self.leidos = 0  # Registros decodificados en la última lectura (antes de filtrar)
+        self.descartadas = set()  # Claves que aparecieron después del primer bloque (sin `columnas`)
+        self.df = None
+
+    @instrumentar()
+    def cargar(self):
+        """Lee todo el archivo (con filtros) en un solo DataFrame"""
+        self.df = pd.concat(list(self.bloques()), ignore_index=True)
+        return self.df
+
+    def bloques(self):
+        """Generador de DataFrames de hasta `tamano_bloque` filas con los registros que pasan los filtros"""
+        if not os.path.exists(self.ruta):
+            raise FileNotFoundError(f"No se encuentra el archivo: {self.ruta}")
+        Instrumentacion.registrar(bytes_leidos=os.path.getsize(self.ruta))
+        columnas = {c: _Columna(self.tipos.get(c, "float")) for c in self.columnas or []}
+        claves = columnas.keys()
+        anexos = _anexos(columnas)
+        revisar_claves = self.columnas is None  # Con `columnas` explícitas las demás claves se ignoran
+        esquema_fijo = self.columnas is not None
+        filas = emitidos = 0
+        self.leidos = 0
+        self.descartadas = set()
+        for registro in self._registros():
+            self.leidos += 1
+            if not self._pasa_filtros(registro):
+                continue
+            if revisar_claves and not registro.keys() <= claves:
+                if esquema_fijo:
+                    self._descartar_claves(registro, claves)
+                else:
+                    for clave, valor in registro.items():
+                        if clave not in columnas:
+                            columnas[clave] = _Columna(self.tipos.get(clave) or _inferir_tipo(valor), filas)
+                    anexos = _anexos(columnas)
+            promovida = False
+            for clave, anexar in anexos:
+                valor = registro.get(clave)
+                try:
+                    anexar(valor)  # Camino rápido: el valor ya tiene el tipo del buffer
+                except TypeError:
+                    columnas[clave].agregar(valor)
+                    promovida = True
+            if promovida:  # El buffer de la columna cambió de tipo
+                anexos = _anexos(columnas)
+            filas += 1
+            if filas == self.tamano_bloque:
+                yield _bloque(columnas)
+                emitidos += 1
+                anexos = _anexos(columnas)
+                esquema_fijo = True  # Las claves nuevas después del primer bloque se descartan
+                filas = 0
+        if filas or not emitidos:  # Sin registros: un bloque vacío con las columnas y tipos pedidos
+            yield _bloque(columnas)
+
+    @instrumentar()
+    def exportar(self, rutas, formato=None):
+        """
+        Escribe los bloques a medida que se leen, en una o varias salidas (una sola pasada
+        por el archivo). CSV se escribe por anexión; Parquet con un row group por bloque;
+        Arrow IPC con un record batch por bloque.
+
+        Args:
+            rutas (str | list): Archivo(s) de salida.
+            formato (str, optional): 'csv', 'parquet' o 'arrow'; por defecto según la extensión.
+
+        Returns:
+            int: Número de filas escritas.
+        """
+        rutas = [rutas] if isinstance(rutas, str) else list(rutas)
+        escritores = [_Escritor(ruta, formato or Utilidades.formato_de_ruta(ruta)) for ruta in rutas]
+        filas = 0
+        try:
+            for bloque in self.bloques():
+                for escritor in escritores:
+                    escritor.escribir(bloque)
+                filas += len(bloque)
+        finally:
+            for escritor in escritores:
+                escritor.cerrar()
+        Instrumentacion.registrar(filas_salida=filas,
+                                  bytes_escritos=sum(os.path.getsize(r) for r in rutas if os.path.exists(r)))
+        for ruta in rutas:
+            print(f"Archivo guardado en: {ruta} ({filas} filas de {self.leidos} leídas)")
+        return filas
+
+    def _registros(self):
+        with open(self.ruta, "rb") as f:
+            inicio = f.read(4096).lstrip(b"\xef\xbb\xbf \t\r\n")
+        if inicio[:1] == b"[":
+            with open(self.ruta, "r", encoding="utf-8-sig") as f:
+                yield from _registros_arreglo(f)
+        else:
+            with open(self.ruta, "rb") as f:
+                yield from _registros_ndjson(f)
+
+    def _descartar_claves(self, registro, claves):
+        for clave in registro:
+            if clave not in claves and clave not in self.descartadas:
+                self.descartadas.add(clave)
+                print(f"Aviso: La columna '{clave}' aparece por primera vez después del primer bloque "
+                      f"({self.tamano_bloque} filas) y se descarta; pásala en `columnas` para conservarla.")
+
+    def _pasa_filtros(self, registro):
+        if self.estaciones is not None and str(registro.get(self.columna_estacion)) not in self.estaciones:
+            return False
+        if self.fecha_inicio is None and self.fecha_fin is None:
+            return True
+        clave = self._clave_fecha(registro)
+        if clave is None:
+            return False
+        if self.fecha_inicio is not None:
+            n = min(len(clave), len(self.fecha_inicio))
+            if clave[:n] < self.fecha_inicio[:n]:
+                return False
+        if self.fecha_fin is not None:
+            n = min(len(clave), len(self.fecha_fin))
+            if clave[:n] > self.fecha_fin[:n]:
+                return False
+        return True
+
+    def _clave_fecha(self, registro):
+        """Fecha ISO del registro como texto ('2021-03-05T14:00', o '2021-03' si solo trae Anio y Mes)"""
+        fecha = registro.get(self.columna_fecha)
+        if fecha is not None:
+            return str(fecha).replace(" ", "T", 1)
+        try:
+            return f"{int(registro['Anio']):04d}-{int(registro['Mes']):02d}"
+        except (KeyError, TypeError, ValueError):
+            return None
+
+
+class _Columna:
+    """Buffer de una columna: array('q') / array('d') para números, lista para texto y fechas"""
+    __slots__ = ("tipo", "valores", "nulos")
+
+    def __init__(self, tipo, relleno=0):
+        self.tipo = tipo
+        self.valores = None
+        self.nulos = []  # Posiciones sin valor en una columna entera (-> Int64 nullable)
+        self.reiniciar()
+        for _ in range(relleno):  # Columna que aparece tras `relleno` filas del bloque
+            self.agregar(None)
+
+    def reiniciar(self):
+        # Siempre un buffer nuevo: el anterior lo sigue usando el bloque entregado (np.frombuffer)
+        self.valores = array("q") if self.tipo == "int" else array("d") if self.tipo == "float" else []
+        self.nulos = []
+
+    def agregar(self, valor):
+        """Camino lento: nulos y valores que no encajan en el tipo del buffer"""
+        if valor is None:
+            if self.tipo == "int":
+                self.nulos.append(len(self.valores))
+                self.valores.append(0)
+            else:
+                self.valores.append(np.nan)
+        elif self.tipo == "int" and isinstance(valor, float) and valor.is_integer():
+            self.valores.append(int(valor))
+        elif self.tipo == "int" and isinstance(valor, float):
+            self._convertir("float")
+            self.valores.append(valor)
+        else:  # Texto u objeto en una columna numérica: se conserva tal cual
+            self._convertir("str")
+            self.valores.append(valor)
+
+    def _convertir(self, tipo):
+        nulos = set(self.nulos)
+        valores = [None if i in nulos else v for i, v in enumerate(self.valores)]
+        if tipo == "float":
+            valores = array("d", [np.nan if v is None else v for v in valores])
+        self.tipo, self.valores, self.nulos = tipo, valores, []
+
+    def serie(self):
+        if self.tipo == "int":
+            valores = np.frombuffer(self.valores, dtype=np.int64) if self.valores else np.empty(0, np.int64)
+            if not self.nulos:
+                return valores
+            mascara = np.zeros(len(valores), dtype=bool)
+            mascara[self.nulos] = True
+            return pd.arrays.IntegerArray(valores, mascara)
+        if self.tipo == "float":
+            return np.frombuffer(self.valores, dtype=np.float64) if self.valores else np.empty(0, np.float64)
+        if self.tipo == "fecha":
+            fechas = pd.to_datetime(pd.Series(self.valores, dtype=object), format="ISO8601", errors="coerce")
+            # Misma unidad en todos los bloques: pandas la infiere de los datos (s si el bloque no
+            # tiene fechas, us si las tiene) y Parquet/Arrow no aceptan bajar la precisión
+            return fechas.dt.as_unit("ns") if pd.api.types.is_datetime64_any_dtype(fechas) else fechas
+        return pd.Series(self.valores)
+
+
+class _Escritor:
+    """Salida por bloques en CSV, Parquet o Arrow IPC"""
+
+    def __init__(self, ruta, formato):
+        if formato not in ("csv", "parquet", "arrow"):
+            raise ValueError(f"Formato no soportado: {formato}")
+        self.ruta = ruta
+        self.formato = formato
+        self.escritor = None
+        self.esquema = None
+        self.primero = True
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+
+    def escribir(self, bloque):
+        if self.formato == "csv":
+            bloque.to_csv(self.ruta, index=False, mode="w" if self.primero else "a", header=self.primero)
+            self.primero = False
+            return
+        pa = _importar_pyarrow()
+        tabla = pa.Table.from_pandas(bloque, preserve_index=False)
+        if self.escritor is None:
+            self.esquema = tabla.schema
+            if self.formato == "parquet":
+                import pyarrow.parquet as pq
+                self.escritor = pq.ParquetWriter(self.ruta, self.esquema)
+            else:
+                import pyarrow.ipc as ipc
+                self.escritor = ipc.new_file(self.ruta, self.esquema)
+        else:
+            try:
+                tabla = tabla.cast(self.esquema)
+            except (pa.ArrowInvalid, pa.ArrowNotImplementedError) as e:
+                raise ValueError(f"El bloque no coincide con los tipos del primero en {self.ruta}; "
+                                 f"indique los tipos con `tipos`: {e}") from e
+        self.escritor.write_table(tabla)
+
+    def cerrar(self):
+        if self.escritor is not None:
+            self.escritor.close()
+
+
+def _registros_arreglo(f):
+    """
+    Objetos de un arreglo JSON de nivel superior. Lo leído hasta la última '}' se intenta
+    decodificar como un solo lote (orjson si está instalado); si esa llave no cierra un
+    registro (objetos anidados o '}' dentro de un texto) se decodifica de a uno con raw_decode.
+    """
+    cargar = orjson.loads if orjson is not None else json.loads
+    decodificador = json.JSONDecoder()
+    buffer = f.read(TAMANO_LECTURA)
+    pos = buffer.index("[") + 1
+    fin_archivo = False
+    while True:
+        pos = _SEPARADORES.match(buffer, pos).end()
+        if buffer.startswith("]", pos):
+            return
+        corte = buffer.rfind("}", pos) + 1
+        lote = _decodificar_lote(buffer[pos:corte], cargar) if corte > pos else None
+        if lote is not None:
+            for registro in lote:
+                yield _verificar_objeto(registro)
+            pos = corte
+            continue
+
+        error = None
+        while True:
+            pos = _SEPARADORES.match(buffer, pos).end()
+            if pos == len(buffer) or buffer[pos] == "]":
+                break
+            try:
+                registro, pos = decodificador.raw_decode(buffer, pos)
+            except json.JSONDecodeError as e:
+                error = e
+                break
+            yield _verificar_objeto(registro)
+        if buffer.startswith("]", pos):
+            return
+        if fin_archivo:
+            raise error or ValueError("JSON incompleto: falta el ']' final")
+        # Objeto cortado al final del buffer: se descarta lo ya leído y se lee más
+        if len(buffer) - pos > MAX_REGISTRO:
+            raise ValueError(f"Registro de más de {MAX_REGISTRO} caracteres o JSON inválido en {f.name}")
+        leido = f.read(TAMANO_LECTURA)
+        fin_archivo = not leido
+        buffer, pos = buffer[pos:] + leido, 0
+
+
+def _decodificar_lote(texto, cargar):
+    """Lista de objetos si `texto` son registros completos separados por comas; None si no"""
+    try:
+        return cargar("[" + texto + "]")
+    except ValueError:  # json.JSONDecodeError y orjson.JSONDecodeError
+        return None
+
+
+def _verificar_objeto(registro):
+    if not isinstance(registro, dict):
+        raise ValueError(f"Se esperaba un objeto JSON por registro y se encontró {type(registro).__name__}")
+    return registro
+
+
+def _registros_ndjson(f):
+    """Un objeto por línea (orjson si está instalado); las líneas vacías se saltan"""
+    cargar = orjson.loads if orjson is not None else json.loads
+    for linea in f:
+        if linea.strip():
+            yield cargar(linea)
+
+
+def _anexos(columnas):
+    """(clave, append del buffer) por columna; se recalcula cuando un buffer se reemplaza"""
+    return [(clave, columna.valores.append) for clave, columna in columnas.items()]
+
+
+def _bloque(columnas):
+    datos = {}
+    for nombre, columna in columnas.items():
+        datos[nombre] = columna.serie()
+        columna.reiniciar()
+    return pd.DataFrame(datos)
+
+
+def _inferir_tipo(valor):
+    if valor is None or isinstance(valor, (int, float)):  # bool incluido
+        return "float"
+    return "str"
+
+
+def _normalizar_fecha(fecha):
+    """Límite del rango como texto ISO; medianoche se reduce a la fecha para incluir el día completo"""
+    if fecha is None:
+        return None
+    if not isinstance(fecha, str):
+        fecha = pd.Timestamp(fecha).isoformat()
+    fecha = fecha.replace(" ", "T", 1)
+    return fecha[:10] if fecha[10:] in ("", "T00:00:00", "T00:00") else fecha
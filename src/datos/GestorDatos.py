@@ -1,44 +1,161 @@
 import pandas as pd
 import os
 
+from helpers.Utilidades import Utilidades
+from helpers.Instrumentacion import Instrumentacion, instrumentar
+
+# Columnas de conteo de vehículos del CSV de peajes de CONAVI
+COLUMNAS_CONTEO = ["Liviano", "Dos Tres Ejes", "Cuatro Ejes", "Furgón", "Motocicletas", "Autobus", "Total"]
+
+# Tipos compactos para el modo de baja memoria (los conteos se leen como Int32
+# nullable porque traen vacíos y pasan a int32 tras rellenar con 0)
+DTYPES_LECTURA = {"Año": "int16", "Mes": "str", "Puesto de Peaje": "str",
+                  **{col: "Int32" for col in COLUMNAS_CONTEO}}
+COLUMNAS_CATEGORICAS = ["Mes", "Puesto de Peaje"]
+
+
 class GestorDatos:
     def __init__(self, path_csv):
         self.path_csv = path_csv
         self.df = None
+        self.compacto = False
 
-    def cargar(self):
-        """Carga el CSV original"""
-        if not os.path.exists(self.path_csv):
-            raise FileNotFoundError(f"No se encuentra el archivo: {self.path_csv}")
-        self.df = pd.read_csv(self.path_csv)
+    @instrumentar()
+    def cargar(self, compacto=False, columnas=None):
+        """
+        Carga el archivo original (CSV, o Parquet/Arrow según la extensión).
+
+        Args:
+            compacto (bool): Si es True usa tipos compactos (int16/Int32/categorías)
+                             para las columnas conocidas del CSV de peajes.
+            columnas (list, optional): Solo se leen estas columnas.
+        """
+        self._verificar_archivo()
+        if Utilidades.formato_de_ruta(self.path_csv) != "csv":
+            # Parquet/Arrow ya traen sus tipos; la lectura usa memory map
+            self.df = Utilidades.leer_tabla(self.path_csv, columnas=columnas)
+            self.compacto = compacto
+            return self.df
+        dtypes = self._dtypes_compactos() if compacto else None
+        Instrumentacion.registrar(bytes_leidos=os.path.getsize(self.path_csv))
+        self.df = pd.read_csv(self.path_csv, dtype=dtypes, usecols=columnas)
+        self.compacto = compacto
+        if compacto:
+            self.df = _compactar(self.df)
         return self.df
 
+    @instrumentar()
     def limpiar(self):
         """Aplica limpieza básica"""
-        df_clean = self.df.copy()
+        self.df = _limpiar_bloque(self.df.copy())
+        if self.compacto:
+            self.df = _compactar(self.df)
+        return self.df
 
-        # Quitar espacios extra en nombres de columnas
-        if "Mes" in df_clean.columns:
-            df_clean["Mes"] = df_clean["Mes"].str.strip()
+    @instrumentar()
+    def cargar_por_bloques(self, chunksize=100_000):
+        """
+        Modo de baja memoria: lee el CSV por bloques, limpia cada bloque y lo
+        guarda con tipos compactos (Mes y Puesto de Peaje categóricos, conteos int32).
+        El pico de memoria depende del tamaño del bloque, no del archivo.
+        """
+        self._verificar_archivo()
+        Instrumentacion.registrar(bytes_leidos=os.path.getsize(self.path_csv))
+        bloques = [_compactar(_limpiar_bloque(bloque))
+                   for bloque in self._leer_bloques(chunksize)]
+        self.df = _concatenar_bloques(bloques)
+        self.compacto = True
+        return self.df
 
-        if "Puesto de Peaje" in df_clean.columns:
-            df_clean["Puesto de Peaje"] = df_clean["Puesto de Peaje"].str.strip().str.title()
+    @instrumentar()
+    def limpiar_por_bloques(self, output_path, chunksize=100_000):
+        """
+        Lee, limpia y escribe el CSV bloque a bloque sin cargar el archivo completo.
+        No modifica self.df.
 
-        # Eliminar filas donde el puesto de peaje sea "Naranjo"
-        if "Puesto de Peaje" in df_clean.columns:
-            df_clean = df_clean[df_clean["Puesto de Peaje"] != "Naranjo"]
+        Returns:
+            int: Número de filas escritas.
+        """
+        self._verificar_archivo()
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        filas = 0
+        for i, bloque in enumerate(self._leer_bloques(chunksize)):
+            bloque = _compactar(_limpiar_bloque(bloque))
+            bloque.to_csv(output_path, index=False, mode="w" if i == 0 else "a", header=(i == 0))
+            filas += len(bloque)
+        Instrumentacion.registrar(filas_salida=filas, bytes_leidos=os.path.getsize(self.path_csv),
+                                  bytes_escritos=os.path.getsize(output_path) if filas else 0)
+        print(f"Archivo guardado en: {output_path} ({filas} filas)")
+        return filas
 
-        # Eliminar columna con demasiados nulos
-        if "Cuatro Ejes" in df_clean.columns:
-            df_clean = df_clean.drop(columns=["Cuatro Ejes"])
+    @instrumentar()
+    def exportar_csv(self, output_path, formato="csv"):
+        """
+        Guarda self.df. Con formato 'parquet' o 'arrow' se cambia la extensión
+        de output_path y se conservan los tipos de las columnas.
 
-        # Rellenar nulos restantes con 0
-        df_clean = df_clean.fillna(0)
+        Returns:
+            str: Ruta del archivo escrito.
+        """
+        ruta = output_path if formato == "csv" else Utilidades.ruta_con_formato(output_path, formato)
+        Utilidades.escribir_tabla(self.df, ruta, formato)
+        print(f"Archivo guardado en: {ruta}")
+        return ruta
 
-        self.df = df_clean
-        return self.df
+    def _verificar_archivo(self):
+        if not os.path.exists(self.path_csv):
+            raise FileNotFoundError(f"No se encuentra el archivo: {self.path_csv}")
 
-    def exportar_csv(self, output_path):
-        os.makedirs(os.path.dirname(output_path), exist_ok=True)
-        self.df.to_csv(output_path, index=False)
-        print(f"Archivo guardado en: {output_path}")
+    def _dtypes_compactos(self):
+        """Tipos de lectura para las columnas conocidas que existan en el CSV"""
+        columnas = pd.read_csv(self.path_csv, nrows=0).columns
+        return {col: tipo for col, tipo in DTYPES_LECTURA.items() if col in columnas}
+
+    def _leer_bloques(self, chunksize):
+        return pd.read_csv(self.path_csv, dtype=self._dtypes_compactos(), chunksize=chunksize)
+
+
+def _limpiar_bloque(df_clean):
+    """Reglas de limpieza del CSV de peajes; se aplican igual a todo el archivo o a un bloque"""
+    # Quitar espacios extra en nombres de columnas
+    if "Mes" in df_clean.columns:
+        df_clean["Mes"] = df_clean["Mes"].str.strip()
+
+    if "Puesto de Peaje" in df_clean.columns:
+        df_clean["Puesto de Peaje"] = df_clean["Puesto de Peaje"].str.strip().str.title()
+
+    # Eliminar filas donde el puesto de peaje sea "Naranjo"
+    if "Puesto de Peaje" in df_clean.columns:
+        df_clean = df_clean[df_clean["Puesto de Peaje"] != "Naranjo"]
+
+    # Eliminar columna con demasiados nulos
+    if "Cuatro Ejes" in df_clean.columns:
+        df_clean = df_clean.drop(columns=["Cuatro Ejes"])
+
+    # Rellenar nulos restantes con 0
+    df_clean = df_clean.fillna(0)
+    return df_clean
+
+
+def _compactar(df):
+    """Convierte las columnas conocidas a tipos compactos (categorías e int32)"""
+    for col in COLUMNAS_CATEGORICAS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    for col in COLUMNAS_CONTEO:
+        if col in df.columns and not df[col].hasnans:
+            df[col] = df[col].astype("int32")
+    return df
+
+
+def _concatenar_bloques(bloques):
+    """Concatena bloques conservando las columnas categóricas (unión de categorías)"""
+    if not bloques:
+        return pd.DataFrame()
+    for col in COLUMNAS_CATEGORICAS:
+        if col not in bloques[0].columns:
+            continue
+        categorias = pd.api.types.union_categoricals([b[col] for b in bloques]).categories
+        for bloque in bloques:
+            bloque[col] = bloque[col].cat.set_categories(categorias)
+    return pd.concat(bloques, ignore_index=True)
@@ -0,0 +1,102 @@
+import hashlib
+import os
+import unicodedata
+
+import pandas as pd
+
+from datos.AgregadorTemporal import AgregadorTemporal
+from datos.GestorDatos import COLUMNAS_CONTEO
+from helpers.Utilidades import Utilidades
+
+CLAVE_PERIODO = ["Anio", "Mes"]
+VERSION_INTEGRACION = "1"  # Cambiar si cambia la lógica, para invalidar el caché
+
+
+class IntegradorDatos:
+    def __init__(self, carpeta_cache=None, por_puesto=True):
+        """
+        Une clima, contaminación y tráfico vehicular en una sola tabla mensual.
+
+        Args:
+            carpeta_cache (str, optional): Carpeta donde se guardan los resultados intermedios
+                                           (Parquet). Si las entradas no cambiaron se reutilizan.
+            por_puesto (bool): Si es True agrega una columna Total_<Puesto> por cada peaje.
+        """
+        self.carpeta_cache = carpeta_cache
+        self.por_puesto = por_puesto
+        self.df = None
+
+    def trafico_mensual(self, df_peajes):
+        """
+        Tráfico por (Anio, Mes): suma de cada tipo de vehículo en todos los peajes
+        y, si por_puesto, el Total de cada peaje como columna aparte.
+        """
+        return self._con_cache("trafico", [df_peajes], lambda: self._agregar_trafico(df_peajes))
+
+    def integrar(self, df_clima, df_contaminacion, df_peajes=None):
+        """
+        Tabla de características por (Anio, Mes).
+
+        Clima y contaminación se unen por sus meses comunes; el tráfico se añade
+        a esos meses (NaN si un mes no tiene datos de peajes). Las uniones se hacen
+        sobre el índice (Anio, Mes) en lugar de merges sucesivos por columnas.
+        """
+        entradas = [df_clima, df_contaminacion] + ([df_peajes] if df_peajes is not None else [])
+
+        def calcular():
+            tabla = _indexar(df_clima).join(_indexar(df_contaminacion), how="inner")
+            if df_peajes is not None:
+                tabla = tabla.join(_indexar(self.trafico_mensual(df_peajes)), how="left")
+            return tabla.sort_index().reset_index()
+
+        self.df = self._con_cache("integracion", entradas, calcular)
+        return self.df
+
+    def _agregar_trafico(self, df_peajes):
+        df = df_peajes.rename(columns={"Año": "Anio"})
+        conteos = [c for c in COLUMNAS_CONTEO if c in df.columns]
+        totales = AgregadorTemporal({c: "sum" for c in conteos}).agregar(df)
+        if not self.por_puesto or "Puesto de Peaje" not in df.columns or "Total" not in df.columns:
+            return totales
+
+        por_puesto = AgregadorTemporal({"Total": "sum"}, por=["Puesto de Peaje"]).agregar(df)
+        ancho = por_puesto.pivot(index=CLAVE_PERIODO, columns="Puesto de Peaje", values="Total")
+        ancho.columns = [f"Total_{_nombre_columna(p)}" for p in ancho.columns]
+        return _indexar(totales).join(ancho, how="left").reset_index()
+
+    def _con_cache(self, nombre, entradas, calcular):
+        """Devuelve el resultado guardado si las entradas tienen la misma huella; si no, lo calcula"""
+        if not self.carpeta_cache:
+            return calcular()
+        ruta = os.path.join(self.carpeta_cache, f"{nombre}_{_huella(entradas, self.por_puesto)}.parquet")
+        if os.path.exists(ruta):
+            return Utilidades.leer_tabla(ruta)
+        resultado = calcular()
+        Utilidades.escribir_tabla(resultado, ruta)
+        return resultado
+
+
+def _indexar(df):
+    """DataFrame indexado y ordenado por (Anio, Mes), con Mes numérico"""
+    df = df.rename(columns={"Año": "Anio"})
+    if not pd.api.types.is_numeric_dtype(df["Mes"]):
+        df = df.assign(Mes=AgregadorTemporal.mes_a_numero(df["Mes"]))
+    df = df.assign(Anio=df["Anio"].astype("int64"), Mes=df["Mes"].astype("int64"))
+    return df.set_index(CLAVE_PERIODO).sort_index()
+
+
+def _huella(dfs, *extras):
+    """Hash del contenido de los DataFrames (valores, columnas y tipos)"""
+    h = hashlib.sha256(VERSION_INTEGRACION.encode())
+    for df in dfs:
+        h.update(repr(list(df.columns)).encode())
+        h.update(repr([str(t) for t in df.dtypes]).encode())
+        h.update(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes())
+    h.update(repr(extras).encode())
+    return h.hexdigest()[:24]
+
+
+def _nombre_columna(texto):
+    """'Tres Ríos' -> 'Tres_Rios' (sin tildes ni espacios, apto para SQL)"""
+    texto = "".join(c for c in unicodedata.normalize("NFKD", str(texto)) if not unicodedata.combining(c))
+    return "_".join(texto.split())
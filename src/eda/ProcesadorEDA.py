@@ -1,71 +1,266 @@
 import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+import hashlib
+import html
+import json
 import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from eda.ResumenEstadistico import resumen_con_cache
+    from visualizacion.GraficosGrandes import GraficosGrandes
+except ModuleNotFoundError:  # Importado como src.eda (Visualizador)
+    from src.eda.ResumenEstadistico import resumen_con_cache
+    from src.visualizacion.GraficosGrandes import GraficosGrandes
+
+TIPOS_GRAFICO = ("histogramas", "boxplots", "correlacion")
+TIPOS_DISPONIBLES = TIPOS_GRAFICO + ("series",)  # 'series': series temporales reducidas con LTTB
+VERSION_REPORTE = "2"  # Cambiar si cambia el dibujo de las figuras, para regenerarlas
+UMBRAL_FILAS_GRANDES = 100_000  # Desde aquí se grafican resúmenes (histogramas binados, cajas del sketch)
+MANIFIESTO = "reporte.json"  # Huellas y tiempos de la última ejecución
+
 
 class ProcesadorEDA:
-    def __init__(self, dfs: dict):
+    def __init__(self, dfs: dict, carpeta_cache=None):
         """
         dfs: diccionario con nombre -> DataFrame
+        carpeta_cache: carpeta donde se guarda el resumen estadístico de cada DataFrame;
+                       si solo se agregaron filas, se procesan solo esas filas
         """
         self.dfs = dfs
+        self.carpeta_cache = carpeta_cache
+        self._resumenes = {}  # nombre -> (DataFrame resumido, ResumenEstadistico)
+
+    def resumen(self, nombre):
+        """
+        ResumenEstadistico del DataFrame (conteos, momentos, cuantiles, duplicados, correlación).
+        Se calcula (y se hashea el DataFrame) una vez por objeto: mientras self.dfs[nombre] sea
+        el mismo DataFrame se reutiliza. Si se modifica en el lugar, hay que reasignarlo en
+        self.dfs (p. ej. una copia) para que se vuelva a resumir.
+        """
+        df = self.dfs[nombre]
+        df_resumido, previo = self._resumenes.get(nombre, (None, None))
+        if df_resumido is df:
+            return previo
+        resumen = resumen_con_cache(nombre, df, self.carpeta_cache, previo=previo)
+        self._resumenes[nombre] = (df, resumen)
+        return resumen
+
+    def correlacion(self, nombre):
+        """Matriz de correlación de las columnas numéricas, compartida por el reporte y los gráficos"""
+        return self.resumen(nombre).correlacion()
 
     def info_general(self):
         """Muestra shape, tipos, nulos y duplicados en consola"""
         for nombre, df in self.dfs.items():
+            resumen = self.resumen(nombre)
             print(f"\n📄 Información general - {nombre}")
             print("Shape:", df.shape)
             print("Tipos de datos:\n", df.dtypes)
-            print("Valores nulos:\n", df.isnull().sum())
-            print("Duplicados:", df.duplicated().sum())
+            print("Valores nulos:\n", resumen.nulos_por_columna())
+            print("Duplicados:", resumen.duplicados)
             print("Primeras filas:\n", df.head(3))
 
     def estadisticas(self):
-        """Estadísticas descriptivas"""
+        """Estadísticas descriptivas (cuantiles aproximados en tablas grandes)"""
         for nombre, df in self.dfs.items():
+            resumen = self.resumen(nombre)
             print(f"\n📊 Estadísticas descriptivas - {nombre}")
-            print(df.describe(include="all"))
+            if resumen.numericas:
+                print(resumen.describe())
+            otras = [c for c in resumen.columnas if c not in resumen.numericas]
+            if otras:
+                nulos = resumen.nulos_por_columna()[otras]
+                print(pd.DataFrame({"count": resumen.filas - nulos, "nulos": nulos}).T)
 
     def histogramas(self, output_dir=None):
         """Genera histogramas y opcionalmente los guarda"""
-        for nombre, df in self.dfs.items():
-            numeric_cols = df.select_dtypes(include="number").columns
-            if len(numeric_cols) == 0:
-                continue
-            fig, ax = plt.subplots(figsize=(12,8))
-            df[numeric_cols].hist(bins=30, ax=ax)
-            plt.suptitle(f"Histogramas - {nombre}", fontsize=14)
-            if output_dir:
-                path = os.path.join(output_dir, f"{nombre}_histogramas.png")
-                fig.savefig(path)
-            plt.close(fig)
+        self._graficar("histogramas", output_dir)
 
     def boxplots(self, output_dir=None):
         """Genera boxplots y opcionalmente los guarda"""
-        for nombre, df in self.dfs.items():
-            numeric_cols = df.select_dtypes(include="number").columns
-            if len(numeric_cols) == 0:
-                continue
-            fig, ax = plt.subplots(figsize=(12,6))
-            sns.boxplot(data=df[numeric_cols], ax=ax)
-            ax.set_title(f"Boxplots - {nombre}")
-            plt.xticks(rotation=45)
-            if output_dir:
-                path = os.path.join(output_dir, f"{nombre}_boxplots.png")
-                fig.savefig(path)
-            plt.close(fig)
+        self._graficar("boxplots", output_dir)
 
     def correlaciones(self, output_dir=None):
         """Matriz de correlación con heatmap y opcionalmente guardada"""
+        self._graficar("correlacion", output_dir)
+
+    def series(self, output_dir=None):
+        """Series temporales de las columnas numéricas, reducidas con LTTB"""
+        self._graficar("series", output_dir)
+
+    def es_grande(self, nombre, modo_grande=None):
+        """Si el DataFrame se grafica con resúmenes; modo_grande=None decide por UMBRAL_FILAS_GRANDES"""
+        return len(self.dfs[nombre]) >= UMBRAL_FILAS_GRANDES if modo_grande is None else modo_grande
+
+    def datos_grafico(self, nombre, tipo, modo_grande=None):
+        """
+        Lo que necesita _dibujar para una figura. En modo grande son resúmenes cuyo tamaño
+        no depende del número de filas: conteos por intervalo (histogramas) y estadísticas
+        de caja del sketch de cuantiles (boxplots). La correlación siempre es la matriz ya
+        calculada y las series siempre se reducen con LTTB.
+        """
+        df = self.dfs[nombre]
+        numericas = df.select_dtypes(include="number")
+        if tipo == "correlacion":
+            return self.correlacion(nombre)
+        if tipo == "series":
+            return GraficosGrandes.datos_series(df)
+        if not self.es_grande(nombre, modo_grande):
+            return numericas
+        if tipo == "histogramas":
+            return GraficosGrandes.datos_histograma(numericas, resumen=self.resumen(nombre))
+        if tipo == "boxplots":
+            return GraficosGrandes.datos_caja(self.resumen(nombre))
+        raise ValueError(f"Tipo de gráfico no soportado: {tipo}. Opciones: {', '.join(TIPOS_DISPONIBLES)}")
+
+    def generar_reporte(self, output_dir, formatos=("png",), max_workers=None, tipos=TIPOS_GRAFICO,
+                        modo_grande=None):
+        """
+        Genera todas las figuras sin pantalla (backend Agg) en paralelo y un index.html.
+
+        Cada combinación DataFrame/tipo de gráfico es una tarea de un ProcessPoolExecutor.
+        Si los datos de una figura tienen la misma huella que en la ejecución anterior
+        (guardada en reporte.json) y los archivos existen, la figura no se vuelve a dibujar.
+
+        Args:
+            output_dir (str): Carpeta del reporte.
+            formatos (tuple): Formatos de imagen: 'png' y/o 'svg'.
+            max_workers (int, optional): Procesos (por defecto, uno por núcleo).
+            tipos (tuple): Tipos de gráfico a generar (ver TIPOS_DISPONIBLES).
+            modo_grande (bool, optional): Graficar resúmenes en lugar de filas; por defecto,
+                                          solo para DataFrames con UMBRAL_FILAS_GRANDES filas o más.
+
+        Returns:
+            pd.DataFrame: Una fila por figura con su estado ('generada' o 'sin cambios')
+                          y el tiempo de dibujo en segundos.
+        """
+        os.makedirs(output_dir, exist_ok=True)
+        ruta_manifiesto = os.path.join(output_dir, MANIFIESTO)
+        anterior = {}
+        if os.path.exists(ruta_manifiesto):
+            with open(ruta_manifiesto, "r", encoding="utf-8") as f:
+                anterior = json.load(f)
+
+        inicio = time.perf_counter()
+        figuras = {}
+        pendientes = {}
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            for nombre, df in self.dfs.items():
+                numericas = df.select_dtypes(include="number")
+                if numericas.shape[1] == 0:
+                    continue
+                grande = self.es_grande(nombre, modo_grande)
+                for tipo in tipos:
+                    clave = f"{nombre}_{tipo}"
+                    huella = _huella(self.resumen(nombre).huella, list(numericas.columns), tipo, formatos, grande)
+                    archivos = [f"{clave}.{formato}" for formato in formatos]
+                    previa = anterior.get(clave, {})
+                    if previa.get("huella") == huella and \
+                            all(os.path.exists(os.path.join(output_dir, a)) for a in archivos):
+                        figuras[clave] = dict(previa, estado="sin cambios")
+                        continue
+                    rutas = [os.path.join(output_dir, a) for a in archivos]
+                    # En modo grande al proceso solo se le envía el resumen, no las filas
+                    datos = self.datos_grafico(nombre, tipo, grande)
+                    pendientes[clave] = executor.submit(_renderizar, tipo, nombre, datos, rutas, grande)
+                    figuras[clave] = {"dataframe": nombre, "tipo": tipo, "huella": huella,
+                                      "archivos": archivos, "estado": "generada"}
+            for clave, futuro in pendientes.items():
+                figuras[clave]["segundos"] = futuro.result()
+
+        with open(ruta_manifiesto, "w", encoding="utf-8") as f:
+            json.dump({clave: {k: v for k, v in datos.items() if k != "estado"}
+                       for clave, datos in figuras.items()}, f, indent=2)
+        _escribir_indice(output_dir, figuras)
+
+        tiempos = pd.DataFrame([{"figura": clave, "tipo": d["tipo"], "estado": d["estado"],
+                                 "segundos": d.get("segundos") if d["estado"] == "generada" else 0.0}
+                                for clave, d in figuras.items()])
+        print(f"Reporte EDA en {os.path.join(output_dir, 'index.html')}: {len(pendientes)} figuras generadas, "
+              f"{len(figuras) - len(pendientes)} sin cambios ({time.perf_counter() - inicio:.2f} s)")
+        return tiempos
+
+    def _graficar(self, tipo, output_dir):
         for nombre, df in self.dfs.items():
             numeric_cols = df.select_dtypes(include="number").columns
             if len(numeric_cols) == 0:
                 continue
-            fig, ax = plt.subplots(figsize=(10,8))
-            sns.heatmap(df[numeric_cols].corr(), annot=True, cmap="coolwarm", fmt=".2f", ax=ax)
-            ax.set_title(f"Matriz de Correlación - {nombre}")
+            grande = self.es_grande(nombre)
+            fig = _dibujar(tipo, nombre, self.datos_grafico(nombre, tipo, grande), grande)
             if output_dir:
-                path = os.path.join(output_dir, f"{nombre}_correlacion.png")
+                path = os.path.join(output_dir, f"{nombre}_{tipo}.png")
                 fig.savefig(path)
             plt.close(fig)
 
+
+def _dibujar(tipo, nombre, df, grande=False):
+    """
+    Figura de un tipo a partir de ProcesadorEDA.datos_grafico: las columnas numéricas de df,
+    o en modo grande el resumen (para 'correlacion', df es la matriz ya calculada).
+    """
+    if tipo == "correlacion":
+        fig = GraficosGrandes.dibujar_correlacion(nombre, df)
+    elif tipo == "series":
+        fig = GraficosGrandes.dibujar_series(nombre, df)
+    elif grande and tipo == "histogramas":
+        fig = GraficosGrandes.dibujar_histogramas(nombre, df)
+    elif grande and tipo == "boxplots":
+        fig = GraficosGrandes.dibujar_cajas(nombre, df)
+    elif tipo == "histogramas":
+        ejes = df.hist(bins=30, figsize=(12, 8))
+        fig = ejes.flat[0].figure if hasattr(ejes, "flat") else ejes.figure
+        fig.suptitle(f"Histogramas - {nombre}", fontsize=14)
+    elif tipo == "boxplots":
+        fig, ax = plt.subplots(figsize=(12, 6))
+        sns.boxplot(data=df, ax=ax)
+        ax.set_title(f"Boxplots - {nombre}")
+        ax.tick_params(axis="x", rotation=45)
+    else:
+        raise ValueError(f"Tipo de gráfico no soportado: {tipo}. Opciones: {', '.join(TIPOS_DISPONIBLES)}")
+    return fig
+
+
+def _renderizar(tipo, nombre, df, rutas, grande=False):
+    """Tarea de un proceso del pool: dibuja con Agg, guarda en cada formato y devuelve los segundos"""
+    plt.switch_backend("Agg")
+    inicio = time.perf_counter()
+    fig = _dibujar(tipo, nombre, df, grande)
+    for ruta in rutas:
+        fig.savefig(ruta, bbox_inches="tight")
+    plt.close(fig)
+    return time.perf_counter() - inicio
+
+
+def _huella(huella_datos, *extras):
+    """Hash de los datos de una figura (huella del resumen del DataFrame) y de cómo se dibuja"""
+    h = hashlib.sha256(VERSION_REPORTE.encode())
+    h.update(str(huella_datos).encode())
+    h.update(repr(extras).encode())
+    return h.hexdigest()[:24]
+
+
+def _escribir_indice(output_dir, figuras):
+    """index.html con las figuras agrupadas por DataFrame y su tiempo de dibujo"""
+    secciones = []
+    for nombre in dict.fromkeys(d["dataframe"] for d in figuras.values()):
+        imagenes = []
+        for clave, d in figuras.items():
+            if d["dataframe"] != nombre:
+                continue
+            segundos = f"{d['segundos']:.2f} s" if d.get("segundos") is not None else "-"
+            imagenes.append(
+                f'<figure><img src="{html.escape(d["archivos"][0])}" alt="{html.escape(clave)}">'
+                f'<figcaption>{html.escape(d["tipo"])} · {segundos} · {d["estado"]}</figcaption></figure>'
+            )
+        secciones.append(f"<h2>{html.escape(nombre)}</h2>\n" + "\n".join(imagenes))
+    contenido = (
+        '<!DOCTYPE html>\n<html lang="es"><head><meta charset="utf-8"><title>Reporte EDA</title>'
+        "<style>body{font-family:sans-serif;margin:2em}img{max-width:100%}"
+        "figure{display:inline-block;max-width:48%;margin:0 1% 1em 0;vertical-align:top}</style>"
+        "</head><body><h1>Reporte EDA</h1>\n" + "\n".join(secciones) + "\n</body></html>\n"
+    )
+    with open(os.path.join(output_dir, "index.html"), "w", encoding="utf-8") as f:
+        f.write(contenido)
@@ -0,0 +1,277 @@
+import hashlib
+import os
+import pickle
+
+import numpy as np
+import pandas as pd
+
+CAPACIDAD_SKETCH = 512  # Valores por nivel del sketch de cuantiles (error de rango ~ 1/capacidad)
+VERSION_RESUMEN = "1"  # Cambiar si cambia el contenido del resumen, para invalidar el caché
+
+
+class ResumenEstadistico:
+    def __init__(self, columnas=None):
+        """
+        Resumen estadístico combinable de un DataFrame, calculado en una pasada por bloque.
+
+        Por columna: conteo, nulos, media y M2 (varianza), mínimo, máximo y un sketch de
+        cuantiles aproximados. Para las columnas numéricas, co-momentos por pares (con las
+        filas donde ambas tienen valor, como DataFrame.corr) para la matriz de correlación.
+        Las filas duplicadas se detectan por hash de fila. Cada bloque de filas nuevo se
+        combina con lo acumulado (fórmulas de Chan), así que agregar filas no obliga a
+        recorrer de nuevo las anteriores.
+
+        Args:
+            columnas (list, optional): Columnas del DataFrame; se fijan con el primer bloque.
+        """
+        self.columnas = list(columnas) if columnas is not None else None
+        self.numericas = None
+        self.filas = 0
+        self.nulos = None  # np.ndarray por columna
+        self.duplicados = 0
+        self.huella = None  # Hash de los hashes de fila procesados (en orden)
+        self._hashes = np.array([], dtype=np.uint64)  # Hashes de fila únicos, ordenados
+        # Estadísticas por pares de columnas numéricas (k x k); la diagonal es la univariada
+        self._n = self._media_i = self._media_j = self._m2_i = self._m2_j = self._c = None
+        self._min = self._max = None
+        self._sketches = None
+
+    @classmethod
+    def desde_dataframe(cls, df, hashes_fila=None):
+        resumen = cls(df.columns)
+        resumen.actualizar(df, hashes_fila)
+        return resumen
+
+    def actualizar(self, df, hashes_fila=None):
+        """
+        Incorpora un bloque de filas nuevas.
+
+        Args:
+            df (pd.DataFrame): Filas nuevas, con las mismas columnas.
+            hashes_fila (np.ndarray, optional): pd.util.hash_pandas_object(df, index=False), si ya se calculó.
+        """
+        if self.columnas is None:
+            self.columnas = list(df.columns)
+        if list(df.columns) != self.columnas:
+            raise ValueError("Las columnas del bloque no coinciden con las del resumen")
+        if self.numericas is None:
+            self.numericas = [c for c in self.columnas if pd.api.types.is_numeric_dtype(df[c])
+                              and not pd.api.types.is_bool_dtype(df[c])]
+            k = len(self.numericas)
+            self.nulos = np.zeros(len(self.columnas), dtype=np.int64)
+            self._n = np.zeros((k, k))
+            self._media_i, self._media_j = np.zeros((k, k)), np.zeros((k, k))
+            self._m2_i, self._m2_j, self._c = np.zeros((k, k)), np.zeros((k, k)), np.zeros((k, k))
+            self._min, self._max = np.full(k, np.inf), np.full(k, -np.inf)
+            self._sketches = [SketchCuantiles() for _ in range(k)]
+        if df.empty:
+            return self
+
+        self.nulos += df.isna().sum().to_numpy(dtype=np.int64)
+        if hashes_fila is None:
+            hashes_fila = pd.util.hash_pandas_object(df, index=False).to_numpy()
+        self._contar_duplicados(np.asarray(hashes_fila, dtype=np.uint64))
+        if self.numericas:
+            X = df[self.numericas].to_numpy(dtype=np.float64, na_value=np.nan)
+            self._combinar_pares(X)
+            validos = ~np.isnan(X)
+            for j, sketch in enumerate(self._sketches):
+                columna = X[validos[:, j], j]
+                if len(columna):
+                    sketch.agregar(columna)
+                    self._min[j] = min(self._min[j], columna.min())
+                    self._max[j] = max(self._max[j], columna.max())
+        self.filas += len(df)
+        return self
+
+    def combinar(self, otro):
+        """Combina con el resumen de otro bloque de filas (mismas columnas, filas distintas)"""
+        if otro.filas == 0:
+            return self
+        if self.filas == 0:
+            self.__dict__.update(pickle.loads(pickle.dumps(otro)).__dict__)
+            return self
+        if otro.columnas != self.columnas:
+            raise ValueError("Las columnas de los resúmenes no coinciden")
+        self.nulos = self.nulos + otro.nulos
+        self._contar_duplicados(otro._hashes, repetidos_previos=otro.duplicados)
+        self._combinar_momentos(otro._n, otro._media_i, otro._media_j, otro._m2_i, otro._m2_j, otro._c)
+        self._min = np.minimum(self._min, otro._min)
+        self._max = np.maximum(self._max, otro._max)
+        for sketch, sketch_otro in zip(self._sketches, otro._sketches):
+            sketch.combinar(sketch_otro)
+        self.filas += otro.filas
+        self.huella = None  # El orden de las filas ya no es el de un solo DataFrame
+        return self
+
+    # --- Resultados ---
+
+    def describe(self, percentiles=(0.25, 0.5, 0.75)):
+        """Tabla como DataFrame.describe() para las columnas numéricas (cuantiles aproximados)"""
+        conteo = np.diag(self._n)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            std = np.sqrt(np.diag(self._c) / (conteo - 1))
+        filas = {"count": conteo, "mean": np.where(conteo > 0, np.diag(self._media_i), np.nan), "std": std,
+                 "min": np.where(conteo > 0, self._min, np.nan)}
+        for q in percentiles:
+            filas[f"{q * 100:g}%"] = [s.cuantil(q) for s in self._sketches]
+        filas["max"] = np.where(conteo > 0, self._max, np.nan)
+        return pd.DataFrame(filas, index=self.numericas).T
+
+    def correlacion(self):
+        """Matriz de correlación de Pearson por pares (igual a DataFrame.corr() de las columnas numéricas)"""
+        with np.errstate(invalid="ignore", divide="ignore"):
+            corr = self._c / np.sqrt(self._m2_i * self._m2_j)
+        corr[self._n < 2] = np.nan
+        return pd.DataFrame(np.clip(corr, -1.0, 1.0), index=self.numericas, columns=self.numericas)
+
+    def nulos_por_columna(self):
+        return pd.Series(self.nulos, index=self.columnas)
+
+    # --- Internos ---
+
+    def _contar_duplicados(self, hashes, repetidos_previos=0):
+        unicos = np.unique(hashes)
+        repetidos_bloque = len(hashes) - len(unicos) + repetidos_previos
+        ya_vistos = np.isin(unicos, self._hashes, assume_unique=True).sum()
+        self.duplicados += int(repetidos_bloque + ya_vistos)
+        self._hashes = np.union1d(self._hashes, unicos)
+
+    def _combinar_pares(self, X):
+        """Momentos por pares del bloque (centrado en su media para estabilidad) y combinación"""
+        validos = ~np.isnan(X)
+        conteo = validos.sum(axis=0)
+        centro = np.divide(np.where(validos, X, 0.0).sum(axis=0), conteo, out=np.zeros(X.shape[1]),
+                           where=conteo > 0)
+        Z = np.where(validos, X - centro, 0.0)
+        V = validos.astype(np.float64)
+        n = V.T @ V  # Filas con ambas columnas válidas
+        suma_i = Z.T @ V  # [i, j]: suma de la columna i en las filas válidas para i y j
+        suma_cuad_i = (Z * Z).T @ V
+        cruzado = Z.T @ Z
+        with np.errstate(invalid="ignore", divide="ignore"):
+            media_i = np.where(n > 0, suma_i / n, 0.0)
+            media_j = media_i.T
+            m2_i = np.where(n > 0, suma_cuad_i - suma_i * media_i, 0.0)
+            c = np.where(n > 0, cruzado - suma_i * media_j, 0.0)
+        self._combinar_momentos(n, media_i + centro[:, None], media_j + centro[None, :], m2_i, m2_i.T, c)
+
+    def _combinar_momentos(self, n_b, media_i_b, media_j_b, m2_i_b, m2_j_b, c_b):
+        n_a = self._n
+        n = n_a + n_b
+        with np.errstate(invalid="ignore", divide="ignore"):
+            peso = np.where(n > 0, n_a * n_b / n, 0.0)
+            frac_b = np.where(n > 0, n_b / n, 0.0)
+        delta_i = media_i_b - self._media_i
+        delta_j = media_j_b - self._media_j
+        self._c = self._c + c_b + delta_i * delta_j * peso
+        self._m2_i = self._m2_i + m2_i_b + delta_i * delta_i * peso
+        self._m2_j = self._m2_j + m2_j_b + delta_j * delta_j * peso
+        self._media_i = self._media_i + delta_i * frac_b
+        self._media_j = self._media_j + delta_j * frac_b
+        self._n = n
+
+
+class SketchCuantiles:
+    def __init__(self, capacidad=CAPACIDAD_SKETCH):
+        """
+        Sketch de cuantiles combinable (compactadores estilo KLL).
+
+        El nivel h guarda valores que representan 2^h filas cada uno. Cuando un nivel supera
+        la capacidad se ordena y la mitad de sus valores (posiciones pares o impares,
+        alternando) sube al nivel siguiente. La memoria es O(capacidad * log(n)) y el error
+        de rango es del orden de 1/capacidad; mientras no se compacta, los cuantiles son
+        exactos. Dos sketches se combinan uniendo sus niveles.
+        """
+        self.capacidad = capacidad
+        self.niveles = [np.array([], dtype=np.float64)]
+        self.total = 0
+        self._impar = False
+
+    def agregar(self, valores):
+        valores = np.asarray(valores, dtype=np.float64)
+        valores = valores[~np.isnan(valores)]
+        self.niveles[0] = np.concatenate([self.niveles[0], valores])
+        self.total += len(valores)
+        self._compactar()
+
+    def combinar(self, otro):
+        for h, nivel in enumerate(otro.niveles):
+            if h == len(self.niveles):
+                self.niveles.append(np.array([], dtype=np.float64))
+            self.niveles[h] = np.concatenate([self.niveles[h], nivel])
+        self.total += otro.total
+        self._compactar()
+        return self
+
+    def cuantil(self, q):
+        if self.total == 0:
+            return np.nan
+        if len(self.niveles) == 1:
+            return float(np.quantile(self.niveles[0], q))  # Sin compactar: exacto
+        valores = np.concatenate(self.niveles)
+        pesos = np.concatenate([np.full(len(nivel), 2.0 ** h) for h, nivel in enumerate(self.niveles)])
+        orden = np.argsort(valores, kind="stable")
+        acumulado = np.cumsum(pesos[orden])
+        posicion = np.searchsorted(acumulado, q * acumulado[-1], side="left")
+        return float(valores[orden][min(posicion, len(valores) - 1)])
+
+    def _compactar(self):
+        h = 0
+        while h < len(self.niveles):
+            nivel = self.niveles[h]
+            if len(nivel) > self.capacidad:
+                nivel = np.sort(nivel)
+                # Con un número impar de valores, el mayor se queda en este nivel
+                resto = nivel[-1:] if len(nivel) % 2 else nivel[:0]
+                pares = nivel[:len(nivel) - len(resto)]
+                sube = pares[int(self._impar)::2]
+                self._impar = not self._impar
+                if h + 1 == len(self.niveles):
+                    self.niveles.append(np.array([], dtype=np.float64))
+                self.niveles[h] = resto
+                self.niveles[h + 1] = np.concatenate([self.niveles[h + 1], sube])
+            h += 1
+
+
+def resumen_con_cache(nombre, df, carpeta_cache=None, previo=None):
+    """
+    Resumen de df reutilizando el anterior (en memoria o en carpeta_cache/<nombre>.pkl).
+
+    Si df empieza con exactamente las mismas filas que el resumen previo, solo se
+    procesan las filas agregadas; si cambió otra cosa se recalcula desde cero.
+    """
+    ruta = os.path.join(carpeta_cache, f"{nombre}.pkl") if carpeta_cache else None
+    if previo is None and ruta and os.path.exists(ruta):
+        try:
+            with open(ruta, "rb") as f:
+                version, previo = pickle.load(f)
+        except (OSError, pickle.UnpicklingError, EOFError, ImportError, AttributeError, ValueError):
+            version, previo = None, None  # Caché ilegible: se recalcula
+        if version != VERSION_RESUMEN:
+            previo = None
+
+    hashes = pd.util.hash_pandas_object(df, index=False).to_numpy()
+    huella = _huella(hashes, df.columns)
+    if previo is not None and previo.huella == huella:
+        return previo
+    if (previo is not None and previo.huella is not None and previo.columnas == list(df.columns)
+            and len(df) >= previo.filas and _huella(hashes[:previo.filas], df.columns) == previo.huella):
+        resumen = previo.actualizar(df.iloc[previo.filas:], hashes[previo.filas:])
+    else:
+        resumen = ResumenEstadistico.desde_dataframe(df, hashes)
+    resumen.huella = huella
+
+    if ruta:
+        os.makedirs(carpeta_cache, exist_ok=True)
+        temporal = f"{ruta}.tmp"
+        with open(temporal, "wb") as f:
+            pickle.dump((VERSION_RESUMEN, resumen), f)
+        os.replace(temporal, ruta)
+    return resumen
+
+
+def _huella(hashes_fila, columnas):
+    h = hashlib.sha256(repr(list(columnas)).encode())
+    h.update(np.ascontiguousarray(hashes_fila).tobytes())
+    return h.hexdigest()[:24]
@@ -0,0 +1,326 @@
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+
+try:
+    import resource  # Pico de memoria (ru_maxrss); no existe en Windows
+except ImportError:
+    resource = None
+
+MAX_SPANS = 10_000  # Spans individuales que se conservan para exportar (los agregados no tienen límite)
+PREFIJO_PROMETHEUS = "proyecto_span"
+
+
+class Span:
+    """Medición de un bloque: se completa con filas y bytes mientras está abierto"""
+    __slots__ = ("nombre", "padre", "inicio", "segundos", "filas_entrada", "filas_salida",
+                 "bytes_leidos", "bytes_escritos", "rss_pico_kb", "error")
+
+    def __init__(self, nombre, padre=None, filas_entrada=None):
+        self.nombre = nombre
+        self.padre = padre
+        self.inicio = time.time()
+        self.segundos = 0.0
+        self.filas_entrada = filas_entrada
+        self.filas_salida = None
+        self.bytes_leidos = 0
+        self.bytes_escritos = 0
+        self.rss_pico_kb = None
+        self.error = None
+
+    def registrar(self, filas_entrada=None, filas_salida=None, bytes_leidos=0, bytes_escritos=0):
+        if filas_entrada is not None:
+            self.filas_entrada = (self.filas_entrada or 0) + filas_entrada
+        if filas_salida is not None:
+            self.filas_salida = (self.filas_salida or 0) + filas_salida
+        self.bytes_leidos += bytes_leidos
+        self.bytes_escritos += bytes_escritos
+
+    def como_dict(self):
+        return {campo: getattr(self, campo) for campo in Span.__slots__}
+
+
+class _SpanNulo:
+    """Lo que se usa con la instrumentación apagada: no mide nada"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def registrar(self, *args, **kwargs):
+        pass
+
+
+_SPAN_NULO = _SpanNulo()
+
+
+class Instrumentacion:
+    """
+    Spans de tiempo, filas, bytes y pico de memoria para los métodos públicos del pipeline.
+
+    Apagada por defecto (o con PROYECTO_INSTRUMENTACION=1 para encenderla al importar): el
+    decorador solo consulta un booleano antes de llamar al método; el costo, un marco de
+    Python más y el reenvío de *args/**kwargs, es de unos 0.3 µs por llamada, despreciable
+    frente a métodos que procesan tablas. Encendida, cada span guarda tiempo de pared, filas
+    de entrada/salida, bytes leídos/escritos y cuánto subió el pico de RSS del proceso, y se
+    agrega por nombre. Opcionalmente los spans de primer nivel (p. ej. una etapa) se perfilan
+    con cProfile y/o tracemalloc.
+    """
+    activa = os.environ.get("PROYECTO_INSTRUMENTACION") == "1"
+    perfil = False
+    memoria = False
+    carpeta_perfiles = None
+
+    _lock = threading.Lock()
+    _local = threading.local()
+    _spans = deque(maxlen=MAX_SPANS)
+    _agregados = {}
+    _perfiles = {}  # nombre de span -> top de asignaciones de tracemalloc
+
+    @classmethod
+    def activar(cls, perfil=False, memoria=False, carpeta_perfiles=None):
+        """
+        Enciende la instrumentación.
+
+        Args:
+            perfil (bool): cProfile en cada span de primer nivel (un .prof por span en carpeta_perfiles).
+            memoria (bool): tracemalloc en cada span de primer nivel (pico asignado por Python y
+                            las líneas que más memoria asignaron).
+            carpeta_perfiles (str, optional): Dónde guardar los .prof (por defecto no se guardan,
+                                              solo se resumen en la exportación JSON).
+        """
+        cls.activa = True
+        cls.perfil = perfil
+        cls.memoria = memoria
+        cls.carpeta_perfiles = carpeta_perfiles
+
+    @classmethod
+    def desactivar(cls):
+        cls.activa = False
+
+    @classmethod
+    def reiniciar(cls):
+        """Borra los spans y agregados acumulados"""
+        with cls._lock:
+            cls._spans.clear()
+            cls._agregados.clear()
+            cls._perfiles.clear()
+
+    @classmethod
+    def span(cls, nombre, filas_entrada=None):
+        """Context manager que mide un bloque; con la instrumentación apagada no hace nada"""
+        if not cls.activa:
+            return _SPAN_NULO
+        return _Medicion(cls, nombre, filas_entrada)
+
+    @classmethod
+    def registrar(cls, filas_entrada=None, filas_salida=None, bytes_leidos=0, bytes_escritos=0):
+        """
+        Suma filas o bytes al span abierto en este hilo. Los bytes se suman también a los
+        spans que lo contienen (así una etapa muestra todo lo que leyó y escribió).
+        """
+        if not cls.activa:
+            return
+        pila = getattr(cls._local, "pila", None)
+        if pila:
+            pila[-1].registrar(filas_entrada, filas_salida, bytes_leidos, bytes_escritos)
+            if bytes_leidos or bytes_escritos:
+                for span in pila[:-1]:
+                    span.registrar(bytes_leidos=bytes_leidos, bytes_escritos=bytes_escritos)
+
+    @classmethod
+    def resumen(cls):
+        """Una fila por nombre de span: llamadas, segundos (total y máximo), filas, bytes y pico de RSS"""
+        with cls._lock:
+            return [dict(span=nombre, **datos) for nombre, datos in sorted(
+                cls._agregados.items(), key=lambda item: -item[1]["segundos"])]
+
+    @classmethod
+    def exportar_json(cls, ruta=None):
+        """Agregados, spans individuales y perfiles de memoria en JSON (se devuelve el texto)"""
+        agregados = cls.resumen()
+        with cls._lock:
+            contenido = {
+                "agregados": agregados,
+                "spans": [s.como_dict() for s in cls._spans],
+                "memoria": dict(cls._perfiles),
+            }
+        texto = json.dumps(contenido, indent=2, default=str)
+        if ruta:
+            _escribir(ruta, texto)
+        return texto
+
+    @classmethod
+    def exportar_prometheus(cls, ruta=None):
+        """Agregados en formato de texto de Prometheus (se devuelve el texto)"""
+        metricas = (
+            ("llamadas_total", "counter", "Llamadas por span", "llamadas"),
+            ("segundos_total", "counter", "Tiempo de pared acumulado en segundos", "segundos"),
+            ("segundos_max", "gauge", "Llamada más lenta en segundos", "segundos_max"),
+            ("filas_entrada_total", "counter", "Filas recibidas", "filas_entrada"),
+            ("filas_salida_total", "counter", "Filas producidas", "filas_salida"),
+            ("bytes_leidos_total", "counter", "Bytes leídos", "bytes_leidos"),
+            ("bytes_escritos_total", "counter", "Bytes escritos", "bytes_escritos"),
+            ("rss_pico_kb_max", "gauge", "Mayor aumento del pico de RSS en KB", "rss_pico_kb"),
+            ("errores_total", "counter", "Llamadas que terminaron con excepción", "errores"),
+        )
+        filas = cls.resumen()
+        lineas = []
+        for sufijo, tipo, ayuda, campo in metricas:
+            nombre = f"{PREFIJO_PROMETHEUS}_{sufijo}"
+            lineas.append(f"# HELP {nombre} {ayuda}")
+            lineas.append(f"# TYPE {nombre} {tipo}")
+            for fila in filas:
+                if fila[campo] is not None:
+                    etiqueta = fila["span"].replace("\\", "\\\\").replace('"', '\\"')
+                    lineas.append(f'{nombre}{{span="{etiqueta}"}} {fila[campo]}')
+        texto = "\n".join(lineas) + "\n"
+        if ruta:
+            _escribir(ruta, texto)
+        return texto
+
+    @classmethod
+    def _cerrar(cls, span):
+        with cls._lock:
+            cls._spans.append(span)
+            datos = cls._agregados.setdefault(span.nombre, {
+                "llamadas": 0, "segundos": 0.0, "segundos_max": 0.0, "filas_entrada": None,
+                "filas_salida": None, "bytes_leidos": 0, "bytes_escritos": 0, "rss_pico_kb": None,
+                "errores": 0,
+            })
+            datos["llamadas"] += 1
+            datos["segundos"] += span.segundos
+            datos["segundos_max"] = max(datos["segundos_max"], span.segundos)
+            for campo in ("filas_entrada", "filas_salida"):
+                if getattr(span, campo) is not None:
+                    datos[campo] = (datos[campo] or 0) + getattr(span, campo)
+            datos["bytes_leidos"] += span.bytes_leidos
+            datos["bytes_escritos"] += span.bytes_escritos
+            if span.rss_pico_kb is not None:
+                datos["rss_pico_kb"] = max(datos["rss_pico_kb"] or 0, span.rss_pico_kb)
+            datos["errores"] += span.error is not None
+
+
+class _Medicion:
+    """Span abierto: tiempo, pico de RSS y, en el primer nivel, cProfile/tracemalloc opcionales"""
+    __slots__ = ("cls", "span", "t0", "rss0", "perfilador", "traza")
+
+    def __init__(self, cls, nombre, filas_entrada):
+        self.cls = cls
+        pila = getattr(cls._local, "pila", None)
+        if pila is None:
+            pila = cls._local.pila = []
+        self.span = Span(nombre, pila[-1].nombre if pila else None, filas_entrada)
+        self.perfilador = self.traza = None
+
+    def __enter__(self):
+        pila = self.cls._local.pila
+        primer_nivel = not pila
+        pila.append(self.span)
+        if primer_nivel and self.cls.perfil:
+            import cProfile
+            self.perfilador = cProfile.Profile()
+            try:
+                self.perfilador.enable()
+            except ValueError:  # Ya hay otro perfilador activo (otro hilo)
+                self.perfilador = None
+        if primer_nivel and self.cls.memoria:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self.traza = "propia"
+            else:
+                self.traza = "compartida"
+            tracemalloc.reset_peak()
+        self.rss0 = _rss_pico_kb()
+        self.t0 = time.perf_counter()
+        return self.span
+
+    def __exit__(self, tipo, valor, tb):
+        span = self.span
+        span.segundos = time.perf_counter() - self.t0
+        rss = _rss_pico_kb()
+        if rss is not None and self.rss0 is not None:
+            span.rss_pico_kb = rss - self.rss0
+        if valor is not None:
+            span.error = f"{tipo.__name__}: {valor}"
+        if self.perfilador is not None:
+            self.perfilador.disable()
+            if self.cls.carpeta_perfiles:
+                os.makedirs(self.cls.carpeta_perfiles, exist_ok=True)
+                archivo = "".join(c if c.isalnum() or c in "._-" else "_" for c in span.nombre)
+                self.perfilador.dump_stats(os.path.join(self.cls.carpeta_perfiles, f"{archivo}.prof"))
+        if self.traza is not None:
+            self._cerrar_traza(span)
+        self.cls._local.pila.pop()
+        self.cls._cerrar(span)
+        return False
+
+    def _cerrar_traza(self, span):
+        """Pico de memoria de Python y las 10 líneas que más asignaron durante el span"""
+        import tracemalloc
+        if not tracemalloc.is_tracing():  # La detuvo el span que la inició (en otro hilo)
+            return
+        _, pico = tracemalloc.get_traced_memory()
+        lineas = tracemalloc.take_snapshot().statistics("lineno")[:10]
+        with self.cls._lock:
+            self.cls._perfiles[span.nombre] = {
+                "pico_python_kb": pico / 1024,
+                "top": [{"linea": str(s.traceback), "kb": s.size / 1024, "bloques": s.count} for s in lineas],
+            }
+        if self.traza == "propia":
+            tracemalloc.stop()
+
+
+def instrumentar(nombre=None):
+    """
+    Decorador: mide cada llamada como un span llamado `nombre` (por defecto Clase.metodo).
+
+    Filas de entrada: largo del primer argumento (después de self) si es un DataFrame o arreglo.
+    Filas de salida: largo del resultado si es un DataFrame, Series o arreglo. Los bytes los
+    registra el propio método con Instrumentacion.registrar(bytes_leidos=...).
+    """
+    def decorador(funcion):
+        etiqueta = nombre or funcion.__qualname__
+
+        @functools.wraps(funcion)
+        def envoltura(*args, **kwargs):
+            if not Instrumentacion.activa:
+                return funcion(*args, **kwargs)
+            with _Medicion(Instrumentacion, etiqueta, _filas(args[1] if len(args) > 1 else None)) as span:
+                resultado = funcion(*args, **kwargs)
+                filas = _filas(resultado)
+                if filas is not None:
+                    span.filas_salida = (span.filas_salida or 0) + filas
+                return resultado
+        return envoltura
+    return decorador
+
+
+def _filas(valor):
+    """Número de filas de un DataFrame/Series/ndarray (sin importar pandas ni numpy)"""
+    if valor is None or isinstance(valor, (str, bytes, dict)):
+        return None
+    forma = getattr(valor, "shape", None)
+    if forma:
+        return int(forma[0])
+    return None
+
+
+def _rss_pico_kb():
+    """Pico de RSS del proceso en KB (Linux); None donde no está disponible"""
+    if resource is None:
+        return None
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def _escribir(ruta, texto):
+    os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+    with open(ruta, "w", encoding="utf-8") as f:
+        f.write(texto)
@@ -0,0 +1,220 @@
+import hashlib
+import inspect
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from helpers.Instrumentacion import Instrumentacion
+
+
+class Etapa:
+    def __init__(self, nombre, funcion, entradas=(), salidas=(), dependencias=(), parametros=None,
+                 codigo=(), cache=True):
+        """
+        Paso del pipeline.
+
+        Args:
+            nombre (str): Identificador único.
+            funcion (callable): Se llama sin argumentos (usar functools.partial para pasarlos);
+                                si devuelve False la etapa se considera fallida.
+            entradas (list): Archivos que lee; su contenido forma parte de la huella.
+            salidas (list): Archivos que escribe; si falta alguno la etapa no se salta.
+            dependencias (list): Etapas que deben terminar antes.
+            parametros (dict, optional): Valores que cambian el resultado (rango de fechas, motor...).
+            codigo (list): Archivos .py adicionales cuya versión cuenta en la huella
+                           (el código de `funcion` siempre cuenta).
+            cache (bool): Con False la etapa se ejecuta siempre (p. ej. una predicción).
+        """
+        self.nombre = nombre
+        self.funcion = funcion
+        self.entradas = list(entradas)
+        self.salidas = list(salidas)
+        self.dependencias = list(dependencias)
+        self.parametros = parametros or {}
+        self.codigo = list(codigo)
+        self.cache = cache
+
+
+class PlanificadorEtapas:
+    def __init__(self, ruta_estado, max_workers=4, procesos=False):
+        """
+        Ejecuta un grafo de etapas (DAG): las que no dependen entre sí corren en paralelo y
+        se salta cada etapa cuya huella (contenido de las entradas, código y parámetros)
+        coincide con la de la última ejecución correcta, siempre que sus salidas existan.
+
+        Args:
+            ruta_estado (str): JSON con las huellas de la última ejecución y los hashes de archivos
+                               (por tamaño y fecha de modificación, para no releer los que no cambian).
+            max_workers (int): Etapas simultáneas.
+            procesos (bool): ProcessPoolExecutor en lugar de hilos (las funciones deben poder enviarse
+                             a otro proceso). Con hilos basta para etapas de E/S, pandas o SQL.
+        """
+        self.ruta_estado = ruta_estado
+        self.max_workers = max_workers
+        self.procesos = procesos
+        self.etapas = {}
+
+    def agregar(self, etapa):
+        if etapa.nombre in self.etapas:
+            raise ValueError(f"Etapa repetida: {etapa.nombre}")
+        self.etapas[etapa.nombre] = etapa
+        return self
+
+    def ejecutar(self, objetivos=None, forzar=False):
+        """
+        Ejecuta las etapas (todas o solo `objetivos`; las dependencias fuera de la selección
+        se dan por cumplidas) y muestra el resumen de tiempos.
+
+        Args:
+            objetivos (list, optional): Nombres de las etapas a ejecutar.
+            forzar (bool): Ejecutar aunque la huella no haya cambiado.
+
+        Returns:
+            list: Un dict por etapa con estado ('ejecutada', 'sin cambios', 'fallida', 'omitida'),
+                  segundos y el motivo si no se ejecutó.
+        """
+        seleccion = list(objetivos) if objetivos else list(self.etapas)
+        desconocidas = [n for n in seleccion if n not in self.etapas]
+        if desconocidas:
+            raise ValueError(f"Etapas desconocidas: {desconocidas}")
+        self._verificar_ciclos(seleccion)
+
+        estado = self._leer_estado()
+        pendientes = {n: {d for d in self.etapas[n].dependencias if d in seleccion} for n in seleccion}
+        resultados = {}
+        en_curso = {}
+        inicio = time.perf_counter()
+        Executor = ProcessPoolExecutor if self.procesos else ThreadPoolExecutor
+        with Executor(max_workers=self.max_workers) as executor:
+            while pendientes or en_curso:
+                for nombre in [n for n, deps in pendientes.items() if not deps]:
+                    del pendientes[nombre]
+                    etapa = self.etapas[nombre]
+                    fallidas = [d for d in etapa.dependencias if resultados.get(d, {}).get("estado") in
+                                ("fallida", "omitida")]
+                    if fallidas:
+                        resultados[nombre] = _resultado(nombre, "omitida", motivo=f"falló {', '.join(fallidas)}")
+                        self._liberar(nombre, pendientes)
+                        continue
+                    # La huella se calcula al liberarse la etapa: sus entradas ya las escribieron las dependencias
+                    huella = self._huella(etapa, estado)
+                    if etapa.cache and not forzar and estado["etapas"].get(nombre) == huella and \
+                            all(os.path.exists(s) for s in etapa.salidas):
+                        resultados[nombre] = _resultado(nombre, "sin cambios")
+                        self._liberar(nombre, pendientes)
+                        continue
+                    en_curso[executor.submit(_ejecutar_etapa, nombre, etapa.funcion)] = (nombre, huella)
+
+                if not en_curso:
+                    continue
+                terminados, _ = wait(en_curso, return_when=FIRST_COMPLETED)
+                for futuro in terminados:
+                    nombre, huella = en_curso.pop(futuro)
+                    ok, segundos, error = futuro.result()
+                    if ok:
+                        resultados[nombre] = _resultado(nombre, "ejecutada", segundos)
+                        if self.etapas[nombre].cache:
+                            estado["etapas"][nombre] = huella
+                            self._guardar_estado(estado)
+                    else:
+                        resultados[nombre] = _resultado(nombre, "fallida", segundos, error)
+                        estado["etapas"].pop(nombre, None)
+                    self._liberar(nombre, pendientes)
+
+        resumen = [resultados[n] for n in seleccion]
+        _imprimir_resumen(resumen, time.perf_counter() - inicio)
+        return resumen
+
+    def _liberar(self, nombre, pendientes):
+        for deps in pendientes.values():
+            deps.discard(nombre)
+
+    def _verificar_ciclos(self, seleccion):
+        visitando, listas = set(), set()
+
+        def visitar(nombre):
+            if nombre in listas:
+                return
+            if nombre in visitando:
+                raise ValueError(f"Ciclo en las dependencias de la etapa {nombre}")
+            visitando.add(nombre)
+            for d in self.etapas[nombre].dependencias:
+                if d not in self.etapas:
+                    raise ValueError(f"La etapa {nombre} depende de una etapa desconocida: {d}")
+                visitar(d)
+            visitando.discard(nombre)
+            listas.add(nombre)
+
+        for nombre in seleccion:
+            visitar(nombre)
+
+    def _huella(self, etapa, estado):
+        """Hash de las entradas (contenido), el código de la etapa y sus parámetros"""
+        h = hashlib.sha256()
+        for ruta in etapa.entradas:
+            h.update(ruta.encode())
+            h.update(self._hash_archivo(ruta, estado).encode())
+        funcion = getattr(etapa.funcion, "func", etapa.funcion)  # Función de un functools.partial
+        try:
+            h.update(inspect.getsource(funcion).encode())
+        except (OSError, TypeError):  # Sin código fuente disponible
+            h.update(repr(funcion).encode())
+        for ruta in etapa.codigo:
+            h.update(self._hash_archivo(ruta, estado).encode())
+        h.update(json.dumps(etapa.parametros, sort_keys=True, default=str).encode())
+        return h.hexdigest()
+
+    def _hash_archivo(self, ruta, estado):
+        """SHA-256 del contenido; se reutiliza el anterior si no cambiaron tamaño ni fecha"""
+        if not os.path.exists(ruta):
+            return "ausente"
+        info = os.stat(ruta)
+        previo = estado["archivos"].get(ruta)
+        if previo and previo[0] == info.st_size and previo[1] == info.st_mtime_ns:
+            return previo[2]
+        h = hashlib.sha256()
+        with open(ruta, "rb") as f:
+            for bloque in iter(lambda: f.read(1 << 20), b""):
+                h.update(bloque)
+        estado["archivos"][ruta] = [info.st_size, info.st_mtime_ns, h.hexdigest()]
+        return h.hexdigest()
+
+    def _leer_estado(self):
+        try:
+            with open(self.ruta_estado, "r", encoding="utf-8") as f:
+                estado = json.load(f)
+            return {"etapas": estado.get("etapas", {}), "archivos": estado.get("archivos", {})}
+        except (OSError, ValueError):
+            return {"etapas": {}, "archivos": {}}
+
+    def _guardar_estado(self, estado):
+        os.makedirs(os.path.dirname(self.ruta_estado) or ".", exist_ok=True)
+        temporal = f"{self.ruta_estado}.tmp"
+        with open(temporal, "w", encoding="utf-8") as f:
+            json.dump(estado, f, indent=2)
+        os.replace(temporal, self.ruta_estado)
+
+
+def _ejecutar_etapa(nombre, funcion):
+    """Ejecuta una etapa y devuelve (ok, segundos, error); función de módulo para ProcessPoolExecutor"""
+    inicio = time.perf_counter()
+    try:
+        with Instrumentacion.span(f"etapa.{nombre}"):  # Span de primer nivel: aquí se perfila si se pidió
+            ok = funcion() is not False
+        error = None
+    except Exception as e:
+        ok, error = False, f"{type(e).__name__}: {e}"
+    return ok, time.perf_counter() - inicio, error
+
+
+def _resultado(nombre, estado, segundos=0.0, motivo=None):
+    return {"etapa": nombre, "estado": estado, "segundos": segundos, "motivo": motivo}
+
+
+def _imprimir_resumen(resumen, total):
+    print("\n--- Resumen del pipeline ---")
+    print(f"{'etapa':>16} {'estado':>12} {'segundos':>9}  motivo")
+    for r in resumen:
+        print(f"{r['etapa']:>16} {r['estado']:>12} {r['segundos']:>9.2f}  {r['motivo'] or ''}")
+    print(f"{'total':>16} {'':>12} {total:>9.2f}")
@@ -1,2 +1,106 @@
 #helpers/ → Clase Utilidades: contiene funciones auxiliares reutilizables para
-#validaciones, formateo, etc.
\ No newline at end of file
+#validaciones, formateo, etc.
+import os
+
+import pandas as pd
+
+try:
+    from helpers.Instrumentacion import Instrumentacion
+except ModuleNotFoundError:  # Importado como src.helpers (Visualizador)
+    from src.helpers.Instrumentacion import Instrumentacion
+
+# Formatos de tabla soportados y su extensión
+FORMATOS = {"csv": ".csv", "parquet": ".parquet", "arrow": ".arrow"}
+FORMATOS_RAPIDOS = ("arrow", "parquet")  # En orden de preferencia para lectura
+
+
+class Utilidades:
+    @staticmethod
+    def formato_de_ruta(ruta):
+        """Devuelve el formato ('csv', 'parquet', 'arrow') según la extensión del archivo"""
+        extension = os.path.splitext(ruta)[1].lower()
+        for formato, ext in FORMATOS.items():
+            if extension == ext or (formato == "arrow" and extension in (".feather", ".ipc")):
+                return formato
+        return "csv"
+
+    @staticmethod
+    def ruta_con_formato(ruta, formato):
+        """Cambia la extensión de la ruta por la del formato indicado"""
+        if formato not in FORMATOS:
+            raise ValueError(f"Formato no soportado: {formato}. Opciones: {', '.join(FORMATOS)}")
+        return os.path.splitext(ruta)[0] + FORMATOS[formato]
+
+    @staticmethod
+    def escribir_tabla(df, ruta, formato=None):
+        """
+        Guarda un DataFrame en CSV, Parquet o Arrow IPC.
+        Parquet y Arrow conservan los tipos (categorías, int32, fechas...).
+        """
+        formato = formato or Utilidades.formato_de_ruta(ruta)
+        os.makedirs(os.path.dirname(ruta) or ".", exist_ok=True)
+        if formato == "csv":
+            df.to_csv(ruta, index=False)
+            Instrumentacion.registrar(bytes_escritos=os.path.getsize(ruta))
+            return ruta
+
+        pa = _importar_pyarrow()
+        tabla = pa.Table.from_pandas(df, preserve_index=False)
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            pq.write_table(tabla, ruta)
+        else:
+            import pyarrow.ipc as ipc
+            # Sin compresión para que la lectura con memory map no copie los buffers
+            with ipc.new_file(ruta, tabla.schema) as escritor:
+                escritor.write_table(tabla)
+        Instrumentacion.registrar(bytes_escritos=os.path.getsize(ruta))
+        return ruta
+
+    @staticmethod
+    def leer_tabla(ruta, columnas=None):
+        """
+        Lee un archivo CSV, Parquet o Arrow IPC.
+
+        Args:
+            ruta (str): Archivo a leer.
+            columnas (list, optional): Solo se leen estas columnas (proyección).
+        """
+        formato = Utilidades.formato_de_ruta(ruta)
+        Instrumentacion.registrar(bytes_leidos=os.path.getsize(ruta))
+        if formato == "csv":
+            return pd.read_csv(ruta, usecols=columnas)
+
+        pa = _importar_pyarrow()
+        if formato == "parquet":
+            import pyarrow.parquet as pq
+            tabla = pq.read_table(ruta, columns=columnas, memory_map=True)
+        else:
+            import pyarrow.ipc as ipc
+            tabla = ipc.open_file(pa.memory_map(ruta, "r")).read_all()
+            if columnas is not None:
+                tabla = tabla.select(columnas)
+        return tabla.to_pandas()
+
+    @staticmethod
+    def ruta_mas_rapida(ruta):
+        """
+        Si junto a `ruta` hay una copia Arrow o Parquet igual o más reciente, devuelve
+        esa ruta; si no, devuelve la original.
+        """
+        mtime = os.path.getmtime(ruta) if os.path.exists(ruta) else None
+        for formato in FORMATOS_RAPIDOS:
+            candidata = Utilidades.ruta_con_formato(ruta, formato)
+            if candidata == ruta or not os.path.exists(candidata):
+                continue
+            if mtime is None or os.path.getmtime(candidata) >= mtime:
+                return candidata
+        return ruta
+
+
+def _importar_pyarrow():
+    try:
+        import pyarrow
+    except ImportError as e:
+        raise ImportError("Los formatos Parquet/Arrow requieren el paquete 'pyarrow'") from e
+    return pyarrow
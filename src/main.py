@@ -1,9 +1,11 @@
+import argparse  # Para la línea de comandos por etapas
 import os  # Para manejo de rutas de archivos y carpetas
 import sys  # Para modificar sys.path y poder importar módulos locales
-import json  # Para leer archivos JSON
-import pandas as pd  # Para manejo de dataframes
-import matplotlib.pyplot as plt  # Para gráficos
-import seaborn as sns  # Para gráficos estadísticos
+import time  # Para medir el arranque y cada etapa
+from contextlib import contextmanager
+from functools import partial
+
+INICIO = time.perf_counter()  # Referencia para el tiempo de arranque
 
 # --- Añadir rutas para imports locales ---
 BASE_DIR = os.path.dirname(os.path.abspath(__file__))  # Carpeta actual del script
@@ -13,119 +15,452 @@ if BASE_DIR not in sys.path:  # Verificar si BASE_DIR está en sys.path
 if PROJECT_ROOT not in sys.path:  # Verificar si PROJECT_ROOT está en sys.path
     sys.path.append(PROJECT_ROOT)  # Agregar PROJECT_ROOT a sys.path
 
-# --- Imports de tu proyecto ---
-from datos.GestorDatos import GestorDatos  # Clase para cargar y limpiar datos
-from basedatos.GestorBaseDatos import GestorBaseDatos  # Clase para SQL Server
-from api.ClienteAPI import ClienteAPI  # Clase para obtener datos de clima vía API
-from src.eda.ProcesadorEDA import ProcesadorEDA  # Clase para análisis exploratorio de datos
-try:
-    from modelos.ModeloML import ModeloML  # Modelo de ML
-except ModuleNotFoundError:
-    from modelos.ModeloML import ModeloML  # Alternativa si hay diferencia de nombre
-
-def main():
-    # --- Directorios ---
-    carpeta_raw = os.path.join(PROJECT_ROOT, "data", "raw")  # Carpeta de datos crudos
-    carpeta_processed = os.path.join(PROJECT_ROOT, "data", "processed")  # Carpeta de datos procesados
-    os.makedirs(carpeta_processed, exist_ok=True)  # Crear carpeta processed si no existe
-    carpeta_modelos = os.path.join(PROJECT_ROOT, "modelos")  # Carpeta para guardar modelos
-    os.makedirs(carpeta_modelos, exist_ok=True)  # Crear carpeta modelos si no existe
-
-    # ------------------- CARGA Y LIMPIEZA DE DATOS -------------------
-    # Peajes
-    ruta_peajes = os.path.join(carpeta_raw, "Datos_Abiertos_ARESEP_Flujo_vehicular_CONAVI_.csv")  # Ruta CSV peajes
-    gestor_peajes = GestorDatos(ruta_peajes)  # Crear instancia de GestorDatos
-    df_peajes = gestor_peajes.cargar()  # Cargar CSV
-    df_peajes = gestor_peajes.limpiar()  # Limpiar datos
-    ruta_peajes_clean = os.path.join(carpeta_processed, "peajes_clean.csv")  # Ruta para guardar CSV limpio
-    gestor_peajes.exportar_csv(ruta_peajes_clean)  # Exportar CSV limpio
+# Los imports del proyecto (pandas, requests, sklearn, matplotlib, pyodbc) se hacen dentro
+# de cada etapa: 'python main.py predict' no carga lo que solo usan las demás.
 
-    # Clima desde API
-    cliente_api = ClienteAPI()  # Crear cliente API
-    df_clima = cliente_api.obtener_datos()  # Obtener datos de clima
-    cliente_api.exportar_csv()  # Guardar CSV de clima en processed
-    gestor_clima = GestorDatos(cliente_api.csv_path)  # Cargar CSV con GestorDatos
-    df_clima_csv = gestor_clima.cargar()  # Leer CSV en dataframe
-
-    # Contaminación desde JSON
-    ruta_contaminacion = os.path.join(carpeta_raw, "code.json")  # Ruta archivo JSON
-    with open(ruta_contaminacion, "r", encoding="utf-8") as f:  # Abrir JSON
-        data = json.load(f)  # Leer JSON
-    df_contaminacion = pd.DataFrame(data)  # Convertir JSON a dataframe
-    ruta_contaminacion_csv = os.path.join(carpeta_processed, "contaminacion_mensual.csv")  # Ruta CSV procesado
-    df_contaminacion.to_csv(ruta_contaminacion_csv, index=False, encoding="utf-8")  # Guardar CSV
-
-    # ------------------- INTEGRACIÓN DE DATOS -------------------
+FORMATO_CACHE = "parquet"  # Copia columnar de data/processed que se relee en lugar del CSV
+CARPETA_RAW = os.path.join(PROJECT_ROOT, "data", "raw")  # Carpeta de datos crudos
+CARPETA_PROCESSED = os.path.join(PROJECT_ROOT, "data", "processed")  # Carpeta de datos procesados
+CARPETA_MODELOS = os.path.join(PROJECT_ROOT, "modelos")  # Carpeta para guardar modelos
+RUTA_PEAJES_RAW = os.path.join(CARPETA_RAW, "Datos_Abiertos_ARESEP_Flujo_vehicular_CONAVI_.csv")  # CSV peajes
+RUTA_CONTAMINACION_RAW = os.path.join(CARPETA_RAW, "code.json")  # JSON contaminación
+RUTA_ESTADO_PIPELINE = os.path.join(PROJECT_ROOT, "data", "cache", "pipeline.json")  # Huellas de la última ejecución
+CARPETA_INSTRUMENTACION = os.path.join(PROJECT_ROOT, "reportes", "instrumentacion")  # Métricas y perfiles
+RUTA_MODELO = os.path.join(CARPETA_MODELOS, "modelo_pm25_regresion.joblib")  # Modelo PM2.5
+# Copia del modelo solo NumPy (bosque, lineal o KNN): predict la carga sin importar sklearn
+RUTA_MODELO_COMPACTO = os.path.join(CARPETA_MODELOS, "modelo_pm25_regresion.compacto.joblib")
+RUTA_PRONOSTICO = os.path.join(CARPETA_MODELOS, "modelo_pronostico_contaminantes.joblib")
+RUTA_PRONOSTICO_COMPACTO = os.path.join(CARPETA_MODELOS, "modelo_pronostico_contaminantes.compacto.joblib")
+# Clima que se descarga; el rango, las ubicaciones y el servidor forman parte de la huella de la etapa
+CLIMA_FECHA_INICIO = "2020-01-01"
+CLIMA_FECHA_FIN = "2023-12-31"
+CLIMA_UBICACIONES = None  # {nombre: (lat, lon)}; None = la coordenada GAM de ClienteAPI
+TTL_CLIMA = 6 * 3600  # Vigencia del tramo del año en curso (caché de ClienteAPI y huella de la etapa)
+FEATURES = ['pm10', 'CO', 'NO2', 'O3', 'TempMax', 'TempMin', 'Precipitacion', 'Mes',
+            'Total', 'Liviano']  # Features para ML (clima, contaminación y tráfico)
+
+# Nombre para EDA/base de datos -> archivo en data/processed
+TABLAS = {
+    "Peajes": "peajes_clean.csv",
+    "ClimaMensual": "clima_mensual_2020_2023.csv",
+    "ContaminacionMensual": "contaminacion_mensual.csv",
+    "ClimaContaminacion": "clima_contaminacion.csv",
+}
+
+TIEMPOS = {}  # (etapa, 'imports' | 'carga modelo') -> segundos
+
+
+@contextmanager
+def medir(etapa, parte):
+    """Acumula en TIEMPOS el tiempo de una parte de una etapa"""
+    inicio = time.perf_counter()
     try:
-        df_clima_contaminacion = pd.merge(
-            df_clima_csv, df_contaminacion, on=["Anio", "Mes"], how="inner"  # Merge por Año y Mes
+        yield
+    finally:
+        TIEMPOS[(etapa, parte)] = TIEMPOS.get((etapa, parte), 0.0) + time.perf_counter() - inicio
+
+
+def leer_procesado(nombre):
+    """Lee una tabla de data/processed (la copia Parquet si está al día); None si no existe"""
+    from datos.GestorDatos import GestorDatos  # Clase para cargar y limpiar datos
+    from helpers.Utilidades import Utilidades  # Lectura/escritura CSV, Parquet y Arrow
+
+    ruta = Utilidades.ruta_mas_rapida(os.path.join(CARPETA_PROCESSED, TABLAS[nombre]))
+    if not os.path.exists(ruta):
+        print(f"No existe {ruta}; ejecuta antes la etapa que la genera (ingest / fetch-climate).")
+        return None
+    return GestorDatos(ruta).cargar()
+
+
+def integrar():
+    """
+    Une clima, contaminación y tráfico por (Anio, Mes) si ya están las tres tablas.
+    Devuelve True si se integró, None si faltan tablas y False si hubo un error.
+    """
+    from datos.IntegradorDatos import IntegradorDatos  # Une clima, contaminación y tráfico
+    from helpers.Utilidades import Utilidades
+
+    if not all(os.path.exists(os.path.join(CARPETA_PROCESSED, TABLAS[n]))
+               for n in ("Peajes", "ClimaMensual", "ContaminacionMensual")):
+        print("Integración pendiente: faltan tablas procesadas (ejecuta ingest y fetch-climate).")
+        return None
+    try:
+        integrador = IntegradorDatos(carpeta_cache=os.path.join(PROJECT_ROOT, "data", "cache", "integracion"))
+        df_clima_contaminacion = integrador.integrar(
+            leer_procesado("ClimaMensual"), leer_procesado("ContaminacionMensual"),
+            leer_procesado("Peajes")  # Join por (Anio, Mes) con tráfico mensual
         )
-        ruta_clima_cont_csv = os.path.join(carpeta_processed, "clima_contaminacion.csv")  # Ruta CSV final
+        ruta_clima_cont_csv = os.path.join(CARPETA_PROCESSED, TABLAS["ClimaContaminacion"])  # Ruta CSV final
         df_clima_contaminacion.to_csv(ruta_clima_cont_csv, index=False, encoding="utf-8")  # Guardar CSV final
+        Utilidades.escribir_tabla(df_clima_contaminacion,
+                                  Utilidades.ruta_con_formato(ruta_clima_cont_csv, FORMATO_CACHE))
+        return True
     except Exception as e:  # Si hay error en la integración
         print(f"Error integrando Clima y Contaminación: {e}")  # Mostrar mensaje
-        return  # Salir del programa
-
-    # ------------------- VISUALIZACIÓN DE DATOS (EDA) -------------------
-    dfs_eda = {
-        "Peajes": df_peajes,
-        "ClimaMensual": df_clima_csv,
-        "ContaminacionMensual": df_contaminacion,
-        "ClimaContaminacion": df_clima_contaminacion
-    }  # Diccionario de dataframes para EDA
-    eda = ProcesadorEDA(dfs_eda)  # Crear instancia de ProcesadorEDA
+        return False
+
+
+def etapa_peajes(args):
+    """Limpieza del CSV de peajes -> data/processed"""
+    with medir("peajes", "imports"):
+        from datos.GestorDatos import GestorDatos
+
+    os.makedirs(CARPETA_PROCESSED, exist_ok=True)  # Crear carpeta processed si no existe
+    gestor_peajes = GestorDatos(RUTA_PEAJES_RAW)  # Crear instancia de GestorDatos
+    gestor_peajes.cargar()  # Cargar CSV
+    gestor_peajes.limpiar()  # Limpiar datos
+    ruta_peajes_clean = os.path.join(CARPETA_PROCESSED, TABLAS["Peajes"])  # Ruta para guardar CSV limpio
+    gestor_peajes.exportar_csv(ruta_peajes_clean)  # Exportar CSV limpio
+    gestor_peajes.exportar_csv(ruta_peajes_clean, formato=FORMATO_CACHE)  # Copia columnar
+    return True
+
+
+def etapa_contaminacion(args):
+    """Contaminación desde JSON -> data/processed (lectura por bloques, sin cargar el archivo completo)"""
+    with medir("contaminacion", "imports"):
+        from datos.CargadorContaminacion import CargadorContaminacion  # Lector incremental de JSON/NDJSON
+        from helpers.Utilidades import Utilidades
+
+    ruta_contaminacion_csv = os.path.join(CARPETA_PROCESSED, TABLAS["ContaminacionMensual"])  # Ruta CSV procesado
+    cargador = CargadorContaminacion(RUTA_CONTAMINACION_RAW)
+    # Una sola pasada por el JSON escribe el CSV y la copia columnar
+    cargador.exportar([ruta_contaminacion_csv, Utilidades.ruta_con_formato(ruta_contaminacion_csv, FORMATO_CACHE)])
+    return True
+
+
+def etapa_fetch_climate(args):
+    """Clima mensual desde la API -> data/processed"""
+    with medir("clima", "imports"):
+        from api.ClienteAPI import URL_ERA5, ClienteAPI  # Clase para obtener datos de clima vía API
+
+    # Misma carpeta que leen integrar, EDA y load-db; $PROYECTO_URL_CLIMA apunta a otro servidor (p. ej. local)
+    cliente_api = ClienteAPI(ubicaciones=CLIMA_UBICACIONES, fecha_inicio=CLIMA_FECHA_INICIO,
+                             fecha_fin=CLIMA_FECHA_FIN, url_base=url_clima() or URL_ERA5,
+                             ttl_cache=TTL_CLIMA, carpeta_salida=CARPETA_PROCESSED)
+    try:
+        cliente_api.obtener_datos()  # Obtener datos de clima
+    except Exception as e:  # Red, HTTP (tras los reintentos) o respuesta inválida
+        print(f"Error obteniendo el clima: {e}")
+        return False
+    cliente_api.exportar_csv()  # Guardar CSV de clima en processed
+    cliente_api.exportar_csv(formato=FORMATO_CACHE)  # Copia columnar
+    return True
+
+
+def url_clima():
+    """Servidor de clima de $PROYECTO_URL_CLIMA; None = la API ERA5 de Open-Meteo"""
+    return os.environ.get("PROYECTO_URL_CLIMA") or None
+
+
+def parametros_clima():
+    """
+    Parámetros de la huella de la etapa clima. Si el rango llega al año en curso se agrega
+    el tramo de TTL_CLIMA actual: al vencer, la etapa vuelve a pedir los meses recientes.
+    """
+    parametros = {"url": url_clima(), "fecha_inicio": CLIMA_FECHA_INICIO, "fecha_fin": CLIMA_FECHA_FIN,
+                  "ubicaciones": CLIMA_UBICACIONES}
+    if int(CLIMA_FECHA_FIN[:4]) >= time.localtime().tm_year:
+        parametros["vigencia"] = int(time.time() // TTL_CLIMA)
+    return parametros
+
+
+def etapa_integrar(args):
+    """Clima + contaminación + tráfico por (Anio, Mes); pendiente si falta alguna tabla"""
+    return integrar() is not False
+
+
+def etapa_eda(args):
+    """Resumen en consola y reporte de figuras (solo se redibujan las de datos que cambiaron)"""
+    with medir("eda", "imports"):
+        from src.eda.ProcesadorEDA import ProcesadorEDA  # Clase para análisis exploratorio de datos
+
+    dfs_eda = {nombre: leer_procesado(nombre) for nombre in TABLAS}  # Diccionario de dataframes para EDA
+    dfs_eda = {nombre: df for nombre, df in dfs_eda.items() if df is not None}
+    if not dfs_eda:
+        return False
+    eda = ProcesadorEDA(dfs_eda, carpeta_cache=os.path.join(PROJECT_ROOT, "data", "cache", "eda"))  # Resúmenes en caché
     eda.info_general()  # Mostrar info general de los dataframes
     eda.estadisticas()  # Mostrar estadísticas descriptivas
 
-    print("\nMostrando gráficos...")  # Mensaje
-    for nombre, df in dfs_eda.items():  # Iterar sobre los dataframes
-        numeric_cols = df.select_dtypes(include="number").columns  # Columnas numéricas
-        if len(numeric_cols) == 0:  # Si no hay columnas numéricas
-            continue  # Saltar
-
-        df[numeric_cols].hist(bins=30, figsize=(12,8))  # Histogramas
-        plt.suptitle(f"Histogramas - {nombre}", fontsize=14)
-        plt.show()  # Mostrar gráfico
-
-
-        plt.figure(figsize=(10,8))  # Figura correlación
-        sns.heatmap(df[numeric_cols].corr(), annot=True, cmap="coolwarm", fmt=".2f")  # Heatmap correlación
-        plt.title(f"Matriz de Correlación - {nombre}")
-        plt.show()  # Mostrar gráfico
-
-    # ------------------- CONEXIÓN A SQL SERVER -------------------
-    gestor_db = GestorBaseDatos(
-        server=r"DESKTOP-GQ1EGAS\JOHEL",  # Servidor SQL
-        database="ProyectoClimaContaminacion"  # Base de datos
-    )
-    gestor_db.conectar()  # Conectar a SQL Server
-    gestor_db.crear_tabla_desde_dataframe(df_peajes, "FlujoVehicular")  # Crear tabla peajes
-    gestor_db.crear_tabla_desde_dataframe(df_clima_csv, "ClimaMensual")  # Crear tabla clima
-    gestor_db.crear_tabla_desde_dataframe(df_contaminacion, "ContaminacionMensual")  # Crear tabla contaminación
-    gestor_db.crear_tabla_desde_dataframe(df_clima_contaminacion, "ClimaContaminacion")  # Crear tabla merge
-    gestor_db.insertar_dataframe(df_peajes, "FlujoVehicular")  # Insertar datos peajes
-    gestor_db.insertar_dataframe(df_clima_csv, "ClimaMensual")  # Insertar datos clima
-    gestor_db.insertar_dataframe(df_contaminacion, "ContaminacionMensual")  # Insertar datos contaminación
-    gestor_db.insertar_dataframe(df_clima_contaminacion, "ClimaContaminacion")  # Insertar datos merge
-
-    # ------------------- MACHINE LEARNING -------------------
+    # Figuras sin pantalla en paralelo + index.html; solo se redibujan las de datos que cambiaron
+    tiempos_eda = eda.generar_reporte(os.path.join(PROJECT_ROOT, "reportes", "eda"), formatos=("png", "svg"))
+    print(tiempos_eda.to_string(index=False))  # Tiempo de dibujo por figura
+    return True
+
+
+def etapa_load_db(args):
+    """Carga incremental de las tablas procesadas en la base de datos"""
+    with medir("load-db", "imports"):
+        from basedatos.GestorBaseDatos import GestorBaseDatos  # Clase para la base de datos
+        from basedatos.Backends import BackendSQLServer, crear_backend  # Motores de base de datos
+
+    tablas = {nombre: leer_procesado(nombre) for nombre in TABLAS}
+    if any(df is None for df in tablas.values()):
+        return False
+
+    motor_db = args.motor.lower()  # sqlserver, sqlite o duckdb
+    if motor_db == "sqlserver":
+        backend_db = BackendSQLServer(
+            server=r"DESKTOP-GQ1EGAS\JOHEL",  # Servidor SQL
+            database="ProyectoClimaContaminacion"  # Base de datos
+        )
+    else:  # Base local para ejecutar sin SQL Server (p. ej. en Linux)
+        backend_db = crear_backend(motor_db, ruta=os.path.join(PROJECT_ROOT, "data", f"proyecto.{motor_db}"))
+    gestor_db = GestorBaseDatos(backend=backend_db)
+    gestor_db.conectar()  # Conectar a la base de datos
+    try:
+        gestor_db.crear_tabla_desde_dataframe(tablas["Peajes"], "FlujoVehicular")  # Crear tabla peajes
+        for nombre in ("ClimaMensual", "ContaminacionMensual", "ClimaContaminacion"):
+            gestor_db.crear_tabla_desde_dataframe(tablas[nombre], nombre)  # Crear tablas clima, contaminación y merge
+        # Carga incremental: solo se escriben los meses nuevos o modificados desde la última ejecución
+        gestor_db.upsert_dataframe(tablas["Peajes"], "FlujoVehicular",
+                                   claves=["Año", "Mes", "Puesto de Peaje"], columnas_periodo=["Año", "Mes"])  # Peajes
+        for nombre in ("ClimaMensual", "ContaminacionMensual", "ClimaContaminacion"):
+            gestor_db.upsert_dataframe(tablas[nombre], nombre,
+                                       claves=["Anio", "Mes"], columnas_periodo=["Anio", "Mes"])
+    finally:
+        gestor_db.cerrar()  # Cerrar conexión SQL
+    return True
+
+
+def etapa_train(args):
+    """Entrena (o actualiza con los meses nuevos) el modelo de PM2.5 y el de pronóstico"""
+    with medir("train", "imports"):
+        from modelos.ModeloML import ModeloML  # Modelo de ML
+
+    df_clima_contaminacion = leer_procesado("ClimaContaminacion")
+    if df_clima_contaminacion is None:
+        return False
+    os.makedirs(CARPETA_MODELOS, exist_ok=True)  # Crear carpeta modelos si no existe
+
     print("\n--- Iniciando Machine Learning ---")
-    features = ['pm10', 'CO', 'NO2', 'O3', 'TempMax', 'TempMin', 'Precipitacion', 'Mes']  # Features para ML
     modelo = ModeloML(df=df_clima_contaminacion, tipo_modelo="regresion", target_column="pm2_5")  # Crear modelo
-    if modelo.prepare_data(features_list=features):  # Preparar datos
-        modelo.train_model(algorithm="RandomForest")  # Entrenar modelo
-        modelo.evaluate_model()  # Evaluar modelo
-        modelo_path = os.path.join(carpeta_modelos, "modelo_pm25_regresion.joblib")  # Ruta para guardar modelo
-        modelo.save_model(modelo_path)  # Guardar modelo
+    if os.path.exists(RUTA_MODELO) and not args.reentrenar:
+        # Ya hay modelo: se actualiza solo con los meses nuevos (--reentrenar fuerza la búsqueda completa)
+        modelo.load_model(RUTA_MODELO)
+        if not modelo.can_update():  # Archivo antiguo (solo el estimador): búsqueda completa
+            print("El modelo guardado no tiene ventana ni preprocesamiento de entrenamiento; se entrena desde cero.")
+            modelo = ModeloML(df=df_clima_contaminacion, tipo_modelo="regresion", target_column="pm2_5")
+    if modelo.can_update():
+        drift = modelo.update_model(df_clima_contaminacion, save_path=RUTA_MODELO)
+        if drift is not None:
+            print(drift.to_string(index=False))  # Deriva de los meses nuevos
+    elif modelo.prepare_data(features_list=FEATURES):  # Preparar datos
+        leaderboard = modelo.search(save_path=RUTA_MODELO)  # Comparar algoritmos con CV en paralelo y guardar el mejor
+        if leaderboard is not None:
+            print(leaderboard.head(10).to_string(index=False))  # Mostrar ranking
+        modelo.evaluate_model()  # Evaluar mejor modelo
+    else:
+        return False
+    guardar_compacto(modelo, RUTA_MODELO_COMPACTO)
+
+    # Pronóstico de todos los contaminantes a 1, 3 y 6 meses con un solo modelo
+    pronostico = ModeloML(df=df_clima_contaminacion, tipo_modelo="regresion", target_column="pm2_5")
+    if pronostico.prepare_forecast(horizons=(1, 3, 6)):  # Objetivos pm2_5_h1, pm10_h3, ...
+        pronostico.train_model("RandomForest")  # Bosque multi-salida nativo
+        pronostico.evaluate_model()  # Métricas por contaminante y horizonte
+        pronostico.save_model(RUTA_PRONOSTICO)
+        guardar_compacto(pronostico, RUTA_PRONOSTICO_COMPACTO)
+    return True
+
+
+def guardar_compacto(modelo, ruta):
+    """Copia solo NumPy para predict (bosque, lineal o KNN); si no la hay se borra la copia vieja"""
+    from modelos.ModeloML import compactar
+
+    if compactar(modelo.model) is not None:
+        modelo.save_model(ruta, compact=True)
+    elif os.path.exists(ruta):
+        os.remove(ruta)
+
+
+def etapa_predict(args):
+    """Predice con el modelo guardado para el último mes (o las filas de --entrada)"""
+    with medir("predict", "imports"):
+        import pandas as pd
+        from modelos.ModeloML import ModeloML  # Sin sklearn si se carga la copia compacta
+
+    ruta, compacta = (RUTA_PRONOSTICO, RUTA_PRONOSTICO_COMPACTO) if args.pronostico \
+        else (RUTA_MODELO, RUTA_MODELO_COMPACTO)
+    if os.path.exists(compacta) and os.path.exists(ruta) and os.path.getmtime(compacta) >= os.path.getmtime(ruta):
+        ruta = compacta
+    if not os.path.exists(ruta):
+        print(f"No hay modelo en {ruta}; ejecuta antes 'train'.")
+        return False
+
+    if args.entrada:
+        datos = pd.read_json(args.entrada) if args.entrada.endswith(".json") else pd.read_csv(args.entrada)
+        historial = datos
+    else:
+        historial = leer_procesado("ClimaContaminacion")
+        if historial is None:
+            return False
+        datos = historial.tail(1)  # Último mes
+
+    with medir("predict", "carga modelo"):
+        modelo = ModeloML(historial)  # El historial solo se usa con archivos antiguos sin preprocesamiento
+        modelo.load_model(ruta, mmap_mode="r")
+    pred = modelo.predict(datos)
+    if pred is None:
+        return False
+    if args.pronostico:
+        print(pred.T.to_string())  # Pronóstico por contaminante y horizonte
+    else:
+        for valor in pred:
+            print(f"Predicción PM2.5: {valor:.2f} μg/m³")
+    return True
+
+
+# Subcomando -> etapas del pipeline que ejecuta ('all' ejecuta todas)
+SUBCOMANDOS = {
+    "ingest": ["peajes", "contaminacion", "integrar"],
+    "fetch-climate": ["clima", "integrar"],
+    "eda": ["eda"],
+    "load-db": ["load-db"],
+    "train": ["train"],
+    "predict": ["predict"],
+}
+
+
+def crear_pipeline(args):
+    """
+    Grafo de etapas: peajes, contaminación y clima no dependen entre sí y corren en paralelo;
+    EDA, base de datos y entrenamiento corren en paralelo después de la integración.
+    """
+    from helpers.PlanificadorEtapas import Etapa, PlanificadorEtapas
+
+    def procesado(nombre):  # CSV procesado y su copia columnar
+        ruta = os.path.join(CARPETA_PROCESSED, TABLAS[nombre])
+        return [ruta, os.path.splitext(ruta)[0] + "." + FORMATO_CACHE]
+
+    def codigo(*modulos):  # Módulos del proyecto cuya versión cuenta en la huella de la etapa
+        return [os.path.join(BASE_DIR, *m.split("/")) for m in modulos]
+
+    tablas = [procesado(n)[0] for n in TABLAS]
+    entradas_integrar = [procesado(n)[0] for n in ("Peajes", "ClimaMensual", "ContaminacionMensual")]
+    motor_db = args.motor.lower()
+    base_local = [] if motor_db == "sqlserver" else [os.path.join(PROJECT_ROOT, "data", f"proyecto.{motor_db}")]
+
+    planificador = PlanificadorEtapas(RUTA_ESTADO_PIPELINE, max_workers=args.max_workers)
+    planificador.agregar(Etapa(
+        "peajes", partial(etapa_peajes, args), entradas=[RUTA_PEAJES_RAW], salidas=procesado("Peajes"),
+        codigo=codigo("datos/GestorDatos.py", "helpers/Utilidades.py")))
+    planificador.agregar(Etapa(
+        "contaminacion", partial(etapa_contaminacion, args), entradas=[RUTA_CONTAMINACION_RAW],
+        salidas=procesado("ContaminacionMensual"),
+        codigo=codigo("datos/CargadorContaminacion.py", "helpers/Utilidades.py")))
+    planificador.agregar(Etapa(
+        "clima", partial(etapa_fetch_climate, args), salidas=procesado("ClimaMensual"),
+        parametros=parametros_clima(), codigo=codigo("api/ClienteAPI.py", "datos/AgregadorTemporal.py")))
+    planificador.agregar(Etapa(
+        "integrar", partial(etapa_integrar, args), entradas=entradas_integrar,
+        salidas=procesado("ClimaContaminacion"), dependencias=["peajes", "contaminacion", "clima"],
+        codigo=codigo("datos/IntegradorDatos.py", "datos/AgregadorTemporal.py")))
+    planificador.agregar(Etapa(
+        "eda", partial(etapa_eda, args), entradas=tablas,
+        salidas=[os.path.join(PROJECT_ROOT, "reportes", "eda", "index.html")], dependencias=["integrar"],
+        codigo=codigo("eda/ProcesadorEDA.py", "eda/ResumenEstadistico.py", "visualizacion/GraficosGrandes.py")))
+    planificador.agregar(Etapa(
+        "load-db", partial(etapa_load_db, args), entradas=tablas, salidas=base_local,
+        dependencias=["integrar"], parametros={"motor": motor_db},
+        codigo=codigo("basedatos/GestorBaseDatos.py", "basedatos/Backends.py")))
+    planificador.agregar(Etapa(
+        "train", partial(etapa_train, args), entradas=[procesado("ClimaContaminacion")[0]],
+        salidas=[RUTA_MODELO, RUTA_PRONOSTICO], dependencias=["integrar"],
+        parametros={"reentrenar": args.reentrenar, "features": FEATURES},
+        codigo=codigo("modelos/ModeloML.py", "modelos/PreprocesadorML.py", "modelos/BosqueCompacto.py")))
+    planificador.agregar(Etapa(
+        "predict", partial(etapa_predict, args), dependencias=["train"], cache=False))  # Siempre muestra la predicción
+    return planificador
+
+
+def crear_parser():
+    parser = argparse.ArgumentParser(description="Proyecto clima, contaminación y tráfico por etapas")
+    parser.add_argument("--tiempos", action="store_true",
+                        help="Mostrar tiempo de arranque e imports de cada etapa")
+    parser.add_argument("--forzar", action="store_true",
+                        help="Ejecutar las etapas aunque sus entradas y su código no hayan cambiado")
+    parser.add_argument("--max-workers", type=int, default=4, help="Etapas simultáneas (por defecto 4)")
+    parser.add_argument("--instrumentar", action="store_true",
+                        help="Medir tiempo, filas, bytes y memoria de cada método (JSON y Prometheus "
+                             "en reportes/instrumentacion)")
+    parser.add_argument("--perfil", action="store_true", help="cProfile por etapa (.prof); implica --instrumentar")
+    parser.add_argument("--memoria", action="store_true",
+                        help="tracemalloc por etapa (pico y líneas que más asignan); implica --instrumentar")
+    # Las opciones generales también se aceptan después de la etapa ('main.py predict --tiempos')
+    comun = argparse.ArgumentParser(add_help=False)
+    comun.add_argument("--tiempos", action="store_true", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    comun.add_argument("--forzar", action="store_true", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    comun.add_argument("--max-workers", type=int, default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    for opcion in ("--instrumentar", "--perfil", "--memoria"):
+        comun.add_argument(opcion, action="store_true", default=argparse.SUPPRESS, help=argparse.SUPPRESS)
+    subparsers = parser.add_subparsers(dest="etapa")
+    todas = subparsers.add_parser("all", parents=[comun], help="Todas las etapas (por defecto)")
+    subparsers.add_parser("ingest", parents=[comun], help="Limpiar peajes y contaminación en data/processed")
+    subparsers.add_parser("fetch-climate", parents=[comun], help="Descargar el clima mensual de la API")
+    subparsers.add_parser("eda", parents=[comun], help="Resumen y reporte de figuras en reportes/eda")
+    db = subparsers.add_parser("load-db", parents=[comun], help="Carga incremental en la base de datos")
+    train = subparsers.add_parser("train", parents=[comun], help="Entrenar o actualizar los modelos")
+    predict = subparsers.add_parser("predict", parents=[comun], help="Predecir con el modelo guardado")
+    for sub in (predict, todas):
+        sub.add_argument("--entrada", help="CSV o JSON con las filas a predecir (por defecto, el último mes)")
+        sub.add_argument("--pronostico", action="store_true",
+                         help="Usar el modelo de pronóstico multi-contaminante y multi-horizonte")
+    for sub in (db, todas):
+        sub.add_argument("--motor", default=os.environ.get("PROYECTO_DB_MOTOR", "sqlserver"),
+                         help="sqlserver, sqlite o duckdb (por defecto $PROYECTO_DB_MOTOR o sqlserver)")
+    for sub in (train, todas):
+        sub.add_argument("--reentrenar", action="store_true",
+                         default=os.environ.get("PROYECTO_REENTRENAR") == "1",
+                         help="Búsqueda completa aunque ya exista un modelo")
+    return parser
+
+
+def main(argv=None):
+    args = crear_parser().parse_args(argv)
+    # Valores por defecto de las opciones que no tiene el subcomando elegido
+    valores = {"entrada": None, "pronostico": False,
+               "motor": os.environ.get("PROYECTO_DB_MOTOR", "sqlserver"),
+               "reentrenar": os.environ.get("PROYECTO_REENTRENAR") == "1"}
+    for opcion, valor in valores.items():
+        if not hasattr(args, opcion):
+            setattr(args, opcion, valor)
+    arranque = time.perf_counter() - INICIO
+
+    instrumentar = args.instrumentar or args.perfil or args.memoria
+    if instrumentar:
+        from helpers.Instrumentacion import Instrumentacion
+        Instrumentacion.activar(perfil=args.perfil, memoria=args.memoria, carpeta_perfiles=CARPETA_INSTRUMENTACION)
+        if args.perfil or args.memoria:
+            args.max_workers = 1  # Una etapa a la vez: tracemalloc es global al proceso
+
+    planificador = crear_pipeline(args)
+    objetivos = SUBCOMANDOS.get(args.etapa)  # None con 'all' o sin subcomando: todas las etapas
+    resumen = planificador.ejecutar(objetivos, forzar=args.forzar)
 
-        if not modelo.X_test.empty:  # Si hay datos de test
-            sample_new = modelo.X_test.head(1)  # Tomar primera fila
-            pred = modelo.predict(sample_new)  # Predecir PM2.5
-            print(f"Predicción PM2.5 para muestra: {pred[0]:.2f} μg/m³")  # Mostrar resultado
+    if instrumentar:
+        Instrumentacion.exportar_json(os.path.join(CARPETA_INSTRUMENTACION, "metricas.json"))
+        Instrumentacion.exportar_prometheus(os.path.join(CARPETA_INSTRUMENTACION, "metricas.prom"))
+        print(f"\n{'span':>40} {'llamadas':>8} {'segundos':>9} {'filas ent':>10} {'filas sal':>10} "
+              f"{'MB leídos':>10} {'MB escritos':>11} {'RSS +MB':>8}")
+        for fila in Instrumentacion.resumen()[:20]:
+            filas_entrada = fila["filas_entrada"] if fila["filas_entrada"] is not None else "-"
+            filas_salida = fila["filas_salida"] if fila["filas_salida"] is not None else "-"
+            rss = f"{fila['rss_pico_kb'] / 1024:.1f}" if fila["rss_pico_kb"] is not None else "-"
+            print(f"{fila['span']:>40} {fila['llamadas']:>8} {fila['segundos']:>9.2f} {filas_entrada:>10} "
+                  f"{filas_salida:>10} {fila['bytes_leidos'] / 1e6:>10.2f} {fila['bytes_escritos'] / 1e6:>11.2f} "
+                  f"{rss:>8}")
+        print(f"Métricas en {CARPETA_INSTRUMENTACION} (metricas.json, metricas.prom)")
 
-    print("\n--- Fin del proceso ---")  # Mensaje final
-    gestor_db.cerrar()  # Cerrar conexión SQL
+    if args.tiempos:
+        print(f"\nArranque: {arranque * 1000:.0f} ms")
+        for r in resumen:
+            partes = {parte: s for (e, parte), s in TIEMPOS.items() if e == r["etapa"]}
+            if partes:
+                print(f"{r['etapa']:>14}: " + ", ".join(f"{parte} {s * 1000:.0f} ms" for parte, s in partes.items()))
+        print(f"{'proceso':>14}: {(time.perf_counter() - INICIO) * 1000:.0f} ms")
+    return all(r["estado"] in ("ejecutada", "sin cambios") for r in resumen)
 
 
 if __name__ == "__main__":  # Ejecutar main solo si se ejecuta el script directamente
-    main()
+    sys.exit(0 if main() else 1)
@@ -0,0 +1,90 @@
+import numpy as np
+
+
+class BosqueCompacto:
+    def __init__(self, feature, threshold, left, right, value, roots, classes=None, n_features_in=None):
+        """
+        Árbol o bosque de sklearn aplanado en arreglos contiguos de NumPy.
+
+        Los nodos de todos los árboles van seguidos en los mismos arreglos; los índices de
+        hijos son globales y las hojas tienen left == -1. Como son arreglos simples, al
+        cargar el artefacto con joblib.load(mmap_mode='r') se mapean en memoria y varios
+        procesos comparten una sola copia (los objetos Tree de sklearn, en cambio, copian
+        sus nodos al deserializarse).
+
+        Crear con BosqueCompacto.desde_estimador(estimador).
+        """
+        self.feature = feature  # int32: característica de cada nodo
+        self.threshold = threshold  # float64: umbral (x <= umbral -> izquierda)
+        self.left = left  # int32: hijo izquierdo global (-1 en hojas)
+        self.right = right  # int32: hijo derecho global
+        self.value = value  # float64 (nodos, salidas o clases): media (regresión) o proporción por clase
+        self.roots = roots  # int32: nodo raíz de cada árbol
+        self.classes_ = classes
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def desde_estimador(cls, estimador):
+        """
+        Aplana un DecisionTree o RandomForest (regresión de una o varias salidas, o
+        clasificación de una salida). Devuelve None si el estimador no es un árbol o bosque.
+        """
+        arboles = getattr(estimador, "estimators_", None)
+        if arboles is None:
+            arboles = [estimador] if hasattr(estimador, "tree_") else None
+        clasificador = hasattr(estimador, "classes_")
+        if not arboles or not all(hasattr(a, "tree_") for a in arboles) or (clasificador and getattr(estimador, "n_outputs_", 1) != 1):
+            return None
+
+        partes = {"feature": [], "threshold": [], "left": [], "right": [], "value": []}
+        roots = []
+        desplazamiento = 0
+        for arbol in arboles:
+            t = arbol.tree_
+            hoja = t.children_left == -1
+            roots.append(desplazamiento)
+            partes["feature"].append(np.where(hoja, 0, t.feature))
+            partes["threshold"].append(t.threshold)
+            partes["left"].append(np.where(hoja, -1, t.children_left + desplazamiento))
+            partes["right"].append(np.where(hoja, -1, t.children_right + desplazamiento))
+            if clasificador:
+                # Conteos (o fracciones) por clase -> proporciones, como predict_proba
+                valores = t.value[:, 0, :]
+                valores = valores / valores.sum(axis=1, keepdims=True)
+            else:
+                valores = t.value[:, :, 0]  # Una columna por salida
+            partes["value"].append(valores)
+            desplazamiento += t.node_count
+
+        return cls(
+            feature=np.ascontiguousarray(np.concatenate(partes["feature"]), dtype=np.int32),
+            threshold=np.ascontiguousarray(np.concatenate(partes["threshold"]), dtype=np.float64),
+            left=np.ascontiguousarray(np.concatenate(partes["left"]), dtype=np.int32),
+            right=np.ascontiguousarray(np.concatenate(partes["right"]), dtype=np.int32),
+            value=np.ascontiguousarray(np.concatenate(partes["value"]), dtype=np.float64),
+            roots=np.asarray(roots, dtype=np.int32),
+            classes=getattr(estimador, "classes_", None),
+            n_features_in=getattr(estimador, "n_features_in_", None),
+        )
+
+    def _hojas(self, X):
+        """Hoja alcanzada por cada (muestra, árbol); todos los árboles avanzan a la vez, un nivel por paso"""
+        X = np.asarray(X, dtype=np.float32)  # sklearn compara en float32; así las divisiones coinciden
+        filas = np.arange(len(X))[:, None]
+        nodos = np.broadcast_to(self.roots, (len(X), len(self.roots))).copy()
+        while True:
+            izquierda = self.left[nodos]
+            activos = izquierda != -1
+            if not activos.any():
+                return nodos
+            va_izquierda = X[filas, self.feature[nodos]] <= self.threshold[nodos]
+            nodos = np.where(activos, np.where(va_izquierda, izquierda, self.right[nodos]), nodos)
+
+    def predict_proba(self, X):
+        return self.value[self._hojas(X)].mean(axis=1)
+
+    def predict(self, X):
+        promedio = self.predict_proba(X)
+        if self.classes_ is not None:
+            return np.asarray(self.classes_)[promedio.argmax(axis=1)]
+        return promedio[:, 0] if promedio.shape[1] == 1 else promedio
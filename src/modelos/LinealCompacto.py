@@ -0,0 +1,48 @@
+import numpy as np
+
+
+class LinealCompacto:
+    def __init__(self, coef, intercept, classes=None, una_salida=True, n_features_in=None):
+        """
+        Modelo lineal de sklearn (LinearRegression, SGD, LogisticRegression) reducido a sus
+        coeficientes: predecir es un producto de matrices de NumPy, sin importar sklearn.
+
+        Crear con LinealCompacto.desde_estimador(estimador).
+        """
+        self.coef = coef  # float64 (salidas o clases, características)
+        self.intercept = intercept  # float64 (salidas o clases,)
+        self.classes_ = classes
+        self.una_salida = una_salida  # Regresión de una salida: predict devuelve un arreglo 1-D
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def desde_estimador(cls, estimador):
+        """
+        Extrae coef_ e intercept_ de un modelo lineal, o de un MultiOutputRegressor de
+        modelos lineales (un SGD por objetivo). Devuelve None si el estimador no es lineal.
+        """
+        if hasattr(estimador, "coef_"):
+            coef, intercept = np.atleast_2d(estimador.coef_), np.atleast_1d(estimador.intercept_)
+            una_salida = np.ndim(estimador.coef_) == 1
+        elif getattr(estimador, "estimators_", None) and all(hasattr(e, "coef_") and np.ndim(e.coef_) == 1
+                                                             for e in estimador.estimators_):
+            coef = np.vstack([e.coef_ for e in estimador.estimators_])
+            intercept = np.concatenate([np.atleast_1d(e.intercept_) for e in estimador.estimators_])
+            una_salida = False
+        else:
+            return None
+        return cls(
+            coef=np.ascontiguousarray(coef, dtype=np.float64),
+            intercept=np.ascontiguousarray(np.broadcast_to(intercept, coef.shape[:1]), dtype=np.float64),
+            classes=getattr(estimador, "classes_", None),
+            una_salida=una_salida,
+            n_features_in=getattr(estimador, "n_features_in_", None),
+        )
+
+    def predict(self, X):
+        z = np.asarray(X, dtype=np.float64) @ self.coef.T + self.intercept
+        if self.classes_ is not None:
+            clases = np.asarray(self.classes_)
+            # Binaria: una sola función de decisión, positiva -> segunda clase
+            return clases[(z[:, 0] > 0).astype(int)] if z.shape[1] == 1 else clases[z.argmax(axis=1)]
+        return z[:, 0] if self.una_salida else z
@@ -1,12 +1,39 @@
 # src/modelos/modelo_ml.py
 import pandas as pd
-from sklearn.model_selection import train_test_split
-from sklearn.linear_model import LinearRegression, LogisticRegression
-from sklearn.neighbors import KNeighborsRegressor, KNeighborsClassifier
-from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
-from sklearn.tree import DecisionTreeRegressor, DecisionTreeClassifier
-from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
+# sklearn se importa dentro de los métodos que entrenan o evalúan: cargar un modelo
+# guardado y predecir no paga el import completo (~1.5 s)
 import joblib  # Para guardar y cargar modelos
+import math
+import os
+import time
+import numpy as np
+from joblib import Parallel, delayed
+
+from datos.AgregadorTemporal import AgregadorTemporal
+from modelos.BosqueCompacto import BosqueCompacto
+from modelos.LinealCompacto import LinealCompacto
+from modelos.VecinosCompacto import VecinosCompacto
+from helpers.Instrumentacion import Instrumentacion, instrumentar
+from modelos.PreprocesadorML import PreprocesadorML
+
+VERSION_ARTEFACTO = 2  # Formato de save_model: dict con modelo + preprocesamiento
+MODELOS_COMPACTOS = (BosqueCompacto, LinealCompacto, VecinosCompacto)  # Predicen solo con NumPy
+
+# Rejillas de hiperparámetros por defecto para search()
+PARAM_GRIDS = {
+    "regresion": {
+        "LinearRegression": {"fit_intercept": [True, False]},
+        "KNN": {"n_neighbors": [3, 5, 7, 9], "weights": ["uniform", "distance"]},
+        "RandomForest": {"n_estimators": [100, 300], "max_depth": [None, 5, 10], "min_samples_leaf": [1, 2, 4]},
+        "DecisionTree": {"max_depth": [None, 3, 5, 10], "min_samples_leaf": [1, 2, 4]},
+    },
+    "clasificacion": {
+        "LogisticRegression": {"C": [0.1, 1.0, 10.0]},
+        "KNN": {"n_neighbors": [3, 5, 7, 9], "weights": ["uniform", "distance"]},
+        "RandomForest": {"n_estimators": [100, 300], "max_depth": [None, 5, 10], "min_samples_leaf": [1, 2, 4]},
+        "DecisionTree": {"max_depth": [None, 3, 5, 10], "min_samples_leaf": [1, 2, 4]},
+    },
+}
 
 
 class ModeloML:
@@ -26,7 +53,36 @@ class ModeloML:
         self.model = None
         self.X_train, self.X_test, self.y_train, self.y_test = None, None, None, None
         self.features = []  # Se definirá en prepare_data
+        self.preprocesador = None  # PreprocesadorML ajustado con X_train
+        self.leaderboard = None  # Resultado de search()
+        self.time_series = False  # True si los datos se prepararon con prepare_time_series()
+        self.ts_results = None  # Resultados por fold de evaluate_time_series()
+        self._ts_cache = {}  # Matrices de características temporales ya construidas
+        self.target_columns = None  # Objetivos de prepare_forecast() ('pm10_h3', ...); None = un solo objetivo
+        self.ventana = None  # Filas recientes (características + objetivo) para update_model()
+        self.drift_report = None  # Resultado de la última comprobación de deriva
+        self.preprocesador_reconstruido = False  # True si load_model rehízo el preprocesamiento con self.df
+
+    @classmethod
+    @instrumentar()
+    def from_location(cls, geo_layer, location, k=1, radius_km=None, tipo_modelo="regresion",
+                      target_column="pm2_5"):
+        """
+        Crea un modelo con la tabla mensual de una ubicación: contaminación y clima de los
+        puntos más cercanos y tráfico de los peajes cercanos (CapaGeografica.series).
+
+        Args:
+            geo_layer (CapaGeografica): Capa con los puntos y sus series.
+            location (tuple | str): (lat, lon) o nombre de un punto, p. ej. 'Zurquí'.
+            k (int | dict): Puntos más cercanos por tipo, o {tipo: k}.
+            radius_km (float, optional): Distancia máxima de los puntos a la ubicación.
+            tipo_modelo (str): 'regresion' o 'clasificacion'.
+            target_column (str): Nombre de la columna objetivo.
+        """
+        return cls(geo_layer.series(location, k=k, radio_km=radius_km), tipo_modelo=tipo_modelo,
+                   target_column=target_column)
 
+    @instrumentar()
     def prepare_data(self, features_list=None):
         """
         Prepara los datos para el entrenamiento del modelo.
@@ -36,37 +92,10 @@ class ModeloML:
             features_list (list, optional): Lista de nombres de columnas a usar como características.
                                             Si es None, se intentarán usar características predefinidas.
         """
-        if self.df is None or self.df.empty:
-            print("Error: DataFrame vacío o no cargado.")
-            return False
-
-        if self.target_column not in self.df.columns:
-            print(f"Error: La columna objetivo '{self.target_column}' no se encuentra en el DataFrame.")
+        if not self._validate_data():
             return False
 
-        # Definir características por defecto si no se proporcionan
-        if features_list:
-            self.features = features_list
-        else:
-            # Ejemplo de características basadas en los datos disponibles
-            # Asegúrate de que estas columnas existan en tu df_clima_contaminacion
-            # y que hayas integrado los datos de tráfico si los necesitas.
-            if self.tipo_modelo == "regresion":
-                self.features = [col for col in
-                                 ['pm10', 'CO', 'NO2', 'O3', 'TempMax', 'TempMin', 'Precipitacion', 'Anio', 'Mes'] if
-                                 col in self.df.columns and col != self.target_column]
-                # Si tienes datos de tráfico integrados, podrías añadir 'Total' o 'Liviano' etc.
-                # self.features.extend([col for col in ['Total', 'Liviano'] if col in self.df.columns])
-            elif self.tipo_modelo == "clasificacion":
-                self.features = [col for col in
-                                 ['pm10', 'CO', 'NO2', 'O3', 'TempMax', 'TempMin', 'Precipitacion', 'Anio', 'Mes'] if
-                                 col in self.df.columns and col != self.target_column]
-                # Para clasificación, la columna objetivo 'target_column' debe ser categórica.
-                # Necesitarás una función para convertir pm2_5 a categorías ICA si ese es tu objetivo.
-
-        # Filtrar solo las características que realmente existen en el DataFrame
-        self.features = [f for f in self.features if f in self.df.columns]
-
+        self.features = self._select_features(features_list)
         if not self.features:
             print("Error: No se encontraron características válidas para el entrenamiento.")
             return False
@@ -74,26 +103,258 @@ class ModeloML:
         X = self.df[self.features]
         y = self.df[self.target_column]
 
-        # Manejar valores infinitos o muy grandes que puedan causar problemas
-        X = X.replace([float('inf'), -float('inf')], pd.NA).fillna(X.mean())
+        # Manejar valores infinitos o muy grandes en el objetivo. En X los NaN/infinitos los
+        # imputa el preprocesador con las medias del conjunto de entrenamiento.
         y = y.replace([float('inf'), -float('inf')], pd.NA).fillna(
             y.mean() if pd.api.types.is_numeric_dtype(y) else y.mode()[0])
 
-        # Eliminar filas con NaN si aún quedan después del fillna (por si alguna columna es completamente NaN)
-        combined_df = pd.concat([X, y], axis=1).dropna()
-        X = combined_df[self.features]
-        y = combined_df[self.target_column]
+        # Eliminar filas cuyo objetivo siga vacío (por si la columna es completamente NaN)
+        validas = y.notna()
+        X = X[validas]
+        y = y[validas]
 
         if X.empty or y.empty:
             print("Error: Datos insuficientes después de la limpieza para la división de entrenamiento/prueba.")
             return False
 
+        from sklearn.model_selection import train_test_split
         self.X_train, self.X_test, self.y_train, self.y_test = train_test_split(
             X, y, test_size=0.2, random_state=42
         )
+        self.preprocesador = PreprocesadorML().fit(self.X_train)
+        self.time_series = False
+        self.target_columns = None
+        self.ventana = self._filas_ventana(self.df.loc[X.index], y)
         print(f"Datos preparados. X_train shape: {self.X_train.shape}, y_train shape: {self.y_train.shape}")
         return True
 
+    @instrumentar()
+    def prepare_time_series(self, features_list=None, lags=3, rolling_windows=(3, 6),
+                            rolling_columns=None, test_size=0.2):
+        """
+        Prepara los datos respetando el orden temporal (sin mezclar meses futuros en el entrenamiento).
+
+        Añade rezagos del objetivo (t-1..t-lags), su media móvil sobre meses anteriores y
+        sumas móviles de las columnas indicadas (tráfico, precipitación). El conjunto de
+        prueba son los últimos meses. Las matrices construidas se guardan en caché y se
+        reutilizan entre llamadas, folds y algoritmos.
+
+        Args:
+            features_list (list, optional): Características base (como en prepare_data).
+            lags (int): Número de rezagos del objetivo.
+            rolling_windows (tuple): Tamaños de ventana (en meses) de las medias/sumas móviles.
+            rolling_columns (list, optional): Columnas con suma móvil. Por defecto 'Total' y
+                                              'Precipitacion' si existen.
+            test_size (float): Fracción final de meses reservada para prueba.
+        """
+        if not self._validate_data():
+            return False
+
+        base = self._select_features(features_list)
+        if rolling_columns is None:
+            rolling_columns = [c for c in ["Total", "Precipitacion"] if c in self.df.columns]
+        X, y = self._time_series_matrix(tuple(base), int(lags), tuple(rolling_windows), tuple(rolling_columns))
+
+        if len(X) < 3:
+            print("Error: Datos insuficientes para la división temporal de entrenamiento/prueba.")
+            return False
+
+        n_test = max(1, math.ceil(len(X) * test_size))
+        self.X_train, self.X_test = X.iloc[:-n_test], X.iloc[-n_test:]
+        # Imputación con estadísticas del tramo de entrenamiento solamente
+        self.preprocesador = PreprocesadorML().fit(self.X_train)
+        self.y_train, self.y_test = y.iloc[:-n_test], y.iloc[-n_test:]
+        self.features = list(X.columns)
+        self.time_series = True
+        self.target_columns = None
+        self.ventana = None  # Los rezagos dependen del historial: no se actualiza de forma incremental
+        print(f"Datos temporales preparados. X_train shape: {self.X_train.shape}, "
+              f"X_test shape: {self.X_test.shape} (últimos {n_test} periodos)")
+        return True
+
+    @instrumentar()
+    def evaluate_time_series(self, algorithms=None, n_splits=5, max_train_size=None, n_jobs=-1):
+        """
+        Validación rolling-origin: cada fold entrena con los meses anteriores y evalúa
+        en los siguientes. Con max_train_size=None la ventana de entrenamiento se expande;
+        con un entero se desplaza con ese tamaño fijo. Los folds de todos los algoritmos
+        se ejecutan en paralelo sobre la misma matriz de características.
+
+        Args:
+            algorithms (list, optional): Algoritmos a evaluar. Por defecto todos los del tipo de modelo.
+            n_splits (int): Número de orígenes de evaluación.
+            max_train_size (int, optional): Tamaño de ventana deslizante.
+            n_jobs (int): Procesos de joblib (-1 = todos los núcleos).
+
+        Returns:
+            pd.DataFrame: Métricas medias por algoritmo (detalle por fold en self.ts_results).
+        """
+        if not self.time_series or self.X_train is None:
+            print("Error: Ejecuta prepare_time_series() primero.")
+            return None
+
+        X = self.preprocesador.transform(pd.concat([self.X_train, self.X_test]))
+        y = pd.concat([self.y_train, self.y_test]).to_numpy()
+        from sklearn.model_selection import TimeSeriesSplit
+        algorithms = algorithms or list(PARAM_GRIDS.get(self.tipo_modelo, {}))
+        splitter = TimeSeriesSplit(n_splits=max(2, min(n_splits, len(X) - 1)), max_train_size=max_train_size)
+        folds = list(splitter.split(X))
+
+        tareas = []
+        for algorithm in algorithms:
+            if self._build_estimator(algorithm) is None:
+                print(f"Algoritmo '{algorithm}' no soportado para {self.tipo_modelo}; se omite.")
+                continue
+            for k, (train_idx, test_idx) in enumerate(folds):
+                tareas.append((algorithm, k, train_idx, test_idx))
+
+        resultados = Parallel(n_jobs=n_jobs)(
+            delayed(_fit_and_score)(self._build_estimator(algorithm, n_jobs=1), X, y,
+                                    train_idx, test_idx, self.tipo_modelo)
+            for algorithm, _, train_idx, test_idx in tareas
+        )
+        self.ts_results = pd.DataFrame([
+            {"algorithm": algorithm, "fold": k, "train_size": len(train_idx), "test_size": len(test_idx), **metricas}
+            for (algorithm, k, train_idx, test_idx), metricas in zip(tareas, resultados)
+        ])
+        metrica = "mse" if self.tipo_modelo == "regresion" else "accuracy"
+        resumen = (self.ts_results.drop(columns=["fold"])
+                   .groupby("algorithm").mean()
+                   .sort_values(metrica, ascending=(metrica == "mse"))
+                   .reset_index())
+        print("\n--- Validación rolling-origin ---")
+        print(resumen.to_string(index=False))
+        return resumen
+
+    @instrumentar()
+    def prepare_forecast(self, targets=("pm2_5", "pm10", "CO", "NO2", "O3"), horizons=(1, 3, 6),
+                         features_list=None, test_size=0.2):
+        """
+        Prepara un pronóstico multi-objetivo y multi-horizonte con una sola matriz de características.
+
+        Para cada contaminante y horizonte h se crea el objetivo '<contaminante>_h<h>' (su valor
+        h meses después). Todas las columnas objetivo comparten X, el preprocesamiento y el
+        estimador: los algoritmos de regresión de sklearn (lineal, KNN, árboles y bosques)
+        aceptan y de varias columnas de forma nativa, así que se entrena un solo modelo.
+        La división es temporal, como en prepare_time_series().
+
+        Args:
+            targets (tuple): Contaminantes a pronosticar (se omiten los que no existan).
+            horizons (tuple): Meses hacia adelante; con 0 se estima el mes actual y los
+                              contaminantes objetivo se excluyen de las características.
+            features_list (list, optional): Características (como en prepare_data). Por defecto las
+                                            predefinidas más los contaminantes objetivo (valor actual).
+            test_size (float): Fracción final de meses reservada para prueba.
+        """
+        if self.tipo_modelo != "regresion":
+            print("Error: El pronóstico multi-objetivo solo está soportado para regresión.")
+            return False
+        if self.df is None or self.df.empty:
+            print("Error: DataFrame vacío o no cargado.")
+            return False
+        targets = [t for t in targets if t in self.df.columns]
+        if not targets:
+            print("Error: Ninguna de las columnas objetivo se encuentra en el DataFrame.")
+            return False
+
+        orden = [c for c in ["Anio", "Mes"] if c in self.df.columns]
+        df = self.df.sort_values(orden).reset_index(drop=True) if orden else self.df.reset_index(drop=True)
+        if features_list:
+            features = [f for f in features_list if f in df.columns]
+        else:
+            features = list(dict.fromkeys(self._select_features() + targets))
+        if 0 in horizons:
+            features = [f for f in features if f not in targets]
+        if not features:
+            print("Error: No se encontraron características válidas para el entrenamiento.")
+            return False
+
+        # Objetivos desplazados: una columna por (contaminante, horizonte), calculadas de una vez
+        valores = df[targets].replace([float('inf'), -float('inf')], np.nan)
+        Y = pd.concat({h: valores.shift(-h) for h in horizons}, axis=1)
+        Y.columns = [f"{t}_h{h}" for h, t in Y.columns]
+        validas = Y.notna().all(axis=1)
+        X, Y = df.loc[validas, features], Y[validas]
+        if len(X) < 3:
+            print("Error: Datos insuficientes para la división temporal de entrenamiento/prueba.")
+            return False
+
+        n_test = max(1, math.ceil(len(X) * test_size))
+        self.X_train, self.X_test = X.iloc[:-n_test], X.iloc[-n_test:]
+        self.y_train, self.y_test = Y.iloc[:-n_test], Y.iloc[-n_test:]
+        self.preprocesador = PreprocesadorML().fit(self.X_train)
+        self.features = features
+        self.target_columns = list(Y.columns)
+        self.time_series = True
+        self.ventana = None
+        print(f"Pronóstico preparado: {len(targets)} contaminantes x {len(horizons)} horizontes "
+              f"= {len(self.target_columns)} objetivos. X_train shape: {self.X_train.shape}")
+        return True
+
+    def _validate_data(self):
+        if self.df is None or self.df.empty:
+            print("Error: DataFrame vacío o no cargado.")
+            return False
+
+        if self.target_column not in self.df.columns:
+            print(f"Error: La columna objetivo '{self.target_column}' no se encuentra en el DataFrame.")
+            return False
+        return True
+
+    def _time_series_matrix(self, base, lags, windows, rolling_columns):
+        """
+        Matriz (X, y) ordenada por periodo con rezagos y ventanas móviles vectorizadas.
+        Se guarda en caché por combinación de parámetros.
+        """
+        clave = (base, lags, windows, rolling_columns, self.target_column)
+        if clave in self._ts_cache:
+            return self._ts_cache[clave]
+
+        orden = [c for c in ["Anio", "Mes"] if c in self.df.columns]
+        df = self.df.sort_values(orden).reset_index(drop=True) if orden else self.df.reset_index(drop=True)
+        objetivo = df[self.target_column]
+        nuevas = {}
+        if pd.api.types.is_numeric_dtype(objetivo):
+            anterior = objetivo.shift(1)
+            for k in range(1, lags + 1):
+                nuevas[f"{self.target_column}_lag{k}"] = objetivo.shift(k)
+            for w in windows:
+                nuevas[f"{self.target_column}_roll{w}"] = anterior.rolling(w, min_periods=1).mean()
+        for col in rolling_columns:
+            for w in windows:
+                nuevas[f"{col}_roll{w}"] = df[col].rolling(w, min_periods=1).sum()
+
+        X = pd.concat([df[list(base)], pd.DataFrame(nuevas)], axis=1)
+        X = X.replace([float('inf'), -float('inf')], np.nan)
+        # Las primeras filas no tienen rezagos completos
+        validas = objetivo.notna()
+        ultimo_rezago = f"{self.target_column}_lag{lags}"
+        if ultimo_rezago in X.columns:
+            validas &= X[ultimo_rezago].notna()
+        resultado = (X[validas], objetivo[validas])
+        self._ts_cache[clave] = resultado
+        return resultado
+
+    def _select_features(self, features_list=None):
+        """Características a usar: las indicadas o las predefinidas que existan en el DataFrame"""
+        if features_list:
+            features = list(features_list)
+        else:
+            # Ejemplo de características basadas en los datos disponibles
+            # Asegúrate de que estas columnas existan en tu df_clima_contaminacion
+            # (el tráfico lo agrega IntegradorDatos: 'Total', 'Liviano', etc.).
+            features = [col for col in
+                        ['pm10', 'CO', 'NO2', 'O3', 'TempMax', 'TempMin', 'Precipitacion', 'Anio', 'Mes'] if
+                        col in self.df.columns and col != self.target_column]
+            if self.tipo_modelo == "regresion":
+                features.extend([col for col in ['Total', 'Liviano'] if col in self.df.columns])
+            # Para clasificación, la columna objetivo 'target_column' debe ser categórica.
+            # Necesitarás una función para convertir pm2_5 a categorías ICA si ese es tu objetivo.
+
+        # Filtrar solo las características que realmente existen en el DataFrame
+        return [f for f in features if f in self.df.columns]
+
+    @instrumentar()
     def train_model(self, algorithm="LinearRegression"):
         """
         Entrena el modelo de Machine Learning.
@@ -108,37 +369,169 @@ class ModeloML:
 
         print(f"Entrenando modelo de {self.tipo_modelo} con algoritmo: {algorithm}...")
 
+        if self.tipo_modelo not in ("regresion", "clasificacion"):
+            print("Tipo de modelo no soportado. Debe ser 'regresion' o 'clasificacion'.")
+            return
+        model = self._build_estimator(algorithm, n_jobs=-1)
+        if model is None:
+            tipo = "regresión" if self.tipo_modelo == "regresion" else "clasificación"
+            print(f"Algoritmo de {tipo} no soportado o incorrecto.")
+            return
+        self.model = model
+        # SGD es sensible a la escala: el preprocesador estandariza solo para ese algoritmo
+        self.preprocesador.escalar = algorithm == "SGD"
+
+        Instrumentacion.registrar(filas_entrada=len(self.X_train))
+        self.model.fit(self.preprocesador.transform(self.X_train), self.y_train)
+        print("Modelo entrenado exitosamente.")
+
+    def _build_estimator(self, algorithm, n_jobs=None, **params):
+        """
+        Crea el estimador de sklearn para el algoritmo y tipo de modelo.
+        Devuelve None si la combinación no está soportada.
+
+        Args:
+            algorithm (str): 'LinearRegression', 'KNN', 'RandomForest', 'DecisionTree', 'LogisticRegression'.
+            n_jobs (int, optional): Núcleos para los algoritmos que lo admiten (RandomForest, KNN).
+            **params: Hiperparámetros del estimador.
+        """
+        from sklearn.linear_model import LinearRegression, LogisticRegression, SGDRegressor, SGDClassifier
+        from sklearn.multioutput import MultiOutputRegressor
+        from sklearn.neighbors import KNeighborsRegressor, KNeighborsClassifier
+        from sklearn.ensemble import RandomForestRegressor, RandomForestClassifier
+        from sklearn.tree import DecisionTreeRegressor, DecisionTreeClassifier
+
         if self.tipo_modelo == "regresion":
-            if algorithm == "LinearRegression":
-                self.model = LinearRegression()
-            elif algorithm == "KNN":
-                self.model = KNeighborsRegressor()
-            elif algorithm == "RandomForest":
-                self.model = RandomForestRegressor(random_state=42)
-            elif algorithm == "DecisionTree":
-                self.model = DecisionTreeRegressor(random_state=42)
-            else:
-                print("Algoritmo de regresión no soportado o incorrecto.")
-                return
+            constructores = {
+                "LinearRegression": lambda: LinearRegression(**params),
+                "KNN": lambda: KNeighborsRegressor(n_jobs=n_jobs, **params),
+                "RandomForest": lambda: RandomForestRegressor(random_state=42, n_jobs=n_jobs, **params),
+                "DecisionTree": lambda: DecisionTreeRegressor(random_state=42, **params),
+                # Lineal en línea (partial_fit); varias salidas con un SGD por objetivo
+                "SGD": lambda: (MultiOutputRegressor(SGDRegressor(random_state=42, **params))
+                                if self.target_columns else SGDRegressor(random_state=42, **params)),
+            }
         elif self.tipo_modelo == "clasificacion":
-            if algorithm == "LogisticRegression":
-                self.model = LogisticRegression(random_state=42, max_iter=1000)
-            elif algorithm == "KNN":
-                self.model = KNeighborsClassifier()
-            elif algorithm == "RandomForest":
-                self.model = RandomForestClassifier(random_state=42)
-            elif algorithm == "DecisionTree":
-                self.model = DecisionTreeClassifier(random_state=42)
-            else:
-                print("Algoritmo de clasificación no soportado o incorrecto.")
-                return
+            constructores = {
+                "LogisticRegression": lambda: LogisticRegression(random_state=42, max_iter=1000, **params),
+                "KNN": lambda: KNeighborsClassifier(n_jobs=n_jobs, **params),
+                "RandomForest": lambda: RandomForestClassifier(random_state=42, n_jobs=n_jobs, **params),
+                "DecisionTree": lambda: DecisionTreeClassifier(random_state=42, **params),
+                "SGD": lambda: SGDClassifier(random_state=42, **params),
+            }
         else:
+            return None
+        constructor = constructores.get(algorithm)
+        return constructor() if constructor else None
+
+    @instrumentar()
+    def search(self, algorithms=None, param_grids=None, cv=5, n_jobs=-1, halving=False,
+               scoring=None, save_path=None):
+        """
+        Búsqueda de hiperparámetros con validación cruzada K-fold para varios algoritmos.
+
+        Las combinaciones de parámetros y folds de cada algoritmo se evalúan en paralelo
+        en todos los núcleos (joblib). Con halving=True se usa successive halving:
+        los candidatos se evalúan primero con pocas filas y solo los mejores siguen.
+        Al terminar, self.model queda con el mejor estimador reentrenado en X_train.
+
+        Args:
+            algorithms (list, optional): Algoritmos a comparar. Por defecto todos los de PARAM_GRIDS.
+            param_grids (dict, optional): {algoritmo: rejilla} para reemplazar las rejillas por defecto.
+            cv (int): Número de folds.
+            n_jobs (int): Procesos de joblib (-1 = todos los núcleos).
+            halving (bool): Usar HalvingGridSearchCV en lugar de GridSearchCV.
+            scoring (str, optional): Métrica de sklearn. Por defecto 'neg_mean_squared_error'
+                                     en regresión y 'accuracy' en clasificación.
+            save_path (str, optional): Si se indica, guarda el mejor modelo con save_model().
+
+        Returns:
+            pd.DataFrame: Leaderboard ordenado de mejor a peor con algoritmo, parámetros,
+                          puntaje medio y desviación en CV, y tiempos medios de fit y predict.
+                          Con halving solo incluye los candidatos de la última iteración.
+        """
+        if self.X_train is None:
+            print("Error: Los datos no han sido preparados. Ejecuta prepare_data() primero.")
+            return None
+        if self.tipo_modelo not in PARAM_GRIDS:
             print("Tipo de modelo no soportado. Debe ser 'regresion' o 'clasificacion'.")
-            return
+            return None
 
-        self.model.fit(self.X_train, self.y_train)
-        print("Modelo entrenado exitosamente.")
+        from sklearn.model_selection import GridSearchCV, KFold, StratifiedKFold, TimeSeriesSplit
+        if halving:
+            from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+            from sklearn.model_selection import HalvingGridSearchCV
+
+        grids = dict(PARAM_GRIDS[self.tipo_modelo])
+        grids.update(param_grids or {})
+        algorithms = algorithms or list(grids)
+        scoring = scoring or ("neg_mean_squared_error" if self.tipo_modelo == "regresion" else "accuracy")
+        n_splits = max(2, min(cv, len(self.X_train) - 1))
+        Instrumentacion.registrar(filas_entrada=len(self.X_train))
+        if self.time_series:
+            splitter = TimeSeriesSplit(n_splits=n_splits)  # Sin mezclar meses futuros en entrenamiento
+        elif self.tipo_modelo == "clasificacion":
+            splitter = StratifiedKFold(n_splits=n_splits, shuffle=True, random_state=42)
+        else:
+            splitter = KFold(n_splits=n_splits, shuffle=True, random_state=42)
+
+        self.preprocesador.escalar = False
+        X_train = self.preprocesador.transform(self.X_train)
+        filas = []
+        mejores = {}
+        for algorithm in algorithms:
+            # n_jobs=1 en el estimador: el paralelismo lo pone la búsqueda (evita sobresuscripción)
+            estimator = self._build_estimator(algorithm, n_jobs=1)
+            if estimator is None or algorithm not in grids:
+                print(f"Algoritmo '{algorithm}' no soportado para {self.tipo_modelo}; se omite.")
+                continue
+            if halving:
+                buscador = HalvingGridSearchCV(estimator, grids[algorithm], cv=splitter, scoring=scoring,
+                                               n_jobs=n_jobs, random_state=42, refit=True)
+            else:
+                buscador = GridSearchCV(estimator, grids[algorithm], cv=splitter, scoring=scoring,
+                                        n_jobs=n_jobs, refit=True)
+            inicio = time.perf_counter()
+            buscador.fit(X_train, self.y_train)
+            print(f"  {algorithm}: {len(buscador.cv_results_['params'])} candidatos "
+                  f"en {time.perf_counter() - inicio:.2f} s (mejor {scoring}: {buscador.best_score_:.4f})")
+
+            resultados = buscador.cv_results_
+            # En halving cada candidato aparece por iteración, con más filas en cada una; solo los
+            # de la última iteración se evaluaron con todos los datos y son comparables entre sí
+            indices = range(len(resultados["params"]))
+            if halving:
+                ultima = max(resultados["iter"])
+                indices = [i for i in indices if resultados["iter"][i] == ultima]
+            for i in indices:
+                filas.append({
+                    "algorithm": algorithm,
+                    "params": resultados["params"][i],
+                    "mean_score": resultados["mean_test_score"][i],
+                    "std_score": resultados["std_test_score"][i],
+                    "fit_time": resultados["mean_fit_time"][i],
+                    "predict_time": resultados["mean_score_time"][i],
+                })
+            mejores[algorithm] = (buscador.best_score_, buscador.best_params_, buscador.best_estimator_)
+
+        if not filas:
+            print("Error: Ningún algoritmo pudo evaluarse.")
+            return None
+
+        self.leaderboard = (pd.DataFrame(filas)
+                            .sort_values("mean_score", ascending=False, na_position="last")
+                            .reset_index(drop=True))
+        self.leaderboard.insert(0, "rank", range(1, len(self.leaderboard) + 1))
 
+        # El mejor de cada búsqueda (best_score_) decide el algoritmo: es el estimador que se reentrenó
+        mejor_algoritmo = max(mejores, key=lambda a: -np.inf if np.isnan(mejores[a][0]) else mejores[a][0])
+        _, mejores_params, self.model = mejores[mejor_algoritmo]
+        print(f"Mejor modelo: {mejor_algoritmo} {mejores_params}")
+        if save_path:
+            self.save_model(save_path)
+        return self.leaderboard
+
+    @instrumentar()
     def evaluate_model(self):
         """Evalúa el rendimiento del modelo entrenado."""
         if self.model is None:
@@ -149,10 +542,18 @@ class ModeloML:
             print("Error: Los datos de prueba no están disponibles.")
             return
 
-        y_pred = self.model.predict(self.X_test)
+        from sklearn.metrics import mean_squared_error, r2_score, accuracy_score, classification_report
+        y_pred = self.model.predict(self.preprocesador.transform(self.X_test))
 
         print("\n--- Evaluación del Modelo ---")
-        if self.tipo_modelo == "regresion":
+        if self.target_columns:
+            # Una fila de métricas por objetivo (contaminante y horizonte)
+            metricas = pd.DataFrame({
+                "MSE": mean_squared_error(self.y_test, y_pred, multioutput="raw_values"),
+                "R2": r2_score(self.y_test, y_pred, multioutput="raw_values"),
+            }, index=self.target_columns)
+            print(metricas.round(3).to_string())
+        elif self.tipo_modelo == "regresion":
             mse = mean_squared_error(self.y_test, y_pred)
             r2 = r2_score(self.y_test, y_pred)
             print(f"Error Cuadrático Medio (MSE): {mse:.2f}")
@@ -163,50 +564,258 @@ class ModeloML:
             print("\nReporte de Clasificación:")
             print(classification_report(self.y_test, y_pred))
 
+    @instrumentar()
+    def location_features(self, geo_layer, location, k=1, radius_km=None):
+        """
+        Características del modelo para una ubicación, listas para predict().
+
+        Args:
+            geo_layer (CapaGeografica): Capa con los puntos y sus series.
+            location (tuple | str): (lat, lon) o nombre de un punto.
+            k (int | dict): Puntos más cercanos por tipo, o {tipo: k}.
+            radius_km (float, optional): Distancia máxima de los puntos a la ubicación.
+
+        Returns:
+            pd.DataFrame: Una fila por mes con Anio, Mes y las características del modelo. Las que
+                          la ubicación no tiene quedan en NaN y predict las imputa con las medias
+                          de entrenamiento.
+        """
+        tabla = geo_layer.series(location, k=k, radio_km=radius_km)
+        if not self.features:
+            return tabla
+        faltantes = [f for f in self.features if f not in tabla.columns]
+        if faltantes:
+            print(f"Aviso: La ubicación no tiene datos de {faltantes}; se imputarán en predict().")
+        claves = [c for c in ["Anio", "Mes"] if c not in self.features]
+        return tabla.reindex(columns=claves + self.features)
+
+    @instrumentar()
     def predict(self, new_data):
         """
         Realiza predicciones con el modelo entrenado.
 
         Args:
-            new_data (pd.DataFrame): DataFrame con nuevas observaciones para predecir.
-                                     Debe tener las mismas columnas que las características de entrenamiento.
+            new_data (pd.DataFrame | dict): Nuevas observaciones (un dict es una sola fila).
+                                            Deben incluir las características de entrenamiento;
+                                            los faltantes se imputan con las medias de entrenamiento.
 
         Returns:
-            np.array: Predicciones del modelo.
+            np.array: Predicciones del modelo. Con prepare_forecast(), un DataFrame con una
+                      columna por objetivo ('pm10_h3', ...), todas de una sola llamada.
         """
         if self.model is None:
             print("Error: El modelo no ha sido entrenado. Ejecuta train_model() primero.")
             return None
-        if self.features is None or not self.features:
-            print("Error: Las características del modelo no están definidas.")
+        if self.preprocesador is None:
+            print("Error: El preprocesamiento no está definido. Ejecuta prepare_data() o carga un modelo guardado.")
             return None
 
-        # Asegurarse de que new_data tenga las mismas columnas y en el mismo orden
-        new_data_processed = new_data[self.features]
+        try:
+            X = self.preprocesador.transform(new_data)
+        except KeyError as e:
+            print(f"Error: {e}")
+            return None
+        predicciones = self.model.predict(X)
+        if self.target_columns:
+            indice = new_data.index if isinstance(new_data, pd.DataFrame) else None
+            return pd.DataFrame(predicciones, columns=self.target_columns, index=indice)
+        return predicciones
+
+    @instrumentar()
+    def can_update(self):
+        """
+        True si el modelo se puede actualizar con update_model(): tiene la ventana reciente y
+        el preprocesamiento de entrenamiento. Un archivo antiguo (solo el estimador) no los
+        tiene y necesita una búsqueda completa con search().
+        """
+        return (self.model is not None and self.preprocesador is not None and self.ventana is not None
+                and not self.preprocesador_reconstruido)
+
+    @instrumentar()
+    def update_model(self, new_data, window=120, new_trees=10, max_trees=None, drift_threshold=0.25,
+                     save_path=None):
+        """
+        Actualiza el modelo solo con las filas nuevas, sin reentrenar con todo el historial.
+
+        - Estimadores con partial_fit (SGD): un paso de aprendizaje con las filas nuevas.
+        - Bosques: warm start; se agregan new_trees árboles entrenados con la ventana reciente
+          y, si se indica max_trees, se descartan los más antiguos.
+        - Resto (lineal, KNN, árbol): se reentrena con la ventana reciente.
 
-        # Manejar valores infinitos o muy grandes en new_data
-        new_data_processed = new_data_processed.replace([float('inf'), -float('inf')], pd.NA).fillna(
-            new_data_processed.mean())
+        La ventana guarda las últimas `window` filas, así que el costo de cada actualización
+        no crece con el historial. Antes de actualizar se compara el lote nuevo con la
+        distribución de entrenamiento (PSI y desplazamiento de la media).
 
-        return self.model.predict(new_data_processed)
+        Args:
+            new_data (pd.DataFrame): Datos con las características y el objetivo. Si hay columnas
+                                     Anio y Mes, solo se usan los periodos posteriores a la ventana.
+            window (int): Filas que se conservan en la ventana reciente.
+            new_trees (int): Árboles a agregar por actualización (bosques).
+            max_trees (int, optional): Máximo de árboles del bosque.
+            drift_threshold (float): PSI a partir del cual (con la media desplazada más de una
+                                     desviación) se avisa que conviene reentrenar.
+            save_path (str, optional): Si se indica, guarda el modelo actualizado.
 
-    def save_model(self, path="model.joblib"):
-        """Guarda el modelo entrenado en un archivo."""
+        Returns:
+            pd.DataFrame: Reporte de deriva por característica (None si no hubo filas nuevas).
+        """
+        if self.model is None or self.preprocesador is None:
+            print("Error: No hay modelo para actualizar. Entrena o carga un modelo primero.")
+            return None
+        if self.preprocesador_reconstruido or self.ventana is None:
+            # Sin la distribución de entrenamiento la deriva compararía los datos consigo mismos
+            print("Error: El modelo no guarda su ventana ni el preprocesamiento de entrenamiento; "
+                  "reentrena con search().")
+            return None
+        if self.time_series or self.target_columns:
+            print("Error: La actualización incremental solo está soportada para modelos de prepare_data().")
+            return None
+        if isinstance(self.model, MODELOS_COMPACTOS):
+            print("Error: Un modelo compactado no se puede actualizar; guárdalo sin compact=True.")
+            return None
+        faltantes = [c for c in self.features + [self.target_column] if c not in new_data.columns]
+        if faltantes:
+            print(f"Error: Faltan columnas en los datos nuevos: {faltantes}")
+            return None
+
+        nuevas = new_data[new_data[self.target_column].notna()]
+        if self.ventana is not None and {"Anio", "Mes"} <= set(nuevas.columns) \
+                and {"Anio", "Mes"} <= set(self.ventana.columns) and len(self.ventana):
+            ultimo = _periodo(self.ventana).max()
+            nuevas = nuevas[_periodo(nuevas) > ultimo]
+        if nuevas.empty:
+            print("No hay filas nuevas para actualizar el modelo.")
+            return None
+
+        self.drift_report = self.preprocesador.deriva(nuevas[self.features])
+        # Con lotes de pocos meses el PSI es ruidoso; se exige además un desplazamiento de la media
+        con_deriva = self.drift_report[(self.drift_report["psi"] > drift_threshold)
+                                       & (self.drift_report["desplazamiento_media"].abs() > 1)]
+        if not con_deriva.empty:
+            print(f"Aviso: deriva en {', '.join(con_deriva['feature'])} (PSI > {drift_threshold} y media "
+                  f"desplazada más de 1 desviación); conviene reentrenar desde cero.")
+
+        filas = self._filas_ventana(nuevas, nuevas[self.target_column])
+        self.ventana = filas if self.ventana is None else pd.concat([self.ventana, filas], ignore_index=True)
+        self.ventana = self.ventana.tail(window).reset_index(drop=True)
+
+        inicio = time.perf_counter()
+        if hasattr(self.model, "partial_fit"):
+            self.model.partial_fit(self.preprocesador.transform(nuevas), nuevas[self.target_column])
+            modo = "partial_fit"
+        elif hasattr(self.model, "warm_start") and hasattr(self.model, "estimators_"):
+            self.model.set_params(warm_start=True, n_estimators=len(self.model.estimators_) + new_trees)
+            self.model.fit(self.preprocesador.transform(self.ventana), self.ventana[self.target_column])
+            if max_trees and len(self.model.estimators_) > max_trees:
+                self.model.estimators_ = self.model.estimators_[-max_trees:]
+                self.model.set_params(n_estimators=max_trees)
+            modo = f"warm start (+{new_trees} árboles, total {len(self.model.estimators_)})"
+        else:
+            self.model.fit(self.preprocesador.transform(self.ventana), self.ventana[self.target_column])
+            modo = f"reentrenado con ventana de {len(self.ventana)} filas"
+        print(f"Modelo actualizado con {len(nuevas)} filas nuevas: {modo} "
+              f"en {time.perf_counter() - inicio:.3f} s")
+
+        if save_path:
+            self.save_model(save_path)
+        return self.drift_report
+
+    def _filas_ventana(self, df, y):
+        """Características, objetivo y periodo (si existe) de las filas que entran a la ventana"""
+        columnas = [c for c in ["Anio", "Mes"] if c in df.columns and c not in self.features] + self.features
+        filas = df[columnas].copy()
+        filas[self.target_column] = y
+        return filas.reset_index(drop=True)
+
+    @instrumentar()
+    def save_model(self, path="model.joblib", compress=0, compact=False):
+        """
+        Guarda en un solo archivo el modelo y su preprocesamiento (orden de características,
+        medias de imputación y mapeo de categorías), con número de versión del formato.
+
+        Args:
+            path (str): Archivo de salida.
+            compress (int): Nivel de compresión de joblib (0-9). Con 0 los arreglos de NumPy
+                            quedan sin comprimir y se pueden mapear en memoria con
+                            load_model(mmap_mode='r'); comprimido el archivo es menor pero
+                            cada proceso descomprime su propia copia.
+            compact (bool): Guarda en su lugar una copia que predice solo con NumPy (ver
+                            compactar()): carga más rápida, sin importar sklearn, y menos
+                            memoria por proceso.
+        """
         if self.model:
-            joblib.dump(self.model, path)
+            model = self.model
+            if compact:
+                model = compactar(self.model)
+                if model is None:
+                    print("El modelo no tiene versión compacta; se guarda sin compactar.")
+                    model = self.model
+            artefacto = {
+                "version": VERSION_ARTEFACTO,
+                "model": model,
+                "preprocesador": self.preprocesador,
+                "features": self.features,
+                "tipo_modelo": self.tipo_modelo,
+                "target_column": self.target_column,
+                "target_columns": self.target_columns,
+                "ventana": self.ventana,
+            }
+            # Escritura atómica: un proceso que recarga el modelo (ServidorPrediccion) nunca lee un archivo a medias
+            temporal = f"{path}.tmp"
+            joblib.dump(artefacto, temporal, compress=compress)
+            os.replace(temporal, path)
+            Instrumentacion.registrar(bytes_escritos=os.path.getsize(path))
             print(f"Modelo guardado en: {path}")
         else:
             print("No hay modelo para guardar.")
 
-    def load_model(self, path="model.joblib"):
-        """Carga un modelo desde un archivo."""
+    @instrumentar()
+    def load_model(self, path="model.joblib", mmap_mode=None):
+        """
+        Carga un modelo desde un archivo. Acepta el formato versionado de save_model y
+        también archivos antiguos que solo contienen el estimador (en ese caso el
+        preprocesamiento debe venir de prepare_data()).
+
+        Args:
+            path (str): Archivo guardado con save_model.
+            mmap_mode (str, optional): 'r' para mapear en memoria los arreglos de un archivo
+                                       sin comprimir (compartidos entre procesos).
+        """
         try:
-            self.model = joblib.load(path)
-            print(f"Modelo cargado desde: {path}")
+            artefacto = joblib.load(path, mmap_mode=mmap_mode)
+            Instrumentacion.registrar(bytes_leidos=os.path.getsize(path))
         except FileNotFoundError:
             print(f"Error: Archivo de modelo no encontrado en {path}")
+            return
         except Exception as e:
             print(f"Error al cargar el modelo: {e}")
+            return
+
+        if isinstance(artefacto, dict) and "version" in artefacto:
+            if artefacto["version"] > VERSION_ARTEFACTO:
+                print(f"Error: El archivo usa la versión {artefacto['version']} del formato; "
+                      f"esta versión del código soporta hasta la {VERSION_ARTEFACTO}.")
+                return
+            self.model = artefacto["model"]
+            self.preprocesador = artefacto["preprocesador"]
+            self.features = artefacto["features"]
+            self.tipo_modelo = artefacto["tipo_modelo"]
+            self.target_column = artefacto["target_column"]
+            self.target_columns = artefacto.get("target_columns")
+            self.ventana = artefacto.get("ventana")
+            self.preprocesador_reconstruido = False
+        else:
+            # Formato antiguo: solo el estimador. El preprocesamiento se reconstruye con
+            # los datos actuales si contienen las características con que se entrenó; sirve
+            # para predecir, pero no para update_model() ni para medir deriva.
+            self.model = artefacto
+            self.ventana = None
+            features = list(getattr(artefacto, "feature_names_in_", self.features))
+            if features and all(f in self.df.columns for f in features):
+                self.features = features
+                self.preprocesador = PreprocesadorML().fit(self.df[features])
+                self.preprocesador_reconstruido = True
+        print(f"Modelo cargado desde: {path}")
 
     def _categorize_air_quality(self, pm2_5_values):
         """
@@ -223,6 +832,7 @@ class ModeloML:
         labels = ['Buena', 'Moderada', 'Mala', 'Muy Mala', 'Peligrosa']
         return pd.cut(pm2_5_values, bins=bins, labels=labels, right=True, include_lowest=True)
 
+    @instrumentar()
     def convert_to_classification_target(self, pm2_5_column='pm2_5'):
         """
         Convierte la columna de PM2.5 a categorías de calidad del aire para clasificación.
@@ -237,3 +847,38 @@ class ModeloML:
         self.target_column = 'Calidad_Aire_Categoria'
         print(f"Columna objetivo cambiada a '{self.target_column}'.")
         return True
+
+
+def compactar(estimador):
+    """
+    Copia del estimador que predice solo con NumPy: BosqueCompacto (árbol o bosque),
+    LinealCompacto (lineal, SGD, logística) o VecinosCompacto (KNN). None si no hay.
+    """
+    for clase in MODELOS_COMPACTOS:
+        compacto = clase.desde_estimador(estimador)
+        if compacto is not None:
+            return compacto
+    return None
+
+
+def _periodo(df):
+    """Código de periodo AAAAMM de cada fila"""
+    return AgregadorTemporal.codigo_periodo(anios=df["Anio"], meses=df["Mes"])
+
+
+def _fit_and_score(estimator, X, y, train_idx, test_idx, tipo_modelo):
+    """Entrena y evalúa un fold; función de módulo para que joblib la pueda enviar a otros procesos"""
+    from sklearn.metrics import mean_squared_error, r2_score, accuracy_score
+    inicio = time.perf_counter()
+    estimator.fit(X[train_idx], y[train_idx])
+    fit_time = time.perf_counter() - inicio
+    inicio = time.perf_counter()
+    y_pred = estimator.predict(X[test_idx])
+    predict_time = time.perf_counter() - inicio
+    if tipo_modelo == "regresion":
+        metricas = {"mse": mean_squared_error(y[test_idx], y_pred)}
+        if len(test_idx) > 1:
+            metricas["r2"] = r2_score(y[test_idx], y_pred)
+    else:
+        metricas = {"accuracy": accuracy_score(y[test_idx], y_pred)}
+    return {**metricas, "fit_time": fit_time, "predict_time": predict_time}
@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+
+
+N_CUANTILES_DERIVA = 10  # Intervalos de referencia para el PSI
+
+
+class PreprocesadorML:
+    def __init__(self, escalar=False):
+        """
+        Preprocesamiento ajustado con los datos de entrenamiento y guardado junto al modelo.
+
+        Guarda el orden de las características, el valor de imputación de cada una
+        (media del entrenamiento) y el mapeo categoría -> código de las columnas no
+        numéricas. Al predecir solo se aplican esos valores; no se recalcula nada
+        a partir del lote recibido, así que una sola fila se trata igual que mil.
+        También guarda la distribución de entrenamiento (cuantiles) para medir deriva.
+
+        Args:
+            escalar (bool): Si es True, transform() además estandariza con la media y la
+                            desviación de entrenamiento (necesario para SGD).
+        """
+        self.escalar = escalar
+        self.features = []
+        self.medias = None  # np.ndarray float64, una por característica
+        self.desviaciones = None  # Desviación estándar de entrenamiento (1 si es constante)
+        self.categorias = {}  # Columna -> {categoría: código}
+        self.cortes = None  # Por característica: cuantiles de entrenamiento (bordes de intervalos)
+        self.proporciones = None  # Por característica: fracción de entrenamiento en cada intervalo
+
+    def fit(self, X):
+        """
+        Ajusta el preprocesamiento con las características de entrenamiento.
+
+        Args:
+            X (pd.DataFrame): Características de entrenamiento, en el orden que usará el modelo.
+
+        Returns:
+            PreprocesadorML: El mismo objeto, ya ajustado.
+        """
+        self.features = list(X.columns)
+        self.categorias = {}
+        for col in self.features:
+            if not pd.api.types.is_numeric_dtype(X[col]) or isinstance(X[col].dtype, pd.CategoricalDtype):
+                valores = pd.Series(X[col].dropna().unique()).astype(str).sort_values()
+                self.categorias[col] = {v: i for i, v in enumerate(valores)}
+
+        matriz = self._a_matriz(X)
+        validos = np.isfinite(matriz)
+        conteo = validos.sum(axis=0)
+        suma = np.where(validos, matriz, 0.0).sum(axis=0)
+        # Una columna sin ningún valor válido se imputa con 0
+        self.medias = np.divide(suma, conteo, out=np.zeros(len(self.features)), where=conteo > 0)
+        centrada = np.where(validos, matriz - self.medias, 0.0)
+        varianza = np.divide((centrada ** 2).sum(axis=0), conteo, out=np.zeros(len(self.features)),
+                             where=conteo > 0)
+        desviaciones = np.sqrt(varianza)
+        self.desviaciones = np.where(desviaciones > 0, desviaciones, 1.0)
+
+        self.cortes, self.proporciones = [], []
+        for j in range(len(self.features)):
+            columna = matriz[validos[:, j], j]
+            cortes = np.unique(np.quantile(columna, np.linspace(0, 1, N_CUANTILES_DERIVA + 1)[1:-1])) \
+                if len(columna) else np.array([])
+            self.cortes.append(cortes)
+            self.proporciones.append(_proporciones(columna, cortes))
+        return self
+
+    def deriva(self, X):
+        """
+        Deriva de un lote nuevo respecto a la distribución de entrenamiento.
+
+        Returns:
+            pd.DataFrame: Por característica, el desplazamiento de la media en desviaciones
+                          estándar de entrenamiento y el PSI (índice de estabilidad poblacional:
+                          < 0.1 estable, 0.1-0.25 moderado, > 0.25 deriva importante).
+        """
+        if self.cortes is None:
+            raise RuntimeError("El preprocesador no guarda la distribución de entrenamiento; reentrena el modelo.")
+        self._verificar(X.columns)
+        matriz = self._a_matriz(X)
+        filas = []
+        for j, col in enumerate(self.features):
+            columna = matriz[np.isfinite(matriz[:, j]), j]
+            if not len(columna):
+                filas.append({"feature": col, "desplazamiento_media": np.nan, "psi": np.nan})
+                continue
+            referencia = np.maximum(self.proporciones[j], 1e-4)
+            # Suavizado de Laplace: con lotes pequeños (un mes) muchos intervalos quedan vacíos
+            nueva = _proporciones(columna, self.cortes[j], suavizado=0.5)
+            filas.append({
+                "feature": col,
+                "desplazamiento_media": (columna.mean() - self.medias[j]) / self.desviaciones[j],
+                "psi": float(np.sum((nueva - referencia) * np.log(nueva / referencia))),
+            })
+        return pd.DataFrame(filas)
+
+    def transform(self, X):
+        """
+        Matriz float64 lista para el estimador: columnas en el orden de entrenamiento,
+        categorías codificadas e infinitos/NaN reemplazados por la media de entrenamiento.
+
+        Args:
+            X (pd.DataFrame | dict): Observaciones; un dict se interpreta como una sola fila.
+        """
+        if self.medias is None:
+            raise RuntimeError("El preprocesador no está ajustado. Ejecuta fit() primero.")
+        if isinstance(X, dict):
+            # Camino rápido para una sola fila: sin construir un DataFrame
+            matriz = np.array([[self._valor(col, X[col]) for col in self._verificar(X.keys())]],
+                              dtype="float64")
+        else:
+            self._verificar(X.columns)
+            matriz = self._a_matriz(X)
+        invalidos = ~np.isfinite(matriz)
+        if invalidos.any():
+            matriz[invalidos] = np.broadcast_to(self.medias, matriz.shape)[invalidos]
+        if getattr(self, "escalar", False):  # Artefactos anteriores no tienen este atributo
+            matriz = (matriz - self.medias) / self.desviaciones
+        return matriz
+
+    def fit_transform(self, X):
+        return self.fit(X).transform(X)
+
+    def _a_matriz(self, X):
+        if not self.categorias:
+            return X[self.features].to_numpy(dtype="float64", na_value=np.nan, copy=True)
+        matriz = np.empty((len(X), len(self.features)), dtype="float64")
+        for j, col in enumerate(self.features):
+            if col in self.categorias:
+                # Categorías no vistas en el entrenamiento -> NaN -> media
+                codigos = self.categorias[col]
+                matriz[:, j] = [np.nan if pd.isna(v) else codigos.get(str(v), np.nan)
+                                for v in X[col].to_numpy(dtype=object)]
+            else:
+                matriz[:, j] = X[col].to_numpy(dtype="float64", na_value=np.nan)
+        return matriz
+
+    def _verificar(self, columnas):
+        faltantes = [c for c in self.features if c not in columnas]
+        if faltantes:
+            raise KeyError(f"Faltan características en los datos: {faltantes}")
+        return self.features
+
+    def _valor(self, col, valor):
+        if col in self.categorias:
+            return np.nan if pd.isna(valor) else self.categorias[col].get(str(valor), np.nan)
+        return np.nan if valor is None or valor is pd.NA else valor
+
+
+def _proporciones(valores, cortes, suavizado=0.0):
+    """Fracción de valores en cada intervalo definido por los cortes"""
+    n_intervalos = len(cortes) + 1
+    if not len(valores) and not suavizado:
+        return np.zeros(n_intervalos)
+    conteo = np.bincount(np.searchsorted(cortes, valores, side="right"), minlength=n_intervalos) + suavizado
+    return conteo / conteo.sum()
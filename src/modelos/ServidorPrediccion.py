@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+# --- Añadir rutas para imports locales (al ejecutarse como script) ---
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta src
+if BASE_DIR not in sys.path:
+    sys.path.append(BASE_DIR)
+
+from helpers.Utilidades import Utilidades
+from modelos.ModeloML import ModeloML
+
+RUTA_MODELO = os.path.join(os.path.dirname(BASE_DIR), "modelos", "modelo_pm25_regresion.joblib")
+# Tabla integrada: con archivos antiguos (solo el estimador) el preprocesamiento se rehace con ella
+RUTA_HISTORIAL = os.path.join(os.path.dirname(BASE_DIR), "data", "processed", "clima_contaminacion.csv")
+MAX_LATENCIAS = 10_000  # Ventana de latencias recientes para p50/p99
+
+
+class ServidorPrediccion:
+    def __init__(self, ruta_modelo=RUTA_MODELO, host="127.0.0.1", puerto=8050, max_lote=64,
+                 espera_lote=0.002, intervalo_recarga=2.0, mmap_mode="r", ruta_historial=RUTA_HISTORIAL):
+        """
+        Servidor HTTP de predicción que mantiene el modelo cargado en memoria.
+
+        Las peticiones concurrentes se agrupan en micro-lotes: el hilo de inferencia toma
+        la primera petición en cola, espera como máximo espera_lote segundos a que lleguen
+        más (hasta max_lote filas) y hace un solo predict vectorizado para todas.
+
+        Endpoints:
+            POST /predict   {"filas": [{...}, ...]} o un solo objeto -> {"predicciones": [...]}
+            GET  /metricas  Latencia p50/p99, throughput, tamaño medio de lote y versión del modelo.
+            GET  /salud     200 si hay modelo cargado.
+
+        Args:
+            ruta_modelo (str): Archivo guardado con ModeloML.save_model.
+            host (str): Interfaz de escucha (por defecto solo local).
+            puerto (int): Puerto TCP (0 = uno libre, ver self.url).
+            max_lote (int): Filas máximas por llamada a predict.
+            espera_lote (float): Segundos que se espera para completar un lote.
+            intervalo_recarga (float): Cada cuántos segundos se revisa si cambió el archivo del
+                                       modelo; si cambió se carga en segundo plano y se reemplaza
+                                       sin detener el servicio.
+            mmap_mode (str, optional): Modo de joblib.load; con 'r' los arreglos de un artefacto
+                                       sin comprimir se comparten entre procesos.
+            ruta_historial (str, optional): Tabla ClimaContaminacion para los archivos antiguos que
+                                            solo guardan el estimador (como en 'main.py predict').
+        """
+        self.ruta_modelo = ruta_modelo
+        self.host = host
+        self.puerto = puerto
+        self.max_lote = max_lote
+        self.espera_lote = espera_lote
+        self.intervalo_recarga = intervalo_recarga
+        self.mmap_mode = mmap_mode
+        self.ruta_historial = ruta_historial
+
+        self.modelo = None
+        self.version_modelo = None  # mtime del archivo cargado
+        self.version_fallida = None  # mtime de un archivo que no se pudo cargar (no se reintenta)
+        self._historial = None
+        self._cola = queue.Queue()
+        self._detener = threading.Event()
+        self._hilos = []
+        self._httpd = None
+
+        self._lock_metricas = threading.Lock()
+        self._latencias = deque(maxlen=MAX_LATENCIAS)
+        self._filas = 0
+        self._lotes = 0
+        self._errores = 0
+        self._recargas = 0
+        self._inicio = None
+
+    @property
+    def url(self):
+        if self._httpd is None:
+            return None
+        host, puerto = self._httpd.server_address[:2]
+        return f"http://{host}:{puerto}"
+
+    def cargar_modelo(self):
+        """Carga (o recarga) el modelo; si falla se conserva el anterior"""
+        if not os.path.exists(self.ruta_modelo):
+            print(f"Error: No hay modelo en {self.ruta_modelo}; ejecuta antes 'python main.py train'.")
+            return False
+        version = os.path.getmtime(self.ruta_modelo)
+        modelo = ModeloML(self._leer_historial())
+        modelo.load_model(self.ruta_modelo, mmap_mode=self.mmap_mode)
+        if modelo.model is None or modelo.preprocesador is None:
+            self.version_fallida = version
+            estado = "se conserva el anterior" if self.modelo is not None else "ejecuta antes 'python main.py train'"
+            print(f"Error: {self.ruta_modelo} no contiene un modelo con preprocesamiento; {estado}.")
+            return False
+        # Reemplazo atómico: el siguiente lote ya usa el modelo nuevo
+        self.modelo, self.version_modelo = modelo, version
+        return True
+
+    def _leer_historial(self):
+        """Tabla integrada (una sola vez); vacía si no existe, así un archivo antiguo no se puede cargar"""
+        if self._historial is None:
+            ruta = Utilidades.ruta_mas_rapida(self.ruta_historial) if self.ruta_historial else None
+            self._historial = Utilidades.leer_tabla(ruta) if ruta and os.path.exists(ruta) else pd.DataFrame()
+        return self._historial
+
+    def iniciar(self):
+        """Carga el modelo y arranca el servidor HTTP, el hilo de inferencia y el de recarga"""
+        if not self.cargar_modelo():
+            raise RuntimeError(f"No se pudo cargar el modelo desde {self.ruta_modelo}; "
+                               f"ejecuta antes 'python main.py train'.")
+        self._detener.clear()
+        self._inicio = time.perf_counter()
+        self._httpd = _ServidorHTTP((self.host, self.puerto), _crear_manejador(self))
+        for objetivo in (self._httpd.serve_forever, self._bucle_inferencia, self._bucle_recarga):
+            hilo = threading.Thread(target=objetivo, daemon=True)
+            hilo.start()
+            self._hilos.append(hilo)
+        print(f"Servidor de predicción escuchando en {self.url} (modelo: {self.ruta_modelo})")
+        return self
+
+    def detener(self):
+        self._detener.set()
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        for hilo in self._hilos:
+            hilo.join(timeout=5)
+        self._hilos = []
+        self._httpd = None
+
+    def servir(self):
+        """Arranca y bloquea hasta Ctrl+C"""
+        self.iniciar()
+        try:
+            while not self._detener.wait(1.0):
+                pass
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.detener()
+
+    def predecir(self, filas, timeout=30.0):
+        """
+        Encola filas (dict o lista de dicts) y espera sus predicciones.
+        Es lo que usa el endpoint /predict; también sirve para uso en el mismo proceso.
+        """
+        if isinstance(filas, dict):
+            filas = [filas]
+        futuro = Future()
+        self._cola.put((list(filas), futuro, time.perf_counter()))
+        return futuro.result(timeout=timeout)
+
+    def metricas(self):
+        with self._lock_metricas:
+            latencias = np.array(self._latencias) * 1000 if self._latencias else None
+            transcurrido = time.perf_counter() - self._inicio if self._inicio else 0.0
+            return {
+                "peticiones": len(self._latencias),
+                "filas": self._filas,
+                "lotes": self._lotes,
+                "errores": self._errores,
+                "filas_por_lote": self._filas / self._lotes if self._lotes else 0.0,
+                "latencia_p50_ms": float(np.percentile(latencias, 50)) if latencias is not None else None,
+                "latencia_p99_ms": float(np.percentile(latencias, 99)) if latencias is not None else None,
+                "filas_por_segundo": self._filas / transcurrido if transcurrido else 0.0,
+                "version_modelo": self.version_modelo,
+                "recargas": self._recargas,
+            }
+
+    def _bucle_inferencia(self):
+        while not self._detener.is_set():
+            try:
+                primero = self._cola.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            lote = [primero]
+            n_filas = len(primero[0])
+            limite = time.perf_counter() + self.espera_lote
+            while n_filas < self.max_lote:
+                restante = limite - time.perf_counter()
+                try:
+                    item = self._cola.get(timeout=restante) if restante > 0 else self._cola.get_nowait()
+                except queue.Empty:
+                    break
+                lote.append(item)
+                n_filas += len(item[0])
+            self._procesar_lote(lote, n_filas)
+
+    def _procesar_lote(self, lote, n_filas):
+        modelo = self.modelo
+        try:
+            # Cada fila pasa por el camino rápido de dict del preprocesador; un solo predict
+            X = np.vstack([modelo.preprocesador.transform(fila) for filas, _, _ in lote for fila in filas])
+            predicciones = modelo.model.predict(X).tolist()
+        except Exception as e:
+            # Se reintenta petición por petición para que un dato malo no tumbe a las demás
+            if len(lote) > 1:
+                for item in lote:
+                    self._procesar_lote([item], len(item[0]))
+                return
+            lote[0][1].set_exception(e)
+            with self._lock_metricas:
+                self._errores += 1
+            return
+
+        fin = time.perf_counter()
+        posicion = 0
+        with self._lock_metricas:
+            self._lotes += 1
+            self._filas += n_filas
+            for filas, futuro, llegada in lote:
+                self._latencias.append(fin - llegada)
+        for filas, futuro, _ in lote:
+            futuro.set_result(predicciones[posicion:posicion + len(filas)])
+            posicion += len(filas)
+
+    def _bucle_recarga(self):
+        while not self._detener.wait(self.intervalo_recarga):
+            try:
+                version = os.path.getmtime(self.ruta_modelo)
+            except OSError:
+                continue
+            if version in (self.version_modelo, self.version_fallida):
+                continue
+            if self.cargar_modelo():
+                with self._lock_metricas:
+                    self._recargas += 1
+                print(f"Modelo recargado desde {self.ruta_modelo}")
+
+
+class _ServidorHTTP(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 128  # La cola de 5 del socket por defecto rechaza ráfagas de clientes concurrentes
+
+
+def _crear_manejador(servidor):
+    class Manejador(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"  # Conexiones keep-alive
+
+        def do_GET(self):
+            if self.path == "/metricas":
+                self._responder(200, servidor.metricas())
+            elif self.path == "/salud":
+                self._responder(200, {"estado": "ok", "version_modelo": servidor.version_modelo})
+            else:
+                self._responder(404, {"error": "Ruta no encontrada"})
+
+        def do_POST(self):
+            if self.path != "/predict":
+                self._responder(404, {"error": "Ruta no encontrada"})
+                return
+            try:
+                cuerpo = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                filas = cuerpo.get("filas", cuerpo) if isinstance(cuerpo, dict) else cuerpo
+                self._responder(200, {"predicciones": servidor.predecir(filas)})
+            except (ValueError, KeyError, TypeError) as e:
+                self._responder(400, {"error": str(e)})
+            except Exception as e:
+                self._responder(500, {"error": str(e)})
+
+        def _responder(self, estado, datos):
+            cuerpo = json.dumps(datos).encode("utf-8")
+            self.send_response(estado)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(cuerpo)))
+            self.end_headers()
+            self.wfile.write(cuerpo)
+
+        def log_message(self, formato, *args):
+            pass  # Sin una línea de log por petición
+
+    return Manejador
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Servidor HTTP de predicción de PM2.5")
+    parser.add_argument("--modelo", default=RUTA_MODELO, help="Archivo .joblib guardado con ModeloML")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--puerto", type=int, default=8050)
+    parser.add_argument("--max-lote", type=int, default=64)
+    parser.add_argument("--espera-lote", type=float, default=0.002, help="Segundos de espera para agrupar")
+    parser.add_argument("--historial", default=RUTA_HISTORIAL,
+                        help="Tabla ClimaContaminacion (solo para modelos antiguos sin preprocesamiento)")
+    args = parser.parse_args()
+    ServidorPrediccion(args.modelo, args.host, args.puerto, args.max_lote, args.espera_lote,
+                       ruta_historial=args.historial).servir()
+
+
+if __name__ == "__main__":
+    main()
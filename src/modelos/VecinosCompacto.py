@@ -0,0 +1,78 @@
+import numpy as np
+
+FILAS_POR_PASO = 1024  # Filas a predecir por paso: acota la matriz de distancias en memoria
+
+
+class VecinosCompacto:
+    def __init__(self, X, y, n_neighbors, ponderar, classes=None, n_features_in=None):
+        """
+        KNN de sklearn (regresión o clasificación, distancia euclidiana) reducido a la matriz
+        de entrenamiento: los vecinos se buscan por fuerza bruta con NumPy, sin importar sklearn.
+        Con las pocas filas del proyecto (un registro por mes) es más rápido que cargar el
+        índice de sklearn.
+
+        Crear con VecinosCompacto.desde_estimador(estimador).
+        """
+        self.X = X  # float64 (filas de entrenamiento, características)
+        self.y = y  # Objetivo (regresión) o índice de clase (clasificación) de cada fila
+        self.n_neighbors = n_neighbors
+        self.ponderar = ponderar  # True: pesos 1/distancia (weights='distance')
+        self.classes_ = classes
+        self.n_features_in_ = n_features_in
+
+    @classmethod
+    def desde_estimador(cls, estimador):
+        """
+        Copia los datos de un KNeighborsRegressor o KNeighborsClassifier ajustado.
+        Devuelve None si no es un KNN, si la métrica no es euclidiana o si los pesos son
+        una función propia.
+        """
+        if not hasattr(estimador, "_fit_X") or getattr(estimador, "effective_metric_", None) != "euclidean":
+            return None
+        if estimador.weights not in ("uniform", "distance"):
+            return None
+        clases = getattr(estimador, "classes_", None)
+        if clases is not None and getattr(estimador, "outputs_2d_", False):
+            return None  # Clasificación multi-salida: no se usa en el proyecto
+        return cls(
+            X=np.ascontiguousarray(estimador._fit_X, dtype=np.float64),
+            y=np.ascontiguousarray(estimador._y),
+            n_neighbors=int(estimador.n_neighbors),
+            ponderar=estimador.weights == "distance",
+            classes=clases,
+            n_features_in=getattr(estimador, "n_features_in_", None),
+        )
+
+    def _vecinos(self, X):
+        """Índices y distancias de los k vecinos de cada fila, del más cercano al más lejano"""
+        diferencias = X[:, None, :] - self.X[None, :, :]
+        distancias = np.sqrt(np.einsum("ijk,ijk->ij", diferencias, diferencias))
+        indices = np.argsort(distancias, axis=1, kind="stable")[:, :self.n_neighbors]
+        return indices, np.take_along_axis(distancias, indices, axis=1)
+
+    def _pesos(self, distancias):
+        if not self.ponderar:
+            return np.ones_like(distancias)
+        # Como sklearn: si una fila coincide con puntos de entrenamiento, solo cuentan esos
+        with np.errstate(divide="ignore"):
+            pesos = 1.0 / distancias
+        exactas = (distancias == 0).any(axis=1)
+        pesos[exactas] = (distancias[exactas] == 0).astype(np.float64)
+        return pesos
+
+    def predict(self, X):
+        X = np.asarray(X, dtype=np.float64)
+        return np.concatenate([self._predecir(X[i:i + FILAS_POR_PASO])
+                               for i in range(0, len(X), FILAS_POR_PASO)]) if len(X) else self._predecir(X)
+
+    def _predecir(self, X):
+        indices, distancias = self._vecinos(X)
+        pesos = self._pesos(distancias)
+        if self.classes_ is not None:
+            votos = np.zeros((len(X), len(self.classes_)))
+            np.add.at(votos, (np.arange(len(X))[:, None], self.y[indices]), pesos)
+            return np.asarray(self.classes_)[votos.argmax(axis=1)]
+        vecinos = self.y[indices]  # (filas, k) o (filas, k, salidas)
+        if vecinos.ndim == 3:
+            pesos = pesos[:, :, None]
+        return (vecinos * pesos).sum(axis=1) / pesos.sum(axis=1)
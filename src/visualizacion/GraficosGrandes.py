@@ -0,0 +1,178 @@
+import numpy as np
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+
+try:
+    from datos.AgregadorTemporal import AgregadorTemporal
+except ModuleNotFoundError:  # Importado como src.visualizacion (Visualizador)
+    from src.datos.AgregadorTemporal import AgregadorTemporal
+
+MAX_PUNTOS_SERIE = 1000  # Puntos por serie tras el downsampling LTTB
+MAX_COLUMNAS_ANOTADAS = 20  # Por encima de esto el heatmap de correlación no lleva números
+
+
+class GraficosGrandes:
+    """
+    Gráficos para tablas grandes: a matplotlib solo le llegan datos ya resumidos
+    (conteos por intervalo, estadísticas de caja, series reducidas), de modo que el
+    tiempo de dibujo depende del tamaño del gráfico y no del número de filas.
+
+    Las funciones datos_* preparan esos resúmenes (en el proceso principal, con NumPy);
+    las dibujar_* reciben solo el resumen, que es pequeño y barato de enviar a otro proceso.
+    """
+
+    @staticmethod
+    def datos_histograma(df, bins=30, resumen=None):
+        """
+        Conteos por intervalo de cada columna numérica con numpy.histogram.
+
+        Args:
+            df (pd.DataFrame): Datos.
+            bins (int): Intervalos por columna.
+            resumen (ResumenEstadistico, optional): Si se indica, se usan su mínimo y máximo
+                                                    como rango (sin recorrer antes la columna).
+        """
+        descripcion = resumen.describe() if resumen is not None else None
+        histogramas = {}
+        for col in df.select_dtypes(include="number").columns:
+            valores = df[col].to_numpy(dtype=np.float64, na_value=np.nan)
+            valores = valores[np.isfinite(valores)]
+            if not len(valores):
+                continue
+            rango = None
+            if descripcion is not None and col in descripcion.columns:
+                rango = (descripcion.at["min", col], descripcion.at["max", col])
+                if rango[0] == rango[1]:
+                    rango = (rango[0] - 0.5, rango[1] + 0.5)
+            histogramas[col] = np.histogram(valores, bins=bins, range=rango)
+        return histogramas
+
+    @staticmethod
+    def datos_caja(resumen):
+        """
+        Estadísticas de caja (mediana, cuartiles y bigotes a 1.5 IQR) para Axes.bxp,
+        tomadas del sketch de cuantiles y el mínimo/máximo del ResumenEstadistico.
+        Los valores atípicos no se dibujan uno por uno.
+        """
+        descripcion = resumen.describe()
+        cajas = []
+        for col in resumen.numericas:
+            d = descripcion[col]
+            if not d["count"]:
+                continue
+            iqr = d["75%"] - d["25%"]
+            cajas.append({
+                "label": col,
+                "med": d["50%"],
+                "q1": d["25%"],
+                "q3": d["75%"],
+                "whislo": max(d["min"], d["25%"] - 1.5 * iqr),
+                "whishi": min(d["max"], d["75%"] + 1.5 * iqr),
+                "fliers": [],
+            })
+        return cajas
+
+    @staticmethod
+    def datos_series(df, max_puntos=MAX_PUNTOS_SERIE):
+        """
+        Series temporales reducidas con LTTB: eje x por fecha (Fecha, o Anio/Año y Mes)
+        o por número de fila, y una serie por columna numérica que no sea de periodo.
+        """
+        periodo = [c for c in ("Fecha", "Anio", "Año", "Semana", "Mes") if c in df.columns]
+        columna_anio = next((c for c in ("Anio", "Año") if c in df.columns), None)
+        es_fecha = True
+        if "Fecha" in df.columns:
+            fechas = pd.to_datetime(df["Fecha"], errors="coerce")
+        elif columna_anio and "Mes" in df.columns:
+            meses = AgregadorTemporal.mes_a_numero(df["Mes"])  # Acepta "Junio", 6 o "06"
+            fechas = pd.to_datetime(pd.DataFrame({"year": df[columna_anio], "month": meses, "day": 1}),
+                                    errors="coerce")
+        else:
+            fechas, es_fecha = None, False
+        if es_fecha:
+            x = fechas.to_numpy(dtype="datetime64[ns]").astype(np.int64).astype(np.float64)
+            x[fechas.isna().to_numpy()] = np.nan
+        else:
+            x = np.arange(len(df), dtype=np.float64)
+        orden = np.argsort(x, kind="stable")
+        x = x[orden]
+
+        series = {}
+        for col in df.select_dtypes(include="number").columns:
+            if col in periodo:
+                continue
+            y = df[col].to_numpy(dtype=np.float64, na_value=np.nan)[orden]
+            validos = np.isfinite(x) & np.isfinite(y)
+            series[col] = GraficosGrandes.lttb(x[validos], y[validos], max_puntos)
+        return {"es_fecha": es_fecha, "series": series}
+
+    @staticmethod
+    def lttb(x, y, n_puntos):
+        """
+        Largest-Triangle-Three-Buckets: reduce (x, y) a n_puntos conservando la forma
+        visual (picos y valles). Conserva el primer y el último punto.
+        """
+        x, y = np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64)
+        n = len(x)
+        if n_puntos >= n or n_puntos < 3:
+            return x, y
+        limites = np.linspace(1, n - 1, n_puntos - 1).astype(np.int64)  # Cubetas internas
+        elegidos = np.empty(n_puntos, dtype=np.int64)
+        elegidos[0], elegidos[-1] = 0, n - 1
+        anterior = 0
+        for i in range(n_puntos - 2):
+            inicio, fin = limites[i], limites[i + 1]
+            # Promedio de la cubeta siguiente (o el último punto)
+            siguiente_fin = limites[i + 2] if i + 2 < len(limites) else n
+            sx = x[fin:siguiente_fin].mean() if siguiente_fin > fin else x[-1]
+            sy = y[fin:siguiente_fin].mean() if siguiente_fin > fin else y[-1]
+            ax, ay = x[anterior], y[anterior]
+            areas = np.abs((ax - sx) * (y[inicio:fin] - ay) - (ax - x[inicio:fin]) * (sy - ay))
+            anterior = inicio + int(np.argmax(areas)) if len(areas) else inicio
+            elegidos[i + 1] = anterior
+        return x[elegidos], y[elegidos]
+
+    @staticmethod
+    def dibujar_histogramas(nombre, histogramas):
+        n = max(len(histogramas), 1)
+        columnas = int(np.ceil(np.sqrt(n)))
+        filas = int(np.ceil(n / columnas))
+        fig, ejes = plt.subplots(filas, columnas, figsize=(12, 8), squeeze=False)
+        for ax, (col, (conteos, bordes)) in zip(ejes.flat, histogramas.items()):
+            ax.stairs(conteos, bordes, fill=True)
+            ax.set_title(col)
+            ax.grid(True)
+        for ax in list(ejes.flat)[len(histogramas):]:
+            ax.set_visible(False)
+        fig.suptitle(f"Histogramas - {nombre}", fontsize=14)
+        return fig
+
+    @staticmethod
+    def dibujar_cajas(nombre, cajas):
+        fig, ax = plt.subplots(figsize=(12, 6))
+        ax.bxp(cajas, showfliers=False, patch_artist=True)
+        ax.set_title(f"Boxplots - {nombre}")
+        ax.tick_params(axis="x", rotation=45)
+        return fig
+
+    @staticmethod
+    def dibujar_correlacion(nombre, corr, max_anotadas=MAX_COLUMNAS_ANOTADAS):
+        lado = min(10 + max(len(corr) - 20, 0) * 0.2, 30)
+        fig, ax = plt.subplots(figsize=(lado, lado * 0.8))
+        # Con muchas columnas los números no se leen y su dibujo crece con columnas^2
+        anotar = len(corr) <= max_anotadas
+        sns.heatmap(corr, annot=anotar, cmap="coolwarm", fmt=".2f", ax=ax, vmin=-1, vmax=1)
+        ax.set_title(f"Matriz de Correlación - {nombre}")
+        return fig
+
+    @staticmethod
+    def dibujar_series(nombre, datos):
+        series = datos["series"]
+        fig, ejes = plt.subplots(max(len(series), 1), 1, figsize=(12, 2 * max(len(series), 1)),
+                                 sharex=True, squeeze=False)
+        for ax, (col, (x, y)) in zip(ejes.flat, series.items()):
+            ax.plot(x.astype(np.int64).astype("datetime64[ns]") if datos["es_fecha"] else x, y, linewidth=0.8)
+            ax.set_ylabel(col, rotation=0, ha="right")
+        fig.suptitle(f"Series - {nombre}", fontsize=14)
+        return fig
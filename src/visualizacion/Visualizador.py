@@ -1,11 +1,25 @@
+import argparse
 import os
-import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
-from src.eda.ProcesadorEDA import ProcesadorEDA
+from src.eda.ProcesadorEDA import ProcesadorEDA, TIPOS_GRAFICO
+from src.helpers.Utilidades import Utilidades
+from src.visualizacion.GraficosGrandes import GraficosGrandes
 
 
-def main():
+def main(interactivo=False, modo_grande=None, series=False):
+    """
+    EDA de todos los archivos de data/processed.
+
+    Por defecto genera el reporte sin pantalla (data/reportes/eda/index.html); con
+    interactivo=True (o --interactivo) muestra cada figura con plt.show().
+
+    modo_grande=True (--grande) grafica resúmenes en lugar de filas: histogramas binados con
+    numpy, cajas a partir del sketch de cuantiles y heatmaps sin números si hay muchas
+    columnas. modo_grande=False (--no-grande) grafica siempre las filas. Con None se activa
+    solo en tablas de UMBRAL_FILAS_GRANDES filas o más.
+    series=True (--series) agrega las series temporales reducidas con LTTB.
+    """
     # --- Ruta base de datos ---
     BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
     DATA_DIR = os.path.join(BASE_DIR, "data", "processed")
@@ -22,12 +36,13 @@ def main():
 
     dfs = {}
     for archivo in csv_files:
-        ruta = os.path.join(DATA_DIR, archivo)
+        # Si hay copia Parquet/Arrow igual o más reciente se lee esa en lugar del CSV
+        ruta = Utilidades.ruta_mas_rapida(os.path.join(DATA_DIR, archivo))
         try:
-            df = pd.read_csv(ruta)
+            df = Utilidades.leer_tabla(ruta)
             nombre = os.path.splitext(archivo)[0]  # Nombre sin extensión
             dfs[nombre] = df
-            print(f"Cargado: {archivo}")
+            print(f"Cargado: {os.path.basename(ruta)}")
         except Exception as e:
             print(f"No se pudo cargar {archivo}: {e}")
 
@@ -42,6 +57,14 @@ def main():
     eda.info_general()
     eda.estadisticas()
 
+    if not interactivo:
+        # --- Reporte sin pantalla: figuras en paralelo + index.html ---
+        tipos = TIPOS_GRAFICO + ("series",) if series else TIPOS_GRAFICO
+        tiempos = eda.generar_reporte(os.path.join(BASE_DIR, "data", "reportes", "eda"),
+                                      tipos=tipos, modo_grande=modo_grande)
+        print(tiempos.to_string(index=False))
+        return
+
     # --- Mostrar gráficos en pantalla ---
     print("\nMostrando gráficos...")
     for nombre, df in dfs.items():
@@ -49,26 +72,43 @@ def main():
         if len(numeric_cols) == 0:
             continue
 
-        # Histogramas
-        df[numeric_cols].hist(bins=30, figsize=(12, 8))
-        plt.suptitle(f"Histogramas - {nombre}", fontsize=14)
-        plt.show()
+        if eda.es_grande(nombre, modo_grande):
+            # Resúmenes: el tiempo de dibujo no depende del número de filas
+            GraficosGrandes.dibujar_histogramas(nombre, eda.datos_grafico(nombre, "histogramas", True))
+            plt.show()
+            GraficosGrandes.dibujar_cajas(nombre, eda.datos_grafico(nombre, "boxplots", True))
+            plt.show()
+        else:
+            # Histogramas
+            df[numeric_cols].hist(bins=30, figsize=(12, 8))
+            plt.suptitle(f"Histogramas - {nombre}", fontsize=14)
+            plt.show()
 
-        # Boxplots
-        plt.figure(figsize=(12, 6))
-        sns.boxplot(data=df[numeric_cols])
-        plt.title(f"Boxplots - {nombre}")
-        plt.xticks(rotation=45)
-        plt.show()
+            # Boxplots
+            plt.figure(figsize=(12, 6))
+            sns.boxplot(data=df[numeric_cols])
+            plt.title(f"Boxplots - {nombre}")
+            plt.xticks(rotation=45)
+            plt.show()
 
-        # Matriz de correlación
-        plt.figure(figsize=(10, 8))
-        sns.heatmap(df[numeric_cols].corr(), annot=True, cmap="coolwarm", fmt=".2f")
-        plt.title(f"Matriz de Correlación - {nombre}")
+        # Matriz de correlación (con números solo si hay pocas columnas)
+        GraficosGrandes.dibujar_correlacion(nombre, eda.correlacion(nombre))
         plt.show()
 
+        if series:
+            GraficosGrandes.dibujar_series(nombre, eda.datos_grafico(nombre, "series"))
+            plt.show()
+
     print("\nEDA completado. Todos los gráficos mostrados en pantalla.")
 
 
 if __name__ == "__main__":
-    main()
+    parser = argparse.ArgumentParser(description="EDA de los archivos de data/processed")
+    parser.add_argument("--interactivo", action="store_true", help="Mostrar las figuras en pantalla")
+    parser.add_argument("--grande", action=argparse.BooleanOptionalAction, default=None,
+                        help="Graficar resúmenes (binados y por sketch) aunque la tabla sea pequeña; "
+                             "--no-grande grafica las filas aunque la tabla sea grande "
+                             "(por defecto según el número de filas)")
+    parser.add_argument("--series", action="store_true", help="Agregar series temporales reducidas con LTTB")
+    args = parser.parse_args()
+    main(interactivo=args.interactivo, modo_grande=args.grande, series=args.series)
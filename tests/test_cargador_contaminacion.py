@@ -0,0 +1,183 @@
+import json
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+import datos.CargadorContaminacion as modulo
+from datos.CargadorContaminacion import CargadorContaminacion
+
+
+def mediciones(n=40, estaciones=("E1", "E2"), inicio="2021-01-01"):
+    fechas = pd.date_range(inicio, periods=n, freq="D")
+    rng = np.random.default_rng(0)
+    return [{"Estacion": estaciones[i % len(estaciones)], "Fecha": fecha.strftime("%Y-%m-%d"),
+             "pm10": round(float(rng.uniform(5, 40)), 3), "pm2_5": round(float(rng.uniform(2, 20)), 3)}
+            for i, fecha in enumerate(fechas)]
+
+
+def escribir(ruta, registros, ndjson=False):
+    with open(ruta, "w", encoding="utf-8") as f:
+        if ndjson:
+            f.write("\n\n".join(json.dumps(r, ensure_ascii=False) for r in registros) + "\n")
+        else:
+            json.dump(registros, f, ensure_ascii=False, indent=1)
+    return str(ruta)
+
+
+def esperado(registros):
+    df = pd.DataFrame(registros)
+    df["Fecha"] = pd.to_datetime(df["Fecha"]).dt.as_unit("ns")
+    return df
+
+
+@pytest.fixture(params=["orjson", "json"])
+def decodificador(request, monkeypatch):
+    """Cada prueba con orjson (si está instalado) y con el módulo json de la biblioteca estándar"""
+    if request.param == "json":
+        monkeypatch.setattr(modulo, "orjson", None)
+    elif modulo.orjson is None:
+        pytest.skip("orjson no está instalado")
+
+
+@pytest.mark.parametrize("tamano_lectura", [7, 64, 333, 1 << 20])
+def test_arreglo_con_registros_cortados_entre_lecturas(tmp_path, monkeypatch, decodificador, tamano_lectura):
+    monkeypatch.setattr(modulo, "TAMANO_LECTURA", tamano_lectura)
+    registros = mediciones()
+    df = CargadorContaminacion(escribir(tmp_path / "c.json", registros), tamano_bloque=7).cargar()
+
+    pd.testing.assert_frame_equal(df, esperado(registros))
+
+
+def test_objetos_anidados_y_llaves_en_texto_usan_raw_decode(tmp_path, monkeypatch, decodificador):
+    monkeypatch.setattr(modulo, "TAMANO_LECTURA", 50)
+    registros = [{"Estacion": "E}1", "Fecha": "2021-01-01", "pm10": 1.5, "meta": {"a": {"b": 1}}},
+                 {"Estacion": "E{2}", "Fecha": "2021-01-02", "pm10": 2.5, "meta": {"a": None}},
+                 {"Estacion": "}}", "Fecha": "2021-01-03", "pm10": 3.5, "meta": {}}]
+    df = CargadorContaminacion(escribir(tmp_path / "c.json", registros)).cargar()
+
+    assert df["Estacion"].tolist() == ["E}1", "E{2}", "}}"]
+    assert df["meta"].tolist() == [r["meta"] for r in registros]
+    assert df["pm10"].tolist() == [1.5, 2.5, 3.5]
+
+
+def test_lote_cortado_en_llave_de_texto_pasa_a_raw_decode(tmp_path, monkeypatch):
+    registros = [{"Estacion": "E1", "Fecha": "2021-01-01", "texto": "a}b"}] * 5
+    ruta = escribir(tmp_path / "c.json", registros)
+    resultados = []
+    original = modulo._decodificar_lote
+
+    def espiar(texto, cargar):
+        resultados.append(original(texto, cargar))
+        return resultados[-1]
+    monkeypatch.setattr(modulo, "_decodificar_lote", espiar)
+
+    for tamano_lectura in range(20, 90, 7):  # Cortes en distintas posiciones de los registros
+        monkeypatch.setattr(modulo, "TAMANO_LECTURA", tamano_lectura)
+        df = CargadorContaminacion(ruta).cargar()
+        assert df["texto"].tolist() == ["a}b"] * 5
+    assert any(r is None for r in resultados)  # Algún lote terminó en la '}' de un texto
+
+
+def test_ndjson(tmp_path, decodificador):
+    registros = mediciones(25)
+    df = CargadorContaminacion(escribir(tmp_path / "c.ndjson", registros, ndjson=True), tamano_bloque=4).cargar()
+
+    pd.testing.assert_frame_equal(df, esperado(registros))
+
+
+def test_filtros_de_fecha_y_estacion(tmp_path):
+    registros = mediciones(60)
+    cargador = CargadorContaminacion(escribir(tmp_path / "c.json", registros), fecha_inicio="2021-01-10",
+                                     fecha_fin="2021-02-05", estaciones=["E2"])
+    df = cargador.cargar()
+
+    filtro = esperado(registros)
+    filtro = filtro[(filtro["Estacion"] == "E2") & filtro["Fecha"].between("2021-01-10", "2021-02-05")]
+    pd.testing.assert_frame_equal(df, filtro.reset_index(drop=True))
+    assert cargador.leidos == 60
+
+
+def test_fecha_fin_incluye_el_dia_completo_con_horas(tmp_path):
+    registros = [{"Estacion": "E1", "Fecha": f"2021-03-0{d} {h:02d}:00", "pm10": 1.0} for d in (1, 2) for h in (0, 23)]
+    df = CargadorContaminacion(escribir(tmp_path / "c.json", registros), fecha_fin="2021-03-01").cargar()
+
+    assert df["Fecha"].dt.strftime("%Y-%m-%d %H:%M").tolist() == ["2021-03-01 00:00", "2021-03-01 23:00"]
+
+
+def test_registros_mensuales_sin_fecha(tmp_path):
+    registros = [{"Anio": 2020, "Mes": m, "pm10": float(m)} for m in range(1, 13)]
+    df = CargadorContaminacion(escribir(tmp_path / "c.json", registros),
+                               fecha_inicio="2020-03-15", fecha_fin="2020-05-01").cargar()
+
+    assert df["Mes"].tolist() == [3, 4, 5]
+
+
+def test_tipos_distintos_entre_bloques_en_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    registros = [{"Estacion": "E1", "Fecha": "2021-01-01", "lectura": 1.0}] * 2 + \
+                [{"Estacion": "E1", "Fecha": "2021-01-02", "lectura": "sin dato"}] * 2
+    cargador = CargadorContaminacion(escribir(tmp_path / "c.json", registros), tamano_bloque=2)
+
+    with pytest.raises(ValueError, match="tipos"):
+        cargador.exportar(str(tmp_path / "salida.parquet"))
+
+
+def test_bloque_sin_fechas_seguido_de_fechas_en_parquet(tmp_path):
+    pytest.importorskip("pyarrow")
+    registros = [{"Estacion": "E1", "Fecha": None, "pm10": 1.0}] * 2 + mediciones(3)
+    cargador = CargadorContaminacion(escribir(tmp_path / "c.json", registros), tamano_bloque=2)
+    cargador.exportar(str(tmp_path / "salida.parquet"))
+
+    assert pd.read_parquet(tmp_path / "salida.parquet")["Fecha"].notna().sum() == 3
+
+
+def test_clave_nueva_despues_del_primer_bloque_avisa(tmp_path, capsys):
+    registros = mediciones(6)
+    for r in registros[3:]:
+        r["NO2"] = 12.0
+    ruta = escribir(tmp_path / "c.json", registros)
+
+    cargador = CargadorContaminacion(ruta, tamano_bloque=2)
+    df = cargador.cargar()
+    assert "NO2" not in df.columns
+    assert cargador.descartadas == {"NO2"}
+    assert capsys.readouterr().out.count("Aviso: La columna 'NO2'") == 1
+
+    # Con las columnas indicadas se conserva, y sin aviso
+    df = CargadorContaminacion(ruta, tamano_bloque=2, columnas=["Estacion", "Fecha", "pm10", "NO2"]).cargar()
+    assert df["NO2"].isna().tolist() == [True] * 3 + [False] * 3
+    assert "Aviso" not in capsys.readouterr().out
+
+
+def test_exportar_csv_y_parquet_en_una_pasada(tmp_path):
+    pytest.importorskip("pyarrow")
+    registros = mediciones(30)
+    cargador = CargadorContaminacion(escribir(tmp_path / "c.json", registros), tamano_bloque=8)
+    filas = cargador.exportar([str(tmp_path / "s.csv"), str(tmp_path / "s.parquet")])
+
+    assert filas == 30
+    pd.testing.assert_frame_equal(pd.read_parquet(tmp_path / "s.parquet"), esperado(registros))
+    assert len(pd.read_csv(tmp_path / "s.csv")) == 30
+
+
+def test_sin_registros_devuelve_columnas_tipadas(tmp_path):
+    df = CargadorContaminacion(escribir(tmp_path / "c.json", []), columnas=["Anio", "pm10", "Fecha"]).cargar()
+
+    assert len(df) == 0
+    assert df.dtypes.astype(str).tolist() == ["int64", "float64", "datetime64[ns]"]
+
+
+@pytest.mark.parametrize("contenido", ['[{"pm10": 1.0}, {"pm10": ', '[{"pm10": 1.0}, 5]', '[{"pm10": 1.0}'])
+def test_json_invalido(tmp_path, monkeypatch, contenido):
+    monkeypatch.setattr(modulo, "TAMANO_LECTURA", 8)
+    ruta = tmp_path / "c.json"
+    ruta.write_text(contenido, encoding="utf-8")
+
+    with pytest.raises(ValueError):
+        CargadorContaminacion(str(ruta)).cargar()
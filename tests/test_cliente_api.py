@@ -0,0 +1,98 @@
+import datetime
+import os
+import sys
+import time
+
+import pytest
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from api.ClienteAPI import ClienteAPI
+from benchmarks.generadores import ServidorERA5
+
+UBICACIONES = {"Zurquí": (10.061, -84.017), "Tres Ríos": (9.908, -83.993), "Alajuela": (9.988, -84.19)}
+
+
+@pytest.fixture
+def servidor():
+    servidor = ServidorERA5(demora=0.05)
+    with servidor as url:
+        servidor.url = url
+        yield servidor
+
+
+def crear_cliente(servidor, carpeta, **opciones):
+    opciones = {"ubicaciones": UBICACIONES, "url_base": servidor.url, "carpeta_cache": str(carpeta),
+                "carpeta_salida": str(carpeta), **opciones}
+    return ClienteAPI(**opciones)
+
+
+def test_ubicaciones_en_paralelo(servidor, tmp_path):
+    df = crear_cliente(servidor, tmp_path).obtener_datos()
+
+    assert servidor.peticiones == len(UBICACIONES)  # Un solo rango por ubicación (2020-2023)
+    assert servidor.max_simultaneas > 1
+    assert sorted(df["Ubicacion"].unique()) == sorted(UBICACIONES)
+    assert df.groupby("Ubicacion").size().eq(48).all()  # 48 meses por ubicación
+
+
+def test_cache_de_anios_pasados_no_vence(servidor, tmp_path):
+    primero = crear_cliente(servidor, tmp_path).obtener_datos()
+    for archivo in os.listdir(tmp_path):  # Respuestas con un año de antigüedad
+        if archivo.endswith(".json"):
+            hace_un_anio = time.time() - 365 * 24 * 3600
+            os.utime(tmp_path / archivo, (hace_un_anio, hace_un_anio))
+
+    segundo = crear_cliente(servidor, tmp_path, ttl_cache=0).obtener_datos()
+
+    assert servidor.peticiones == len(UBICACIONES)  # Todo desde el caché aunque el TTL sea 0
+    assert segundo.equals(primero)
+
+
+def test_cache_del_anio_en_curso_vence(servidor, tmp_path):
+    anio = datetime.date.today().year
+    hoy = datetime.date.today().isoformat()
+    crear_cliente(servidor, tmp_path, fecha_inicio=f"{anio - 1}-01-01", fecha_fin=hoy).obtener_datos()
+    assert servidor.por_rango == {(f"{anio - 1}-01-01", f"{anio - 1}-12-31"): 3, (f"{anio}-01-01", hoy): 3}
+
+    crear_cliente(servidor, tmp_path, fecha_inicio=f"{anio - 1}-01-01", fecha_fin=hoy).obtener_datos()
+    assert servidor.peticiones == 6  # Dentro del TTL: todo desde el caché
+
+    crear_cliente(servidor, tmp_path, fecha_inicio=f"{anio - 1}-01-01", fecha_fin=hoy,
+                  ttl_cache=0).obtener_datos()
+    assert servidor.por_rango == {(f"{anio - 1}-01-01", f"{anio - 1}-12-31"): 3, (f"{anio}-01-01", hoy): 6}
+
+
+def test_peticiones_identicas_en_vuelo_se_hacen_una_vez(servidor, tmp_path):
+    # Tres nombres con la misma coordenada: las tres peticiones salen a la vez con la misma clave
+    misma = {nombre: UBICACIONES["Zurquí"] for nombre in ("A", "B", "C")}
+    df = crear_cliente(servidor, tmp_path, ubicaciones=misma).obtener_datos()
+
+    assert servidor.peticiones == 1
+    assert sorted(df["Ubicacion"].unique()) == ["A", "B", "C"]
+    por_ubicacion = [g.drop(columns="Ubicacion").reset_index(drop=True) for _, g in df.groupby("Ubicacion")]
+    assert all(g.equals(por_ubicacion[0]) for g in por_ubicacion)
+
+
+def test_reintento_ante_5xx(tmp_path):
+    servidor = ServidorERA5(fallos=2)
+    with servidor as url:
+        servidor.url = url
+        df = crear_cliente(servidor, tmp_path, ubicaciones={"GAM": (9.9281, -84.0907)}).obtener_datos()
+
+    assert servidor.peticiones == 3  # Dos 503 y la respuesta correcta
+    assert len(df) == 48
+
+
+def test_error_si_se_agotan_los_reintentos(tmp_path):
+    servidor = ServidorERA5(fallos=10)
+    with servidor as url:
+        servidor.url = url
+        cliente = crear_cliente(servidor, tmp_path, ubicaciones={"GAM": (9.9281, -84.0907)}, reintentos=1)
+        with pytest.raises(requests.exceptions.RetryError):  # Reintentos agotados con 503
+            cliente.obtener_datos()
+
+    assert servidor.peticiones == 2
+    assert not [a for a in os.listdir(tmp_path) if a.endswith(".json")]  # Nada queda en caché
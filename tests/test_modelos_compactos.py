@@ -0,0 +1,49 @@
+import os
+import sys
+
+import numpy as np
+import pytest
+from sklearn.linear_model import LinearRegression, LogisticRegression, SGDRegressor
+from sklearn.multioutput import MultiOutputRegressor
+from sklearn.neighbors import KNeighborsClassifier, KNeighborsRegressor
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from modelos.LinealCompacto import LinealCompacto
+from modelos.ModeloML import compactar
+from modelos.VecinosCompacto import VecinosCompacto
+
+rng = np.random.default_rng(0)
+X = rng.normal(size=(60, 5))
+y = X @ rng.normal(size=5) + rng.normal(size=60)
+X_nuevas = np.vstack([rng.normal(size=(2500, 5)), X[:5]])  # Más de un paso de VecinosCompacto y filas exactas
+
+CASOS = [
+    (LinearRegression(), y, LinealCompacto),
+    (LinearRegression(), np.c_[y, 2 * y], LinealCompacto),
+    (SGDRegressor(random_state=0), y, LinealCompacto),
+    (MultiOutputRegressor(SGDRegressor(random_state=0)), np.c_[y, 2 * y], LinealCompacto),
+    (LogisticRegression(), (y > 0).astype(int), LinealCompacto),
+    (LogisticRegression(), np.digitize(y, [-1, 1]), LinealCompacto),
+    (KNeighborsRegressor(9), y, VecinosCompacto),
+    (KNeighborsRegressor(5, weights="distance"), y, VecinosCompacto),
+    (KNeighborsRegressor(3), np.c_[y, 2 * y], VecinosCompacto),
+    (KNeighborsClassifier(7), np.digitize(y, [-1, 1]), VecinosCompacto),
+    (KNeighborsClassifier(4, weights="distance"), np.digitize(y, [-1, 1]), VecinosCompacto),
+]
+
+
+@pytest.mark.parametrize("estimador, objetivo, clase", CASOS)
+def test_misma_prediccion_que_sklearn(estimador, objetivo, clase):
+    estimador.fit(X, objetivo)
+    compacto = compactar(estimador)
+
+    assert isinstance(compacto, clase)
+    esperado, obtenido = estimador.predict(X_nuevas), compacto.predict(X_nuevas)
+    assert obtenido.shape == esperado.shape
+    np.testing.assert_allclose(obtenido, esperado)
+
+
+def test_knn_con_otra_metrica_no_se_compacta():
+    assert compactar(KNeighborsRegressor(3, metric="manhattan").fit(X, y)) is None
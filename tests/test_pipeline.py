@@ -0,0 +1,57 @@
+import os
+import shutil
+import subprocess
+import sys
+
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from benchmarks.generadores import ServidorERA5
+
+# Etapas con caché; predict se ejecuta siempre
+ETAPAS = ["peajes", "contaminacion", "clima", "integrar", "eda", "load-db", "train"]
+
+
+def copiar_proyecto(destino):
+    """Código y datos crudos en una carpeta aparte: la corrida no toca data/ ni modelos/ del repositorio"""
+    shutil.copytree(os.path.join(RAIZ, "src"), os.path.join(destino, "src"),
+                    ignore=shutil.ignore_patterns("__pycache__", "data"))
+    shutil.copytree(os.path.join(RAIZ, "data", "raw"), os.path.join(destino, "data", "raw"))
+
+
+def ejecutar_pipeline(raiz, url):
+    salida = subprocess.run(
+        [sys.executable, os.path.join(raiz, "src", "main.py"), "all", "--motor", "sqlite"],
+        env={**os.environ, "PROYECTO_URL_CLIMA": url, "PROYECTO_REENTRENAR": "0"},
+        capture_output=True, text=True, check=True).stdout
+    estados = {}
+    for linea in salida.splitlines():  # Tabla de resumen del planificador: etapa, estado, segundos
+        partes = linea.split()
+        if partes and partes[0] in ETAPAS + ["predict"]:
+            estados[partes[0]] = " ".join(partes[1:-1]) if len(partes) > 2 else partes[1]
+    return estados
+
+
+def test_segunda_corrida_salta_todas_las_etapas(tmp_path):
+    copiar_proyecto(tmp_path)
+    with ServidorERA5() as url:
+        primera = ejecutar_pipeline(tmp_path, url)
+        segunda = ejecutar_pipeline(tmp_path, url)
+    with ServidorERA5() as otra_url:  # Otro servidor (otro puerto) con los mismos datos
+        tercera = ejecutar_pipeline(tmp_path, otra_url)
+
+    assert all(primera[etapa] == "ejecutada" for etapa in ETAPAS), primera
+    assert all(segunda[etapa] == "sin cambios" for etapa in ETAPAS), segunda
+    # Cambiar el servidor vuelve a pedir el clima; como el contenido no cambió, lo demás se salta
+    assert tercera["clima"] == "ejecutada", tercera
+    assert all(tercera[etapa] == "sin cambios" for etapa in ETAPAS if etapa != "clima"), tercera
+
+    # El clima descargado es el que llega a la tabla integrada
+    procesados = tmp_path / "data" / "processed"
+    clima = pd.read_csv(procesados / "clima_mensual_2020_2023.csv")
+    integrada = pd.read_csv(procesados / "clima_contaminacion.csv")
+    comparada = integrada[["Anio", "Mes", "Precipitacion"]].merge(clima, on=["Anio", "Mes"], suffixes=("", "_api"))
+    assert len(comparada) == len(integrada)
+    assert (comparada["Precipitacion"] == comparada["Precipitacion_api"]).all()
@@ -0,0 +1,30 @@
+import contextlib
+import io
+import os
+import sys
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from eda.ProcesadorEDA import ProcesadorEDA
+
+
+def test_resumen_hashea_una_vez_por_dataframe(tmp_path):
+    df = pd.DataFrame(np.random.default_rng(0).normal(size=(1000, 4)), columns=list("abcd"))
+    eda = ProcesadorEDA({"tabla": df}, carpeta_cache=str(tmp_path))
+
+    with mock.patch.object(pd.util, "hash_pandas_object", wraps=pd.util.hash_pandas_object) as hashear:
+        with contextlib.redirect_stdout(io.StringIO()):
+            eda.info_general()
+            eda.estadisticas()
+            eda.correlacion("tabla")
+        assert hashear.call_count == 1
+
+        # Reemplazar el DataFrame (filas agregadas) sí vuelve a resumir
+        eda.dfs["tabla"] = pd.concat([df, df.tail(5)], ignore_index=True)
+        assert eda.resumen("tabla").filas == 1005
+        assert hashear.call_count == 2
@@ -0,0 +1,110 @@
+import os
+import shutil
+import sys
+import time
+
+import pandas as pd
+import pytest
+import requests
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))  # Carpeta del proyecto
+sys.path.append(os.path.join(RAIZ, "src"))
+
+from modelos.ModeloML import ModeloML
+from modelos.ServidorPrediccion import ServidorPrediccion
+
+RUTA_HISTORIAL = os.path.join(RAIZ, "data", "processed", "clima_contaminacion.csv")
+RUTA_MODELO_ANTIGUO = os.path.join(RAIZ, "modelos", "modelo_pm25_regresion.joblib")  # Solo el estimador
+FEATURES = ["pm10", "CO", "NO2", "O3", "TempMax", "TempMin", "Precipitacion", "Mes"]
+
+
+def guardar_modelo(ruta, algoritmo):
+    modelo = ModeloML(pd.read_csv(RUTA_HISTORIAL))
+    modelo.prepare_data(features_list=FEATURES)
+    modelo.train_model(algoritmo)
+    modelo.save_model(ruta)
+    return modelo
+
+
+def reemplazar(ruta, escribir):
+    """Escribe el archivo nuevo con un mtime posterior, como lo vería el hilo de recarga"""
+    version = os.path.getmtime(ruta)
+    escribir()
+    os.utime(ruta, (version + 10, version + 10))
+
+
+def esperar(condicion, segundos=5.0):
+    limite = time.time() + segundos
+    while time.time() < limite:
+        if condicion():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+@pytest.fixture
+def servidor(tmp_path):
+    ruta = str(tmp_path / "modelo.joblib")
+    guardar_modelo(ruta, "LinearRegression")
+    servidor = ServidorPrediccion(ruta, puerto=0, intervalo_recarga=0.05).iniciar()
+    yield servidor
+    servidor.detener()
+
+
+def test_predict_por_http(servidor):
+    filas = pd.read_csv(RUTA_HISTORIAL)[FEATURES].tail(3).to_dict(orient="records")
+    respuesta = requests.post(f"{servidor.url}/predict", json={"filas": filas}, timeout=5)
+
+    assert respuesta.status_code == 200
+    esperado = servidor.modelo.predict(pd.DataFrame(filas))
+    assert respuesta.json()["predicciones"] == pytest.approx(list(esperado))
+    assert requests.get(f"{servidor.url}/salud", timeout=5).status_code == 200
+    assert requests.post(f"{servidor.url}/predict", data="{no json", timeout=5).status_code == 400
+
+
+def test_recarga_en_caliente(servidor):
+    version = servidor.version_modelo
+    reemplazar(servidor.ruta_modelo, lambda: guardar_modelo(servidor.ruta_modelo, "DecisionTree"))
+
+    assert esperar(lambda: servidor.metricas()["recargas"] == 1)
+    assert servidor.version_modelo != version
+    assert type(servidor.modelo.model).__name__ == "DecisionTreeRegressor"
+
+
+def test_archivo_danado_conserva_el_modelo_anterior(servidor, capsys):
+    modelo, version = servidor.modelo, servidor.version_modelo
+
+    def escribir_basura():
+        with open(servidor.ruta_modelo, "wb") as f:
+            f.write(b"no es un joblib")
+    reemplazar(servidor.ruta_modelo, escribir_basura)
+
+    assert esperar(lambda: servidor.version_fallida is not None)
+    time.sleep(0.3)  # Varios intervalos de recarga: el archivo malo no se vuelve a intentar
+    assert servidor.modelo is modelo and servidor.version_modelo == version
+    assert servidor.metricas()["recargas"] == 0
+    assert capsys.readouterr().out.count("se conserva el anterior") == 1
+    assert servidor.predecir({f: 1.0 for f in FEATURES})  # Sigue respondiendo con el modelo anterior
+
+
+def test_modelo_antiguo_usa_el_historial(tmp_path):
+    ruta = str(tmp_path / "antiguo.joblib")
+    shutil.copy(RUTA_MODELO_ANTIGUO, ruta)
+    servidor = ServidorPrediccion(ruta, puerto=0).iniciar()
+    try:
+        fila = pd.read_csv(RUTA_HISTORIAL).tail(1)
+        assert len(servidor.predecir(fila[servidor.modelo.features].to_dict(orient="records"))) == 1
+    finally:
+        servidor.detener()
+
+
+def test_modelo_antiguo_sin_historial_pide_entrenar(tmp_path):
+    ruta = str(tmp_path / "antiguo.joblib")
+    shutil.copy(RUTA_MODELO_ANTIGUO, ruta)
+    with pytest.raises(RuntimeError, match="main.py train"):
+        ServidorPrediccion(ruta, puerto=0, ruta_historial=str(tmp_path / "no_existe.csv")).iniciar()
+
+
+def test_sin_modelo_pide_entrenar(tmp_path):
+    with pytest.raises(RuntimeError, match="main.py train"):
+        ServidorPrediccion(str(tmp_path / "no_existe.joblib"), puerto=0).iniciar()